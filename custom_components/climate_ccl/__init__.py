@@ -1 +1,71 @@
-"""The Climate CCL integration."""
\ No newline at end of file
+"""The Climate CCL integration."""
+import asyncio
+import logging
+from time import perf_counter
+
+from .const import DATA_ENTRY_SETUP, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Platforms of a config entry, the sensors need the thermostat first
+PLATFORMS = ["climate", "sensor"]
+
+
+def entry_config(data, *options):
+    """Return the config of an entry, options over data, without the removed.
+
+    An option set to None removes the entity of the data it overrides.
+    """
+    config = dict(data)
+    for values in options:
+        config.update(values)
+    return {key: value for key, value in config.items() if value is not None}
+
+
+async def async_setup(hass, config):
+    """Set up the integration, the YAML thermostats are climate platforms."""
+    return True
+
+
+async def async_setup_entry(hass, entry):
+    """Set up a thermostat from a config entry."""
+    # Not awaited, the climate component may still be waiting for this one
+    setup = hass.async_create_task(_async_forward_setup(hass, entry))
+    remove_listener = entry.add_update_listener(async_reload_entry)
+    hass.data.setdefault(DATA_ENTRY_SETUP, {})[entry.entry_id] = (
+        setup, remove_listener)
+    return True
+
+
+async def _async_forward_setup(hass, entry):
+    """Set up the platforms of an entry in order."""
+    for platform in PLATFORMS:
+        await hass.config_entries.async_forward_entry_setup(entry, platform)
+
+
+async def async_unload_entry(hass, entry):
+    """Unload a thermostat, its controller state is handed to the next setup."""
+    setup = hass.data.get(DATA_ENTRY_SETUP, {}).pop(entry.entry_id, None)
+    if setup is not None:
+        setup[1]()
+        # Unloaded during startup, the platforms must be loaded first
+        await asyncio.wait([setup[0]])
+    unloaded = True
+    for platform in reversed(PLATFORMS):
+        unloaded = await hass.config_entries.async_forward_entry_unload(
+            entry, platform) and unloaded
+    return unloaded
+
+
+async def async_reload_entry(hass, entry):
+    """Reload a thermostat after its options changed."""
+    started = perf_counter()
+    await hass.config_entries.async_reload(entry.entry_id)
+    setup = hass.data.get(DATA_ENTRY_SETUP, {}).get(entry.entry_id)
+    if setup is not None:
+        await setup[0]
+    elapsed = perf_counter() - started
+    _LOGGER.info("Reloaded %s in %.3f s", entry.title, elapsed)
+    thermostat = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if thermostat is not None:
+        thermostat.async_set_reload_time(elapsed)
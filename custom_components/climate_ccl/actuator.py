@@ -0,0 +1,189 @@
+"""Actuator dispatch for the CCL thermostat."""
+import asyncio
+from collections import OrderedDict
+from datetime import timedelta
+import random
+
+from homeassistant.components.input_select import ATTR_OPTION, SERVICE_SELECT_OPTION
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    SERVICE_TURN_OFF,
+    SERVICE_TURN_ON,
+    STATE_ON,
+)
+from homeassistant.core import DOMAIN as HA_DOMAIN, split_entity_id
+import homeassistant.util.dt as dt_util
+
+INPUT_SELECT_DOMAIN = "input_select"
+
+# Delays between the retries of a drifted or failed actuator, the first one
+# longer than the polling of the stove status
+RETRY_DELAY = timedelta(seconds=90)
+RETRY_MAX_DELAY = timedelta(minutes=10)
+# Share of a retry delay drawn at random, so retries do not line up
+RETRY_JITTER = 0.2
+
+
+class DispatchResult:
+    """Outcome of one actuator dispatch."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.sent = 0
+        self.skipped = 0
+        self.merged = 0
+        self.drift = 0
+        self.pending = 0
+        self.actions = []
+
+    def __repr__(self):
+        """Return the counters for logging."""
+        return "<DispatchResult sent={} skipped={} merged={} drift={}>".format(
+            self.sent, self.skipped, self.merged, self.drift
+        )
+
+
+class Backoff:
+    """Exponential retry delays with jitter."""
+
+    def __init__(self, delay=RETRY_DELAY, max_delay=RETRY_MAX_DELAY,
+                 jitter=RETRY_JITTER):
+        """Initialize the backoff, delays are timedeltas."""
+        self.delay = delay
+        self._max_delay = max_delay.total_seconds()
+        self._jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self):
+        """Return the seconds before the next attempt and count it."""
+        delay = min(self.delay.total_seconds() * 2 ** self.attempts,
+                    self._max_delay)
+        self.attempts += 1
+        return delay * random.uniform(1 - self._jitter, 1 + self._jitter)
+
+    def reset(self):
+        """Start over after a success."""
+        self.attempts = 0
+
+
+class ActuatorDispatcher:
+    """Bring actuators to a target state, dropping calls that change nothing."""
+
+    def __init__(self, hass, mirror, stats, status_entities=None,
+                 settle=RETRY_DELAY):
+        """Initialize the dispatcher on the mirror of the actuator states.
+
+        `status_entities` maps an actuator to the entity reporting the state
+        of its device, when that is not the actuator itself. A device has
+        `settle` to report a command before it counts as drifted.
+        """
+        self.hass = hass
+        self._mirror = mirror
+        self._stats = stats
+        self._status_entities = status_entities or {}
+        self._settle = settle
+        self._sent_at = {}
+
+    async def async_dispatch(self, helpers, heater=None, reconcile=False):
+        """Send the calls needed to reach the helper and heater targets.
+
+        `helpers` is a list of (entity_id, target) pairs and `heater` a single
+        pair. Helpers are independent of each other and updated concurrently.
+        The heater is commanded last so the helpers already describe the
+        decision when the stove acts on it. The pass does not wait for the
+        stove, whose switch may take seconds, a failed command shows as drift
+        in the next reconcile pass. With `reconcile` the targets are
+        checked against the state confirmed by the devices instead of the
+        state we last commanded, and only the drifted ones are resent.
+        """
+        result = DispatchResult()
+        targets = OrderedDict()
+        for entity_id, target in helpers:
+            if entity_id is None:
+                continue
+            if entity_id in targets:
+                result.merged += 1
+            targets[entity_id] = target
+
+        if heater is not None and heater[0] in targets:
+            # The heater is also configured as a helper, one call covers both
+            targets.pop(heater[0])
+            result.merged += 1
+
+        calls = []
+        for entity_id, target in targets.items():
+            if self._is_reached(entity_id, target, reconcile, result):
+                result.skipped += 1
+            else:
+                calls.append(self.async_send(entity_id, target))
+                result.actions.append((entity_id, target))
+        if calls:
+            await asyncio.gather(*calls)
+            result.sent += len(calls)
+
+        if heater is not None and heater[0] is not None:
+            entity_id, target = heater
+            if self._is_reached(entity_id, target, reconcile, result):
+                result.skipped += 1
+            else:
+                await self.async_send(entity_id, target, blocking=False)
+                result.sent += 1
+                result.actions.append((entity_id, target))
+
+        return result
+
+    def is_reached(self, entity_id, target):
+        """Return True if the entity already holds the target state."""
+        return self._mirror.is_state(entity_id, target)
+
+    def is_confirmed(self, entity_id, target):
+        """Return True if the device reports the target state."""
+        state = self.hass.states.get(
+            self._status_entities.get(entity_id, entity_id))
+        return state is not None and state.state == target
+
+    def _is_reached(self, entity_id, target, reconcile, result):
+        """Return True if no call is needed, counting drifted actuators."""
+        reached = self.is_reached(entity_id, target)
+        if not reconcile:
+            return reached
+        if self.is_confirmed(entity_id, target):
+            return True
+        if not reached:
+            return False
+        sent_at = self._sent_at.get(entity_id)
+        if sent_at is not None and dt_util.utcnow() - sent_at < self._settle:
+            # The device may not have reported the command yet
+            result.pending += 1
+            return True
+        # Commanded, but the device is not in that state
+        result.drift += 1
+        return False
+
+    async def async_send(self, entity_id, target, blocking=True):
+        """Call the service bringing one entity to its target.
+
+        Without `blocking` the call is only scheduled and its errors are
+        logged by Home Assistant.
+        """
+        if split_entity_id(entity_id)[0] == INPUT_SELECT_DOMAIN:
+            domain = INPUT_SELECT_DOMAIN
+            service = SERVICE_SELECT_OPTION
+            data = {ATTR_ENTITY_ID: entity_id, ATTR_OPTION: target}
+        else:
+            domain = HA_DOMAIN
+            service = SERVICE_TURN_ON if target == STATE_ON else SERVICE_TURN_OFF
+            data = {ATTR_ENTITY_ID: entity_id}
+        # Record the target first, the state change listeners run before the
+        # call returns and must see it as the echo of our own call
+        previous = self._mirror.get(entity_id)
+        self._mirror.async_set(entity_id, target)
+        self._sent_at[entity_id] = dt_util.utcnow()
+        started = self._stats.clock()
+        try:
+            await self.hass.services.async_call(
+                domain, service, data, blocking=blocking)
+        except Exception:
+            self._mirror.async_set(entity_id, previous)
+            raise
+        self._stats.record_service_call(entity_id, started)
@@ -0,0 +1,122 @@
+"""Event loop cost of the CCL platform with many thermostats.
+
+Sets up N thermostats on the simulator stand-ins, each with its own sensor and
+actuators, and replays the same virtual period for every N. Each thermostat
+gets a sensor reading per minute and a keep-alive tick.
+
+    python -m custom_components.climate_ccl.benchmark 1 50 500
+
+For each N it prints the state_changed listeners and live timers left on the
+bus and the clock, the listener calls and timer wakeups during the replay,
+and the wall time per virtual minute.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import timedelta
+from time import perf_counter
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_START,
+    EVENT_STATE_CHANGED,
+    TEMP_CELSIUS,
+)
+
+from . import climate
+from .simulator import (
+    DEFAULT_CONFIG,
+    SimHass,
+    async_create_thermostat,
+    register_actuators,
+    synthetic_trace,
+    virtual_time,
+)
+
+KEEP_ALIVE = {"minutes": 3}
+
+
+def thermostat_config(index):
+    """Return the climate_ccl entry of the thermostat of a room."""
+    room = "room_{}".format(index)
+    return climate.PLATFORM_SCHEMA(
+        dict(
+            DEFAULT_CONFIG,
+            name=room,
+            heater="switch.{}".format(room),
+            target_sensor="sensor.{}_temperature".format(room),
+            heat="input_boolean.{}_on".format(room),
+            regulation="input_boolean.{}_regulation".format(room),
+            state="input_select.{}_state".format(room),
+            keep_alive=KEEP_ALIVE,
+        )
+    )
+
+
+async def async_benchmark(count, minutes):
+    """Replay minutes of readings through count thermostats."""
+    samples = synthetic_trace(minutes / 1440)
+    hass = SimHass(samples[0].time)
+    with virtual_time(hass.clock):
+        register_actuators(hass)
+        configs = [thermostat_config(index) for index in range(count)]
+        for config in configs:
+            thermostat = await async_create_thermostat(hass, config)
+            await thermostat.async_added_to_hass()
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_START)
+        await hass.async_block_till_done()
+
+        listeners = hass.bus.listener_count(EVENT_STATE_CHANGED)
+        timers = hass.clock.pending
+        hass.bus.calls = 0
+        hass.clock.fired = 0
+        started = perf_counter()
+        for sample in samples:
+            while True:
+                due = hass.clock.pop_due(sample.time)
+                if due is None:
+                    break
+                hass.clock.now, action = due
+                hass.async_run_job(action, hass.clock.now)
+                await hass.async_block_till_done()
+            hass.clock.now = sample.time
+            for index, config in enumerate(configs):
+                # Spread the rooms around the same daily swing
+                hass.states.async_set(
+                    config[climate.CONF_SENSOR],
+                    sample.temperature + (index % 8) / 16,
+                    {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS},
+                )
+            await hass.async_block_till_done()
+        wall_time = perf_counter() - started
+
+    return {
+        "thermostats": count,
+        "state_changed_listeners": listeners,
+        "live_timers": timers,
+        "listener_calls": hass.bus.calls,
+        "timer_wakeups": hass.clock.fired,
+        "wall_time": round(wall_time, 3),
+        "ms_per_virtual_minute": round(1000 * wall_time / len(samples), 3),
+    }
+
+
+def main(argv=None):
+    """Run the benchmark and print one JSON line per thermostat count."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "counts", nargs="*", type=int, default=[1, 50, 500], help="thermostats"
+    )
+    parser.add_argument(
+        "--minutes", type=int, default=60, help="virtual minutes to replay"
+    )
+    args = parser.parse_args(argv)
+
+    for count in args.counts:
+        result = asyncio.run(async_benchmark(count, args.minutes))
+        sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
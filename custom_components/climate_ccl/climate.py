@@ -1,11 +1,18 @@
 """"Adds support for generic thermostat units."""
 import asyncio
+from datetime import timedelta
 import logging
 
 import voluptuous as vol
 
-from homeassistant.components.climate import PLATFORM_SCHEMA, ClimateDevice
+from homeassistant.components.climate import (
+    ENTITY_ID_FORMAT,
+    PLATFORM_SCHEMA,
+    ClimateDevice,
+)
 from homeassistant.components.climate.const import (
+    ATTR_CURRENT_TEMPERATURE,
+    ATTR_HVAC_MODE,
     ATTR_PRESET_MODE,
     CURRENT_HVAC_COOL,
     CURRENT_HVAC_HEAT,
@@ -27,64 +34,231 @@ from homeassistant.const import (
     PRECISION_HALVES,
     PRECISION_TENTHS,
     PRECISION_WHOLE,
-    SERVICE_TURN_OFF,
-    SERVICE_TURN_ON,
+    STATE_OFF,
     STATE_ON,
+    STATE_UNAVAILABLE,
     STATE_UNKNOWN,
 )
-#CCL import
-from homeassistant.components.input_select import (
-    ATTR_OPTION,
-    SERVICE_SELECT_OPTION,
-)
-
-from homeassistant.core import DOMAIN as HA_DOMAIN, callback
-from homeassistant.helpers import condition
+from homeassistant.core import CoreState, callback
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.event import (
-    async_track_state_change,
-    async_track_time_interval,
-)
+from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity import async_generate_entity_id
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.temperature import display_temp
+import homeassistant.util.dt as dt_util
+from homeassistant.util import slugify
+
+from . import entry_config
+from .actuator import (
+    RETRY_DELAY,
+    RETRY_MAX_DELAY,
+    ActuatorDispatcher,
+    Backoff,
+)
+from .coordinator import async_get_coordinator
+from .const import (
+    ATTR_COUNT,
+    ATTR_FILENAME,
+    CONF_AWAY_TEMP,
+    CONF_COLD_TOLERANCE,
+    CONF_DIAGNOSTICS,
+    CONF_FUEL_UNIT,
+    CONF_HEAT,
+    CONF_HEATER,
+    CONF_HEATER_STATUS,
+    CONF_HOT_TOLERANCE,
+    CONF_MAX_TEMP,
+    CONF_MIN_DUR,
+    CONF_MIN_TEMP,
+    CONF_OUTDOOR_SENSOR,
+    CONF_REGULATION,
+    CONF_REGULATION_DELTA,
+    CONF_REGULATION_DURATION,
+    CONF_REGULATION_NB_DURATION,
+    CONF_RUNTIME_SENSORS,
+    CONF_SCHEDULE_CALENDAR,
+    CONF_SENSOR,
+    CONF_STATE,
+    CONF_TARGET_TEMP,
+    CONF_TRACE_SIZE,
+    DATA_HANDOVER,
+    DEFAULT_FUEL_UNIT,
+    DEFAULT_NAME,
+    DEFAULT_TOLERANCE,
+    DEFAULT_TRACE_SIZE,
+    DOMAIN,
+    EVENT_STATS,
+    SERVICE_APPLY,
+    SERVICE_DUMP_STATS,
+    SERVICE_DUMP_TRACE,
+    SIGNAL_THERMOSTAT_UPDATED,
+)
+from .estimator import TrendEstimator
+from .evaluator import CoalescingEvaluator
+from .logic import (
+    HVAC_MODE_IDLE,
+    HVAC_MODE_REGULATION,
+    decide,
+    min_cycle_allowed_at,
+)
+from .mirror import StateMirror
+from .regulation import DutyCycleScheduler, regulation_times
+from .runtime import RuntimeMeter
+from .schedule import SCHEDULE_ENTRY_SCHEMA, ScheduleEngine, Setpoint
+from .stats import NullStats, ThermostatStats
+from .thermal import ThermalModel
+from .timeseries import TimeSeries
+from .window import DEFAULT_SAMPLES as DEFAULT_WINDOW_SAMPLES, WindowDetector
+from .zones import AGGREGATION_MEAN, AGGREGATIONS, ZONE_SCHEMA, ZoneGroup
+from .store import (
+    ATTR_ACTIVE,
+    ATTR_HEATER_ON,
+    ATTR_LAST_TRANSITION,
+    ATTR_NEXT_EDGE,
+    ATTR_REGULATION_CYCLE,
+    ATTR_RUNTIME,
+    ATTR_THERMAL_MODEL,
+    async_get_controller_store,
+)
+from .trace import (
+    TRACE_EVALUATION,
+    TRACE_MIN_CYCLE,
+    TRACE_REGULATION,
+    DecisionTrace,
+    write_trace,
+)
+from .sensor_filter import (
+    FILTER_EXPONENTIAL,
+    FILTER_MEDIAN,
+    FILTER_NONE,
+    create_filter,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-DEFAULT_TOLERANCE = 0.3
-#DEFAULT_NAME = "Generic Thermostat"
-DEFAULT_NAME = "CCL Generic Thermostat"
-
-CONF_HEATER = "heater"
-CONF_SENSOR = "target_sensor"
-CONF_MIN_TEMP = "min_temp"
-CONF_MAX_TEMP = "max_temp"
-CONF_TARGET_TEMP = "target_temp"
 CONF_AC_MODE = "ac_mode"
-CONF_MIN_DUR = "min_cycle_duration"
-CONF_COLD_TOLERANCE = "cold_tolerance"
-CONF_HOT_TOLERANCE = "hot_tolerance"
 CONF_KEEP_ALIVE = "keep_alive"
 CONF_INITIAL_HVAC_MODE = "initial_hvac_mode"
-CONF_AWAY_TEMP = "away_temp"
 CONF_PRECISION = "precision"
 SUPPORT_FLAGS = SUPPORT_TARGET_TEMPERATURE
 
 
 #Const CCL
-CONF_HEAT =  'heat'
-CONF_REGULATION =  'regulation'
-CONF_STATE =  'state'
-CONF_REGULATION_DURATION = 'regulation_duration'
-CONF_REGULATION_NB_DURATION = 'regulation_nb_duration'
-CONF_REGULATION_DELTA = 'regulation_delta'
-HVAC_MODE_IDLE = "standby"
+CONF_REGULATION_ON_TIME = 'regulation_on_time'
+CONF_REGULATION_OFF_TIME = 'regulation_off_time'
+CONF_SENSOR_FILTER = 'sensor_filter'
+CONF_SENSOR_FILTER_ALPHA = 'sensor_filter_alpha'
+CONF_SENSOR_FILTER_WINDOW = 'sensor_filter_window'
+CONF_SENSOR_DEADBAND = 'sensor_deadband'
+CONF_MIN_EVALUATION_INTERVAL = 'min_evaluation_interval'
+CONF_PUBLISH_DELAY = 'publish_delay'
+CONF_WARM_START_MAX_AGE = 'warm_start_max_age'
+CONF_SCHEDULE = 'schedule'
+CONF_ESTIMATOR = 'estimator'
+CONF_ESTIMATOR_HORIZON = 'estimator_horizon'
+DEFAULT_ESTIMATOR_HORIZON = timedelta(minutes=15)
+CONF_OPTIMUM_START = 'optimum_start'
+CONF_MAX_PREHEAT = 'max_preheat'
+DEFAULT_MAX_PREHEAT = timedelta(hours=3)
+CONF_RETRY_DELAY = 'retry_delay'
+CONF_RETRY_MAX_DELAY = 'retry_max_delay'
+CONF_BURN_RATE = 'burn_rate'
+# Period of the runtime and diagnostic sensor updates between transitions
+SENSOR_REFRESH = timedelta(minutes=5)
+CONF_ZONES = 'zones'
+CONF_ZONE_AGGREGATION = 'zone_aggregation'
+CONF_ZONE_BATCH = 'zone_batch'
+DEFAULT_ZONE_BATCH = timedelta(seconds=2)
+CONF_SERIES = 'series'
+CONF_SERIES_INTERVAL = 'series_interval'
+CONF_SERIES_RETENTION = 'series_retention'
+DEFAULT_SERIES_INTERVAL = timedelta(minutes=1)
+DEFAULT_SERIES_RETENTION = timedelta(days=730)
+# Directory of the time series, a subdirectory per thermostat
+SERIES_DIRECTORY = 'climate_ccl_series'
+CONF_WINDOW_DROP_RATE = 'window_drop_rate'
+CONF_WINDOW_SAMPLES = 'window_samples'
+CONF_WINDOW_HOLD = 'window_hold'
+DEFAULT_WINDOW_HOLD = timedelta(minutes=15)
+# Heater held in standby after a fast temperature drop
+PRESET_WINDOW_OPEN = 'window_open'
+DEFAULT_WARM_START_MAX_AGE = timedelta(minutes=10)
+ATTR_PUBLISHED_WRITES = 'published_writes'
+ATTR_SUPPRESSED_WRITES = 'suppressed_writes'
+ATTR_EVALUATION_QUEUE_DEPTH = 'evaluation_queue_depth'
+ATTR_MERGED_EVALUATIONS = 'merged_evaluations'
+ATTR_EVALUATION_WAIT = 'evaluation_wait'
+ATTR_TEMPERATURE_AGE = 'temperature_age'
+ATTR_FIRST_DECISION_DELAY = 'first_decision_delay'
+ATTR_SCHEDULE_NEXT_TRANSITION = 'schedule_next_transition'
+ATTR_ESTIMATED_TEMPERATURE = 'estimated_temperature'
+ATTR_HEATING_RATE = 'heating_rate'
+ATTR_COOLING_RATE = 'cooling_rate'
+ATTR_THERMAL_LOSS_RATE = 'thermal_loss_rate'
+ATTR_THERMAL_HEATING_RATE = 'thermal_heating_rate'
+ATTR_PREHEAT_LEAD_TIME = 'preheat_lead_time'
+ATTR_PREHEAT_START = 'preheat_start'
+ATTR_ACTUATOR_DRIFT = 'actuator_drift'
+ATTR_ACTUATOR_FAILURES = 'actuator_failures'
+ATTR_ZONES = 'zones'
+ATTR_RELOAD_TIME = 'reload_time'
+ATTR_OPEN_WINDOW = 'open_window'
+ATTR_TEMPERATURE_SLOPE = 'temperature_slope'
+# Keys of the readings handed over a reload
+ATTR_TEMPERATURE_TIME = 'temperature_time'
+ATTR_OUTDOOR_TEMPERATURE = 'outdoor_temperature'
+# Diagnostic attributes, a change of these alone is not published
+DIAGNOSTIC_ATTRS = (
+    ATTR_PUBLISHED_WRITES,
+    ATTR_SUPPRESSED_WRITES,
+    ATTR_EVALUATION_QUEUE_DEPTH,
+    ATTR_MERGED_EVALUATIONS,
+    ATTR_EVALUATION_WAIT,
+    ATTR_TEMPERATURE_AGE,
+    ATTR_FIRST_DECISION_DELAY,
+    ATTR_ESTIMATED_TEMPERATURE,
+    ATTR_HEATING_RATE,
+    ATTR_COOLING_RATE,
+    ATTR_TEMPERATURE_SLOPE,
+)
 CURRENT_HVAC_REGULATION = 'reguling'
-HVAC_MODE_REGULATION = 'regulation'
+HVAC_MODES_APPLIED = (
+    HVAC_MODE_HEAT,
+    HVAC_MODE_COOL,
+    HVAC_MODE_REGULATION,
+    HVAC_MODE_IDLE,
+    HVAC_MODE_OFF,
+)
+PRESET_MODES_APPLIED = (PRESET_AWAY, PRESET_NONE)
 #fin const CCL
 
-PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
+SERVICE_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTITY_ID): cv.comp_entity_ids})
+
+APPLY_SCHEMA = vol.All(
+    cv.has_at_least_one_key(ATTR_TEMPERATURE, ATTR_HVAC_MODE, ATTR_PRESET_MODE),
+    vol.Schema(
+        {
+            vol.Required(ATTR_ENTITY_ID): cv.comp_entity_ids,
+            vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+            vol.Optional(ATTR_HVAC_MODE): vol.In(HVAC_MODES_APPLIED),
+            vol.Optional(ATTR_PRESET_MODE): vol.In(PRESET_MODES_APPLIED),
+        }
+    ),
+)
+
+DUMP_TRACE_SCHEMA = SERVICE_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_FILENAME): cv.string,
+        vol.Optional(ATTR_COUNT): cv.positive_int,
+    }
+)
+
+PLATFORM_SCHEMA = vol.All(PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_HEATER): cv.entity_id,
-        vol.Required(CONF_SENSOR): cv.entity_id,
+        vol.Optional(CONF_SENSOR): cv.entity_id,
         vol.Optional(CONF_AC_MODE): cv.boolean,
         vol.Optional(CONF_MAX_TEMP): vol.Coerce(float),
         vol.Optional(CONF_MIN_DUR): vol.All(cv.time_period, cv.positive_timedelta),
@@ -110,11 +284,105 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
             cv.time_period, cv.positive_timedelta),
         vol.Optional(CONF_REGULATION_NB_DURATION): vol.Coerce(int),
         vol.Optional(CONF_REGULATION_DELTA): vol.Coerce(float),
+        # Set together, a phase left out would never end
+        vol.Inclusive(CONF_REGULATION_ON_TIME, "regulation_times"): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Inclusive(CONF_REGULATION_OFF_TIME, "regulation_times"): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_SENSOR_FILTER, default=FILTER_NONE): vol.In(
+            [FILTER_NONE, FILTER_EXPONENTIAL, FILTER_MEDIAN]),
+        vol.Optional(CONF_SENSOR_FILTER_ALPHA, default=0.5): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False, max=1)),
+        vol.Optional(CONF_SENSOR_FILTER_WINDOW, default=3): vol.All(
+            vol.Coerce(int), vol.Range(min=1)),
+        # Only evaluate when the reading crosses a decision threshold
+        vol.Optional(CONF_SENSOR_DEADBAND, default=False): cv.boolean,
+        # Rate limit for the evaluations of readings not crossing a threshold
+        vol.Optional(CONF_MIN_EVALUATION_INTERVAL): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        # Window combining bursts of state changes into one publish
+        vol.Optional(CONF_PUBLISH_DELAY): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_DIAGNOSTICS, default=False): cv.boolean,
+        # Number of decisions kept for climate_ccl.dump_trace
+        vol.Optional(CONF_TRACE_SIZE, default=DEFAULT_TRACE_SIZE): vol.All(
+            vol.Coerce(int), vol.Range(min=1)),
+        # Oldest last known reading used to decide right after a restart
+        vol.Optional(CONF_WARM_START_MAX_AGE,
+                     default=DEFAULT_WARM_START_MAX_AGE): cv.time_period,
+        # Weekly setpoints, and a calendar whose events are like "19 #heat"
+        vol.Optional(CONF_SCHEDULE): vol.All(
+            cv.ensure_list, [SCHEDULE_ENTRY_SCHEMA]),
+        vol.Optional(CONF_SCHEDULE_CALENDAR): cv.entity_id,
+        # Decide on the temperature extrapolated between readings
+        vol.Optional(CONF_ESTIMATOR, default=False): cv.boolean,
+        vol.Optional(CONF_ESTIMATOR_HORIZON,
+                     default=DEFAULT_ESTIMATOR_HORIZON): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        # Learn a thermal model of the room against the outdoor temperature
+        vol.Optional(CONF_OUTDOOR_SENSOR): cv.entity_id,
+        vol.Optional(CONF_OPTIMUM_START, default=False): cv.boolean,
+        vol.Optional(CONF_MAX_PREHEAT, default=DEFAULT_MAX_PREHEAT): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        # Entity reporting the state of the stove, the heater by default
+        vol.Optional(CONF_HEATER_STATUS): cv.entity_id,
+        vol.Optional(CONF_RETRY_DELAY, default=RETRY_DELAY): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_RETRY_MAX_DELAY, default=RETRY_MAX_DELAY): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        # Runtime, cycle and fuel sensors, fuel used per hour of heating
+        vol.Optional(CONF_RUNTIME_SENSORS, default=False): cv.boolean,
+        vol.Optional(CONF_BURN_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_FUEL_UNIT, default=DEFAULT_FUEL_UNIT): cv.string,
+        # Rooms sharing the heater, in place of target_sensor
+        vol.Optional(CONF_ZONES): vol.All(
+            cv.ensure_list, vol.Length(min=1), [ZONE_SCHEMA]),
+        vol.Optional(CONF_ZONE_AGGREGATION, default=AGGREGATION_MEAN): vol.In(
+            AGGREGATIONS),
+        # Window combining the zone readings into one control pass
+        vol.Optional(CONF_ZONE_BATCH, default=DEFAULT_ZONE_BATCH): cv.time_period,
+        # Local time series of the samples, see timeseries.py
+        vol.Optional(CONF_SERIES, default=False): cv.boolean,
+        vol.Optional(CONF_SERIES_INTERVAL, default=DEFAULT_SERIES_INTERVAL): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_SERIES_RETENTION,
+                     default=DEFAULT_SERIES_RETENTION): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        # Hold the heater when the temperature falls faster, in °C per hour
+        vol.Optional(CONF_WINDOW_DROP_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)),
+        vol.Optional(CONF_WINDOW_SAMPLES, default=DEFAULT_WINDOW_SAMPLES): vol.All(
+            vol.Coerce(int), vol.Range(min=2)),
+        vol.Optional(CONF_WINDOW_HOLD, default=DEFAULT_WINDOW_HOLD): vol.All(
+            cv.time_period, cv.positive_timedelta),
     }
-)
+), cv.has_at_least_one_key(CONF_SENSOR, CONF_ZONES))
 
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the generic thermostat platform."""
+    _async_setup_thermostat(hass, config, async_add_entities)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the thermostat of a config entry, its options over its data."""
+    try:
+        config = PLATFORM_SCHEMA(dict(
+            entry_config(config_entry.data, config_entry.options),
+            platform=DOMAIN))
+    except vol.Invalid as ex:
+        _LOGGER.error("Invalid configuration of %s: %s", config_entry.title, ex)
+        return
+    _async_setup_thermostat(hass, config, async_add_entities, config_entry)
+
+
+@callback
+def _async_setup_thermostat(hass, config, async_add_entities, config_entry=None):
+    """Create and add a thermostat.
+
+    The sensors of a config entry are set up by forwarding the entry, the
+    ones of a YAML thermostat by discovery.
+    """
     name = config.get(CONF_NAME)
     heater_entity_id = config.get(CONF_HEATER)
     sensor_entity_id = config.get(CONF_SENSOR)
@@ -138,35 +406,206 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     regulation_duration = config.get(CONF_REGULATION_DURATION)
     regulation_nb_duration = config.get(CONF_REGULATION_NB_DURATION)
     regulation_delta = config.get(CONF_REGULATION_DELTA)
+    regulation_on_time = config.get(CONF_REGULATION_ON_TIME)
+    regulation_off_time = config.get(CONF_REGULATION_OFF_TIME)
+    sensor_filter = create_filter(
+        config.get(CONF_SENSOR_FILTER),
+        config.get(CONF_SENSOR_FILTER_ALPHA),
+        config.get(CONF_SENSOR_FILTER_WINDOW),
+    )
+    sensor_deadband = config.get(CONF_SENSOR_DEADBAND)
+    min_evaluation_interval = config.get(CONF_MIN_EVALUATION_INTERVAL)
+    publish_delay = config.get(CONF_PUBLISH_DELAY)
+    diagnostics = config.get(CONF_DIAGNOSTICS)
+    stats = ThermostatStats() if diagnostics else NullStats()
+    trace = DecisionTrace(config.get(CONF_TRACE_SIZE))
+    coordinator = async_get_coordinator(hass)
+    store = async_get_controller_store(hass)
+    warm_start_max_age = config.get(CONF_WARM_START_MAX_AGE)
+    schedule = config.get(CONF_SCHEDULE)
+    schedule_calendar = config.get(CONF_SCHEDULE_CALENDAR)
+    estimator = TrendEstimator(config.get(CONF_ESTIMATOR_HORIZON)) \
+        if config.get(CONF_ESTIMATOR) else None
+    outdoor_sensor_entity_id = config.get(CONF_OUTDOOR_SENSOR)
+    optimum_start = config.get(CONF_OPTIMUM_START)
+    max_preheat = config.get(CONF_MAX_PREHEAT)
+    heater_status_entity_id = config.get(CONF_HEATER_STATUS)
+    retry_backoff = Backoff(
+        config.get(CONF_RETRY_DELAY), config.get(CONF_RETRY_MAX_DELAY))
+    runtime_sensors = config.get(CONF_RUNTIME_SENSORS)
+    runtime = RuntimeMeter(config.get(CONF_BURN_RATE)) if runtime_sensors else None
+    zones = ZoneGroup(config[CONF_ZONES], config.get(CONF_ZONE_AGGREGATION)) \
+        if config.get(CONF_ZONES) else None
+    zone_batch = config.get(CONF_ZONE_BATCH)
+    series = TimeSeries(
+        hass.config.path(SERIES_DIRECTORY, slugify(name)),
+        config.get(CONF_SERIES_RETENTION),
+    ) if config.get(CONF_SERIES) else None
+    series_interval = config.get(CONF_SERIES_INTERVAL)
+    window = WindowDetector(
+        config[CONF_WINDOW_DROP_RATE], config.get(CONF_WINDOW_HOLD),
+        config.get(CONF_WINDOW_SAMPLES),
+    ) if config.get(CONF_WINDOW_DROP_RATE) else None
+
+    # One thermostat per heater, the rooms of a shared stove are its zones
+    thermostats = hass.data.setdefault(DOMAIN, {})
+    for other in thermostats.values():
+        if other.name == name:
+            # The name also names the sensors and the time series
+            _LOGGER.error("A thermostat named %s is already set up", name)
+            return
+        if other.heater_entity_id == heater_entity_id:
+            _LOGGER.error(
+                "Heater %s of %s is already controlled by %s, "
+                "configure the rooms as zones of one thermostat",
+                heater_entity_id, name, other.name)
+            return
 
+    thermostat = CCLGenericThermostat(
+        name,
+        heater_entity_id,
+        sensor_entity_id,
+        min_temp,
+        max_temp,
+        target_temp,
+        ac_mode,
+        min_cycle_duration,
+        cold_tolerance,
+        hot_tolerance,
+        keep_alive,
+        initial_hvac_mode,
+        away_temp,
+        precision,
+        unit,
+        #Add conf CCL
+        heat_entity_id,
+        regulation_entity_id,
+        state_entity_id,
+        regulation_duration,
+        regulation_nb_duration,
+        regulation_delta,
+        regulation_on_time,
+        regulation_off_time,
+        sensor_filter,
+        sensor_deadband,
+        min_evaluation_interval,
+        publish_delay,
+        stats,
+        trace,
+        coordinator,
+        store,
+        warm_start_max_age,
+        schedule,
+        schedule_calendar,
+        estimator,
+        outdoor_sensor_entity_id,
+        optimum_start,
+        max_preheat,
+        heater_status_entity_id,
+        retry_backoff,
+        runtime,
+        zones,
+        zone_batch,
+        config_entry.entry_id if config_entry is not None else None,
+        series,
+        series_interval,
+        window
+    )
 
-    async_add_entities(
-        [
-            CCLGenericThermostat(
-                name,
-                heater_entity_id,
-                sensor_entity_id,
-                min_temp,
-                max_temp,
-                target_temp,
-                ac_mode,
-                min_cycle_duration,
-                cold_tolerance,
-                hot_tolerance,
-                keep_alive,
-                initial_hvac_mode,
-                away_temp,
-                precision,
-                unit,
-                #Add conf CCL
-                heat_entity_id,
-                regulation_entity_id,
-                state_entity_id,
-                regulation_duration,
-                regulation_nb_duration,
-                regulation_delta
+    # Registered by unique ID, or by the entity ID given up front to a YAML
+    # thermostat, since the entity registry assigns it to an entry one
+    if config_entry is not None:
+        key = config_entry.entry_id
+    else:
+        key = thermostat.entity_id = async_generate_entity_id(
+            ENTITY_ID_FORMAT, name,
+            list(thermostats) + hass.states.async_entity_ids(), hass)
+    thermostats[key] = thermostat
+    async_add_entities([thermostat])
+
+    if config_entry is None and (diagnostics or runtime_sensors):
+        hass.async_create_task(
+            async_load_platform(hass, "sensor", DOMAIN, {
+                ATTR_ENTITY_ID: key,
+                CONF_NAME: name,
+                CONF_DIAGNOSTICS: diagnostics,
+                CONF_RUNTIME_SENSORS: runtime_sensors,
+                CONF_FUEL_UNIT: config.get(CONF_FUEL_UNIT),
+            }, config)
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_DUMP_STATS):
+        _async_register_services(hass)
+
+
+@callback
+def _async_thermostats(hass, call):
+    """Return the thermostats targeted by a service call."""
+    entity_ids = call.data.get(ATTR_ENTITY_ID)
+    return [
+        thermostat for thermostat in hass.data.get(DOMAIN, {}).values()
+        if entity_ids is None or thermostat.entity_id in entity_ids
+    ]
+
+
+@callback
+def _async_register_services(hass):
+    """Register the services of the platform."""
+
+    async def async_dump_stats(call):
+        """Log the statistics of the thermostats and fire them as events."""
+        for thermostat in _async_thermostats(hass, call):
+            stats = thermostat.stats.as_dict()
+            if not stats:
+                _LOGGER.warning("Diagnostics are disabled for %s",
+                                thermostat.entity_id)
+                continue
+            _LOGGER.warning("Statistics of %s: %s", thermostat.entity_id, stats)
+            hass.bus.async_fire(
+                EVENT_STATS, dict(stats, **{ATTR_ENTITY_ID: thermostat.entity_id})
             )
-        ]
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_DUMP_STATS, async_dump_stats, schema=SERVICE_SCHEMA
+    )
+
+    async def async_apply(call):
+        """Apply the settings to the thermostats, concurrently."""
+        settings = {
+            key: value for key, value in call.data.items()
+            if key != ATTR_ENTITY_ID
+        }
+        thermostats = _async_thermostats(hass, call)
+        if thermostats:
+            await asyncio.gather(
+                *(thermostat.async_apply(**settings) for thermostat in thermostats)
+            )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY, async_apply, schema=APPLY_SCHEMA
+    )
+
+    async def async_dump_trace(call):
+        """Write the last decisions of the thermostats as JSON lines."""
+        count = call.data.get(ATTR_COUNT)
+        traces = {
+            thermostat.entity_id: thermostat.trace.events(count)
+            for thermostat in _async_thermostats(hass, call)
+        }
+        filename = call.data.get(ATTR_FILENAME)
+        if filename is None:
+            path = hass.config.path("{}_trace.jsonl".format(DOMAIN))
+        else:
+            path = hass.config.path(filename)
+            if not hass.config.is_allowed_path(path):
+                _LOGGER.error("Not allowed to write the trace to %s", path)
+                return
+        await hass.async_add_executor_job(write_trace, path, traces)
+        _LOGGER.warning("Wrote %s decisions to %s",
+                        sum(len(events) for events in traces.values()), path)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_DUMP_TRACE, async_dump_trace, schema=DUMP_TRACE_SCHEMA
     )
 
 class CCLGenericThermostat(ClimateDevice, RestoreEntity):
@@ -195,7 +634,33 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         state_entity_id,
         regulation_duration,
         regulation_nb_duration,
-        regulation_delta
+        regulation_delta,
+        regulation_on_time,
+        regulation_off_time,
+        sensor_filter,
+        sensor_deadband,
+        min_evaluation_interval,
+        publish_delay,
+        stats,
+        trace,
+        coordinator,
+        store,
+        warm_start_max_age,
+        schedule,
+        schedule_calendar,
+        estimator,
+        outdoor_sensor_entity_id,
+        optimum_start,
+        max_preheat,
+        heater_status_entity_id,
+        retry_backoff,
+        runtime,
+        zones,
+        zone_batch,
+        unique_id,
+        series,
+        series_interval,
+        window
     ):
         """Initialize the thermostat."""
         self._name = name
@@ -223,7 +688,7 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         self._target_temp = target_temp
         self._unit = unit
         self._support_flags = SUPPORT_FLAGS
-        if away_temp:
+        if away_temp or window is not None:
             self._support_flags = SUPPORT_FLAGS | SUPPORT_PRESET_MODE
         self._away_temp = away_temp
         self._is_away = False
@@ -235,38 +700,188 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         self._regulation_duration = regulation_duration
         self._regulation_nb_duration = regulation_nb_duration
         self._regulation_delta = regulation_delta
-        self._nb_tick_regulation = 0
+        self._regulation_on_time = regulation_on_time
+        self._regulation_off_time = regulation_off_time
+        self._regulation_cycle = None
+        self._last_transition = None
+        self._min_cycle_at = None
+        self._unsub_min_cycle = None
+        self._sensor_filter = sensor_filter
+        self._sensor_deadband = sensor_deadband
+        self._min_evaluation_interval = min_evaluation_interval
+        self._evaluated_band = None
+        self._last_evaluation = None
+        self._unsub_deferred_evaluation = None
+        self._publish_delay = publish_delay
+        self._stats = stats
+        self._trace = trace
+        self._coordinator = coordinator
+        self._store = store
+        self._warm_start_max_age = warm_start_max_age
+        self._cur_temp_time = None
+        self._cur_temp_seeded = False
+        self._added_at = None
+        self._first_decision_delay = None
+        self._schedule_entries = schedule
+        self._schedule_calendar = schedule_calendar
+        self._schedule = None
+        self._estimator = estimator
+        self._unsub_crossing = None
+        self.outdoor_sensor_entity_id = outdoor_sensor_entity_id
+        self._outdoor_temp = None
+        self._thermal = ThermalModel() if outdoor_sensor_entity_id else None
+        self._optimum_start = optimum_start and self._thermal is not None
+        self._max_preheat = max_preheat
+        self._heater_status_entity_id = heater_status_entity_id
+        self._retry_backoff = retry_backoff
+        self._unsub_retry = None
+        self._actuator_drift = 0
+        self._actuator_failures = 0
+        self._runtime = runtime
+        self._zones = zones
+        self._zone_batch = zone_batch
+        self._unique_id = unique_id
+        self._series = series
+        self._series_interval = series_interval
+        self._series_recorded = None
+        self._series_segment = None
+        self._window = window
+        self._unsub_window = None
+        self._reload_time = None
+        self._zone_target = None
+        self._unsub_zone_batch = None
+        self._unsub_listeners = []
+        self._published = None
+        self._published_writes = 0
+        self._suppressed_writes = 0
+        self._unsub_publish = None
+        self._actuator = None
+        self._last_dispatch = None
+        self._mirror = None
+        self._evaluator = None
 
 
     async def async_added_to_hass(self):
         """Run when entity about to be added."""
         await super().async_added_to_hass()
+        self._added_at = dt_util.utcnow()
+        if self._schedule_entries or self._schedule_calendar:
+            self._schedule = ScheduleEngine(
+                self.hass, self._coordinator, self._schedule_entries,
+                self._schedule_calendar, self.async_apply,
+                self._preheat_lead if self._optimum_start else None,
+            )
+        self._mirror = StateMirror(self.hass, [
+            self.heater_entity_id,
+            self.sensor_entity_id,
+            self._heat_entity_id,
+            self._regulation_entity_id,
+            self._state_entity_id,
+            *(self._zones.entity_ids if self._zones is not None else ()),
+        ])
+        self._actuator = ActuatorDispatcher(
+            self.hass, self._mirror, self._stats,
+            {self.heater_entity_id: self._heater_status_entity_id}
+            if self._heater_status_entity_id else None,
+            self._retry_backoff.delay,
+        )
+        self._evaluator = CoalescingEvaluator(self._async_control_heating)
+        self._regulation_cycle = DutyCycleScheduler(
+            self._coordinator, *self._regulation_times, self._async_regulation
+        )
+        heat_state = self.hass.states.get(self._heat_entity_id) \
+            if self._heat_entity_id else None
+        if heat_state is not None:
+            self._last_transition = heat_state.last_changed
+        await self._store.async_load()
+        self._async_restore_controller(self._store.get(self.entity_id))
+        self._async_update_runtime()
+        if self._thermal is not None:
+            self._thermal.set_heating(
+                dt_util.utcnow(),
+                self._mirror.is_state(self.heater_entity_id, STATE_ON))
 
         # Add listener
-        async_track_state_change(
-            self.hass, self.sensor_entity_id, self._async_sensor_changed
-        )
-        async_track_state_change(
-            self.hass, self.heater_entity_id, self._async_switch_changed
+        if self._zones is not None:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_state_change(
+                    self._zones.entity_ids, self._async_zone_changed
+                )
+            )
+        else:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_state_change(
+                    self.sensor_entity_id, self._async_sensor_changed
+                )
+            )
+        self._unsub_listeners.append(
+            self._coordinator.async_track_state_change(
+                self.heater_entity_id, self._async_switch_changed
+            )
         )
+        helper_entity_ids = [
+            entity_id for entity_id in (
+                self._heat_entity_id,
+                self._regulation_entity_id,
+                self._state_entity_id,
+            ) if entity_id is not None
+        ]
+        if self.outdoor_sensor_entity_id is not None:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_state_change(
+                    self.outdoor_sensor_entity_id, self._async_outdoor_changed
+                )
+            )
+        if helper_entity_ids:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_state_change(
+                    helper_entity_ids, self._async_helper_changed
+                )
+            )
 
-        if self._keep_alive:
-            async_track_time_interval(
-                self.hass, self._async_control_heating, self._keep_alive
+        if self._runtime is not None or self._stats.enabled:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_time_interval(
+                    self._async_refresh_sensors, SENSOR_REFRESH
+                )
             )
-        
-        #Add listener CCL
-        if self._regulation_duration:
-            async_track_time_interval(
-                self.hass, self._async_regulation, self._regulation_duration
+
+        if self._series is not None:
+            await self.hass.async_add_executor_job(self._series.open)
+            self._unsub_listeners.append(
+                self._coordinator.async_track_time_interval(
+                    self._async_record_sample, self._series_interval
+                )
+            )
+
+        if self._keep_alive:
+            self._unsub_listeners.append(
+                self._coordinator.async_track_time_interval(
+                    self._async_keep_alive, self._keep_alive
+                )
             )
 
         @callback
         def _async_startup(event):
             """Init on startup."""
-            sensor_state = self.hass.states.get(self.sensor_entity_id)
-            if sensor_state and sensor_state.state != STATE_UNKNOWN:
+            if self.outdoor_sensor_entity_id is not None:
+                self._async_update_outdoor_temp(
+                    self.hass.states.get(self.outdoor_sensor_entity_id))
+            if self._zones is not None:
+                for entity_id in self._zones.entity_ids:
+                    zone_state = self.hass.states.get(entity_id)
+                    if zone_state is not None \
+                            and zone_state.last_updated >= self._added_at:
+                        self._zones.update(entity_id, zone_state.state)
+                self._async_aggregate_zones(dt_util.utcnow())
+            sensor_state = self.hass.states.get(self.sensor_entity_id) \
+                if self.sensor_entity_id else None
+            if sensor_state and sensor_state.state != STATE_UNKNOWN \
+                    and sensor_state.last_updated >= self._added_at:
                 self._async_update_temp(sensor_state)
+            self._async_warm_start()
+            if self._schedule is not None:
+                self.hass.async_create_task(self._schedule.async_start())
 
         self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, _async_startup)
 
@@ -306,7 +921,63 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         # Set default state to off
         if not self._hvac_mode:
             self._hvac_mode = HVAC_MODE_OFF
+
+        if not self._async_take_handover():
+            self._async_seed_temp(old_state)
+        self._async_warm_start()
+        if self._schedule is not None and self.hass.state == CoreState.running:
+            # Added after startup, the calendar is already loaded
+            await self._schedule.async_start()
         
+    async def async_will_remove_from_hass(self):
+        """Run when entity will be removed."""
+        self._async_save_controller()
+        self._async_give_handover()
+        thermostats = self.hass.data.get(DOMAIN, {})
+        for key, thermostat in list(thermostats.items()):
+            if thermostat is self:
+                del thermostats[key]
+        self._async_cancel_crossing()
+        self._async_cancel_retry()
+        self._async_cancel_window()
+        if self._unsub_zone_batch is not None:
+            self._unsub_zone_batch()
+            self._unsub_zone_batch = None
+        if self._schedule is not None:
+            self._schedule.async_stop()
+        while self._unsub_listeners:
+            self._unsub_listeners.pop()()
+        self._regulation_cycle.async_stop()
+        self._async_cancel_min_cycle_check()
+        self._async_cancel_deferred_evaluation()
+        if self._unsub_publish is not None:
+            self._unsub_publish()
+            self._unsub_publish = None
+        if self._series is not None:
+            if self._series_segment is not None:
+                await self._series_segment
+            await self.hass.async_add_executor_job(self._series.close)
+
+    @property
+    def stats(self):
+        """Return the statistics of the thermostat."""
+        return self._stats
+
+    @property
+    def runtime(self):
+        """Return the runtime meter of the thermostat."""
+        return self._runtime
+
+    @property
+    def series(self):
+        """Return the time series of the thermostat."""
+        return self._series
+
+    @property
+    def trace(self):
+        """Return the decision trace of the thermostat."""
+        return self._trace
+
     @property
     def should_poll(self):
         """Return the polling state."""
@@ -317,6 +988,11 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         """Return the name of the thermostat."""
         return self._name
 
+    @property
+    def unique_id(self):
+        """Return the config entry of the thermostat, None from YAML."""
+        return self._unique_id
+
     @property
     def precision(self):
         """Return the precision of the system."""
@@ -371,6 +1047,8 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
     @property
     def preset_mode(self):
         """Return the current preset mode, e.g., home, away, temp."""
+        if self._is_window_open:
+            return PRESET_WINDOW_OPEN
         if self._is_away:
             return PRESET_AWAY
         return None
@@ -378,34 +1056,93 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
     @property
     def preset_modes(self):
         """Return a list of available preset modes."""
+        if not self._away_temp and self._window is None:
+            return None
+        presets = [PRESET_NONE]
         if self._away_temp:
-            return [PRESET_NONE, PRESET_AWAY]
-        return None
+            presets.append(PRESET_AWAY)
+        if self._window is not None:
+            presets.append(PRESET_WINDOW_OPEN)
+        return presets
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set hvac mode."""
+        # CCL : the stove stopped by off waits min_cycle_duration to restart
+        force = self._hvac_mode != HVAC_MODE_OFF
         if hvac_mode == HVAC_MODE_HEAT:
             self._hvac_mode = HVAC_MODE_HEAT
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=force)
         elif hvac_mode == HVAC_MODE_COOL:
             self._hvac_mode = HVAC_MODE_COOL
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=force)
         # Add Regulation CCL
         elif hvac_mode == HVAC_MODE_REGULATION:
             self._hvac_mode = HVAC_MODE_REGULATION
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=force)
         elif hvac_mode == HVAC_MODE_IDLE:
             self._hvac_mode = HVAC_MODE_IDLE
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=force)
         elif hvac_mode == HVAC_MODE_OFF:
             self._hvac_mode = HVAC_MODE_OFF
             if self._is_device_active:
-                await self._async_heater_turn_off()
+                # The helpers go to standby, the stop is a transition
+                async with self._temp_lock:
+                    await self._async_set_heating_mode(HVAC_MODE_IDLE)
+            else:
+                self._regulation_cycle.async_stop()
+                self._async_save_controller()
+                self._async_record_sample()
         else:
             _LOGGER.error("Unrecognized hvac mode: %s", hvac_mode)
             return
         # Ensure we update the current operation after changing the mode
-        self.schedule_update_ha_state()
+        self._async_publish_state()
+
+    async def async_apply(self, temperature=None, hvac_mode=None,
+                          preset_mode=None):
+        """Set the target temperature, hvac mode and preset as one change.
+
+        Everything is set before a single control pass and a single publish,
+        no pass sees a partial change. The modes are checked by APPLY_SCHEMA.
+        Leaving off keeps min_cycle_duration, as async_set_hvac_mode does.
+        """
+        if preset_mode == PRESET_AWAY and not self._async_check_away():
+            return
+        force = self._hvac_mode != HVAC_MODE_OFF
+
+        changed = False
+        if preset_mode == PRESET_AWAY and not self._is_away:
+            self._is_away = True
+            self._saved_target_temp = self._target_temp
+            self._target_temp = self._away_temp
+            changed = True
+        elif preset_mode == PRESET_NONE and self._is_away:
+            self._is_away = False
+            self._target_temp = self._saved_target_temp
+            changed = True
+        if temperature is not None and temperature != self._target_temp:
+            self._target_temp = temperature
+            changed = True
+        if hvac_mode is not None and hvac_mode != self._hvac_mode:
+            if hvac_mode == HVAC_MODE_OFF:
+                await self.async_set_hvac_mode(HVAC_MODE_OFF)
+                return
+            self._hvac_mode = hvac_mode
+            changed = True
+        if not changed:
+            return
+        await self._async_request_control(force=force)
+        self._async_publish_state()
+
+    #Add by CCL
+    @callback
+    def _async_check_away(self):
+        """Return False, logging it, if the thermostat has no away preset."""
+        if PRESET_AWAY in (self.preset_modes or ()):
+            return True
+        _LOGGER.error("No away_temp set for %s, away preset refused",
+                      self.entity_id)
+        return False
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
@@ -413,8 +1150,8 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         if temperature is None:
             return
         self._target_temp = temperature
-        await self._async_control_heating(force=True)
-        await self.async_update_ha_state()
+        await self._async_request_control(force=True)
+        self._async_publish_state()
 
     @property
     def min_temp(self):
@@ -436,173 +1173,884 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
 
     async def _async_sensor_changed(self, entity_id, old_state, new_state):
         """Handle temperature changes."""
+        self._mirror.async_update(entity_id, new_state)
         if new_state is None:
             return
+        if old_state is not None and old_state.state == new_state.state:
+            # Attribute-only update
+            return
 
+        shown_temp = self._shown_temp
         self._async_update_temp(new_state)
-        await self._async_control_heating()
-        await self.async_update_ha_state()
+        if self._async_should_evaluate():
+            await self._async_request_control()
+        elif self._shown_temp == shown_temp:
+            return
+        self._async_publish_state()
+
+    #Add by CCL
+    @callback
+    def _async_zone_changed(self, entity_id, old_state, new_state):
+        """Record a zone reading, evaluated with the others of its batch."""
+        self._mirror.async_update(entity_id, new_state)
+        if new_state is None:
+            return
+        if old_state is not None and old_state.state == new_state.state:
+            # Attribute-only update
+            return
+        if not self._zones.update(entity_id, new_state.state):
+            return
+        if self._unsub_zone_batch is None:
+            self._unsub_zone_batch = self._coordinator.async_call_later(
+                self._zone_batch.total_seconds(), self._async_zone_batch
+            )
+
+    async def _async_zone_batch(self, now):
+        """Aggregate the zone readings of the batch into one control pass."""
+        self._unsub_zone_batch = None
+        shown_temp = self._shown_temp
+        if not self._async_aggregate_zones(now):
+            return
+        # The setpoints of the zones move the aggregate, not the readings
+        self._async_detect_window(now, self._zones.mean_reading())
+        if self._async_should_evaluate():
+            await self._async_request_control()
+        elif self._shown_temp == shown_temp:
+            return
+        self._async_publish_state()
+
+    @callback
+    def _async_aggregate_zones(self, time):
+        """Set the current temperature from the zones, False without readings."""
+        cur_temp = self._zones.aggregate(self._target_temp)
+        if cur_temp is None:
+            return False
+        self._zone_target = self._target_temp
+        self._async_set_temp(cur_temp, time)
+        return True
+
+    @callback
+    def _async_publish_state(self):
+        """Publish the state if it changed.
+
+        With publish_delay, the changes made within the delay are combined
+        into one publish at its end.
+        """
+        if self._publish_delay is None:
+            self._async_publish_now()
+        elif self._unsub_publish is None:
+            self._unsub_publish = self._coordinator.async_call_later(
+                self._publish_delay.total_seconds(),
+                self._async_publish_delayed,
+            )
+        else:
+            self._suppressed_writes += 1
+
+    @callback
+    def _async_publish_delayed(self, now):
+        """Publish at the end of publish_delay."""
+        self._unsub_publish = None
+        self._async_publish_now()
+
+    @callback
+    def _async_publish_now(self):
+        """Write the state unless it is the one published last."""
+        attributes = dict(self.state_attributes or {})
+        attributes.update(self.device_state_attributes or {})
+        for attr in DIAGNOSTIC_ATTRS:
+            attributes.pop(attr, None)
+        published = (self.state, attributes)
+        if published == self._published:
+            self._suppressed_writes += 1
+            return
+        self._published = published
+        self._published_writes += 1
+        self.async_write_ha_state()
+        self._async_signal_sensors()
+
+    #Add by CCL
+    @callback
+    def _async_signal_sensors(self):
+        """Tell the sensors of the thermostat to read their figures."""
+        async_dispatcher_send(
+            self.hass, SIGNAL_THERMOSTAT_UPDATED.format(self._name))
+
+    #Add by CCL
+    @callback
+    def _async_refresh_sensors(self, now):
+        """Bring the runtime up to now for the sensors."""
+        if self._runtime is not None:
+            self._async_update_runtime()
+        else:
+            self._async_signal_sensors()
+
+    @property
+    def device_state_attributes(self):
+        """Return the publish and evaluation counters."""
+        return {
+            ATTR_PUBLISHED_WRITES: self._published_writes,
+            ATTR_SUPPRESSED_WRITES: self._suppressed_writes,
+            ATTR_EVALUATION_QUEUE_DEPTH: self._evaluator.queue_depth,
+            ATTR_MERGED_EVALUATIONS: self._evaluator.merged,
+            ATTR_EVALUATION_WAIT: round(self._evaluator.last_wait, 3),
+            ATTR_TEMPERATURE_AGE: round(
+                (dt_util.utcnow() - self._cur_temp_time).total_seconds())
+                if self._cur_temp_time else None,
+            ATTR_FIRST_DECISION_DELAY: round(
+                self._first_decision_delay.total_seconds(), 3)
+                if self._first_decision_delay is not None else None,
+            ATTR_ESTIMATED_TEMPERATURE: round(self._control_temp, 2)
+                if self._estimator is not None
+                and self._control_temp is not None else None,
+            ATTR_HEATING_RATE: round(self._estimator.rate(True), 2)
+                if self._estimator is not None else None,
+            ATTR_COOLING_RATE: round(self._estimator.rate(False), 2)
+                if self._estimator is not None else None,
+            ATTR_THERMAL_LOSS_RATE: round(self._thermal.loss_rate, 4)
+                if self._thermal is not None and self._thermal.fitted else None,
+            ATTR_THERMAL_HEATING_RATE: round(self._thermal.heating_rate, 3)
+                if self._thermal is not None and self._thermal.fitted else None,
+            ATTR_PREHEAT_LEAD_TIME: self._preheat_lead_minutes(),
+            ATTR_PREHEAT_START:
+                self._schedule.preheat_start.isoformat()
+                if self._schedule is not None
+                and self._schedule.preheat_start else None,
+            ATTR_ACTUATOR_DRIFT: self._actuator_drift,
+            ATTR_ACTUATOR_FAILURES: self._actuator_failures,
+            ATTR_ZONES: self._zones.as_dict()
+                if self._zones is not None else None,
+            ATTR_RELOAD_TIME: round(self._reload_time, 3)
+                if self._reload_time is not None else None,
+            ATTR_OPEN_WINDOW: self._is_window_open
+                if self._window is not None else None,
+            ATTR_TEMPERATURE_SLOPE: round(self._window.slope, 2)
+                if self._window is not None
+                and self._window.slope is not None else None,
+            ATTR_SCHEDULE_NEXT_TRANSITION:
+                self._schedule.next_transition.isoformat()
+                if self._schedule is not None
+                and self._schedule.next_transition else None,
+        }
+
+    def _preheat_lead_minutes(self):
+        """Return the predicted minutes of heating to the target."""
+        if self._target_temp is None:
+            return None
+        lead = self._preheat_lead(Setpoint(self._target_temp, HVAC_MODE_HEAT))
+        return round(lead.total_seconds() / 60) if lead is not None else None
+
+    @property
+    def _shown_temp(self):
+        """Return the current temperature as published."""
+        if self._cur_temp is None:
+            return None
+        return display_temp(self.hass, self._cur_temp, self._unit, self.precision)
+
+    #Add by CCL
+    def _decision_band(self):
+        """Return where the current temperature stands against the thresholds.
+
+        The control decision only depends on the temperature through these
+        comparisons, a reading staying in the same band cannot change it.
+        """
+        cur_temp = self._control_temp
+        if None in (cur_temp, self._target_temp):
+            return None
+        return (
+            self._target_temp - cur_temp >= self._cold_tolerance,
+            cur_temp - self._target_temp >= self._hot_tolerance,
+            self._regulation_delta is not None
+            and cur_temp >= self._target_temp - self._regulation_delta,
+        )
+
+    @property
+    def _control_temp(self):
+        """Return the temperature the decisions are made on.
+
+        With the estimator, the last reading extrapolated to now.
+        """
+        if self._estimator is None or not self._estimator.ready \
+                or self._cur_temp_seeded:
+            return self._cur_temp
+        return self._estimator.predict(dt_util.utcnow())
+
+    #Add by CCL
+    @callback
+    def _async_arm_crossing(self):
+        """Arm a control pass for when the estimate crosses a threshold."""
+        self._async_cancel_crossing()
+        if self._estimator is None or self._target_temp is None \
+                or self._hvac_mode == HVAC_MODE_OFF:
+            return
+        now = dt_util.utcnow()
+        delay = self._estimator.crossing(now, (
+            self._target_temp - self._cold_tolerance,
+            self._target_temp + self._hot_tolerance,
+            self._target_temp - self._regulation_delta
+            if self._regulation_delta is not None else None,
+        ))
+        if delay is None:
+            return
+        # Past the threshold, the comparisons hold despite rounding
+        self._unsub_crossing = self._coordinator.async_track_point_in_utc_time(
+            self._async_crossing, now + timedelta(seconds=delay + 1)
+        )
+
+    @callback
+    def _async_cancel_crossing(self):
+        """Cancel the pass armed for a threshold crossing."""
+        if self._unsub_crossing is not None:
+            self._unsub_crossing()
+            self._unsub_crossing = None
+
+    async def _async_crossing(self, now):
+        """Evaluate when the estimate crosses a threshold."""
+        self._unsub_crossing = None
+        _LOGGER.debug("Estimated temperature of %s crossed a threshold: %s",
+                        self.entity_id, self._control_temp)
+        await self._async_request_control()
+        self._async_publish_state()
+
+    @callback
+    def _async_should_evaluate(self):
+        """Return True if a new reading must be evaluated now.
+
+        A reading crossing a threshold is always evaluated at once. Other
+        readings are dropped with the deadband, or else rate limited by
+        min_evaluation_interval into a single deferred evaluation.
+        """
+        if self._decision_band() != self._evaluated_band:
+            self._async_cancel_deferred_evaluation()
+            return True
+        if self._sensor_deadband:
+            return False
+        if self._min_evaluation_interval is None or self._last_evaluation is None:
+            return True
+        allowed_at = self._last_evaluation + self._min_evaluation_interval
+        if dt_util.utcnow() >= allowed_at:
+            return True
+        if self._unsub_deferred_evaluation is None:
+            self._unsub_deferred_evaluation = \
+                self._coordinator.async_track_point_in_utc_time(
+                    self._async_deferred_evaluation, allowed_at
+                )
+        return False
+
+    @callback
+    def _async_cancel_deferred_evaluation(self):
+        """Cancel the pending rate limited evaluation."""
+        if self._unsub_deferred_evaluation is not None:
+            self._unsub_deferred_evaluation()
+            self._unsub_deferred_evaluation = None
+
+    async def _async_deferred_evaluation(self, now):
+        """Evaluate the readings held back by min_evaluation_interval."""
+        self._unsub_deferred_evaluation = None
+        await self._async_request_control()
+        self._async_publish_state()
 
     @callback
     def _async_switch_changed(self, entity_id, old_state, new_state):
         """Handle heater switch state changes."""
+        self._mirror.async_update(entity_id, new_state)
         if new_state is None:
             return
-        self.async_schedule_update_ha_state()
+        if self._estimator is not None:
+            self._estimator.set_heating(
+                new_state.last_changed, new_state.state == STATE_ON)
+            self._async_arm_crossing()
+        if self._thermal is not None:
+            self._thermal.set_heating(
+                new_state.last_changed, new_state.state == STATE_ON)
+        self._async_update_runtime()
+        self._async_record_sample()
+        self._async_publish_state()
+
+    #Add by CCL
+    @callback
+    def _async_helper_changed(self, entity_id, old_state, new_state):
+        """Handle a helper changed outside the controller.
+
+        The echo of our own calls is already mirrored and ignored. Other
+        changes are reconciled by a new control pass.
+        """
+        if not self._mirror.async_update(entity_id, new_state):
+            return
+        _LOGGER.debug("Helper %s changed outside the controller: %s",
+                        entity_id, new_state.state if new_state else None)
+        if entity_id == self._heat_entity_id and new_state is not None:
+            self._last_transition = new_state.last_changed
+            self._async_save_controller()
+        self.hass.async_create_task(self._async_reconcile())
+
+    async def _async_reconcile(self):
+        """Bring the helpers back in line with the controller."""
+        await self._async_request_control()
+        self._async_publish_state()
 
     @callback
     def _async_update_temp(self, state):
         """Update thermostat with latest state from sensor."""
         try:
-            self._cur_temp = float(state.state)
+            value = float(state.state)
         except ValueError as ex:
             _LOGGER.error("Unable to update from sensor: %s", ex)
+            return
+        self._async_accept_reading(value, state.last_updated)
+
+    #Add by CCL
+    @callback
+    def _async_accept_reading(self, value, time, seed=False):
+        """Take a reading of the room, through the filter, the estimator and
+        the window detector.
+
+        A seed is a last known value, used until the sensor reports. It is
+        not extrapolated by the estimator.
+        """
+        self._async_set_temp(value, time)
+        self._cur_temp_seeded = seed
+        self._async_detect_window(time, self._cur_temp)
 
-    async def _async_control_heating(self, time=None, force=False):
+    @callback
+    def _async_set_temp(self, value, time):
+        """Set the current temperature from a reading taken at time."""
+        self._cur_temp = self._sensor_filter.update(value)
+        self._cur_temp_time = time
+        self._cur_temp_seeded = False
+        if self._estimator is not None:
+            self._estimator.update(
+                time, self._cur_temp,
+                self._mirror.is_state(self.heater_entity_id, STATE_ON),
+            )
+        if self._thermal is not None and self._thermal.add(
+                time, self._cur_temp, self._outdoor_temp):
+            _LOGGER.debug("Thermal model of %s: %s", self.entity_id,
+                          self._thermal.as_dict())
+            self._async_save_controller()
+
+    #Add by CCL
+    @property
+    def _is_window_open(self):
+        """Return True while the heater is held for an open window."""
+        return self._window is not None \
+            and self._window.is_open(dt_util.utcnow())
+
+    @callback
+    def _async_detect_window(self, time, value):
+        """Feed the open window detector, hold the heater on a fast drop."""
+        if self._window is None or value is None:
+            return
+        open_until = self._window.open_until
+        if self._window.update(time, value):
+            _LOGGER.info("Temperature of %s falling %.1f °C/h, heater held "
+                         "until %s", self.entity_id, -self._window.slope,
+                         self._window.open_until)
+            self.hass.async_create_task(self._async_window_changed(True))
+        if self._window.open_until != open_until:
+            self._async_arm_window()
+
+    @callback
+    def _async_arm_window(self):
+        """Arm the end of the hold."""
+        self._async_cancel_window()
+        self._unsub_window = self._coordinator.async_track_point_in_utc_time(
+            self._async_window_expired, self._window.open_until
+        )
+
+    @callback
+    def _async_cancel_window(self):
+        """Cancel the end of the hold."""
+        if self._unsub_window is not None:
+            self._unsub_window()
+            self._unsub_window = None
+
+    async def _async_window_expired(self, now):
+        """Resume at the end of the hold, on fresh readings."""
+        self._unsub_window = None
+        _LOGGER.info("Heater of %s no longer held", self.entity_id)
+        self._window.reset()
+        await self._async_window_changed(False)
+
+    async def _async_window_changed(self, opened):
+        """Re-evaluate after the hold started or ended.
+
+        The heater is stopped at once, min_cycle_duration applies to the
+        restart.
+        """
+        await self._async_request_control(force=opened)
+        self._async_publish_state()
+
+    #Add by CCL
+    @callback
+    def _async_outdoor_changed(self, entity_id, old_state, new_state):
+        """Handle outdoor temperature changes."""
+        self._async_update_outdoor_temp(new_state)
+
+    @callback
+    def _async_update_outdoor_temp(self, state):
+        """Update the outdoor temperature of the thermal model."""
+        if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            self._outdoor_temp = None
+            return
+        try:
+            self._outdoor_temp = float(state.state)
+        except ValueError as ex:
+            _LOGGER.error("Unable to update from outdoor sensor: %s", ex)
+            self._outdoor_temp = None
+
+    def _preheat_lead(self, setpoint):
+        """Return the heating time to reach a setpoint, capped at max_preheat."""
+        if self._thermal is None or setpoint.temperature is None:
+            return None
+        hours = self._thermal.lead_time(
+            self._cur_temp, setpoint.temperature, self._outdoor_temp)
+        if hours is None:
+            return None
+        return min(timedelta(hours=min(hours, 24)), self._max_preheat)
+
+    async def _async_request_control(self, time=None, force=False,
+                                     reconcile=False):
+        """Request a control pass, merged with the ones already queued."""
+        await self._evaluator.async_request(
+            time=time, force=force, reconcile=reconcile)
+
+    async def _async_keep_alive(self, time):
+        """Request a keep-alive control pass."""
+        await self._async_request_control(time=time)
+
+    async def _async_control_heating(self, time=None, force=False,
+                                     reconcile=False):
         """Check if we need to turn heating on or off."""
-        _LOGGER.debug("Check if we need to turn heating on or off")
+        started = self._stats.clock()
         async with self._temp_lock:
-            if not self._active and None not in (self._cur_temp, self._target_temp):
-                self._active = True
-                _LOGGER.info(
-                    "Obtained current and target temperature. "
-                    "Generic thermostat active. %s, %s",
-                    self._cur_temp,
-                    self._target_temp,
-                )
+            locked = self._stats.clock()
+            try:
+                await self._async_evaluate(time, force, reconcile)
+            finally:
+                self._stats.record_evaluation(started, locked)
+
+    async def _async_evaluate(self, time, force, reconcile=False):
+        """Decide the heating mode and apply it, under the lock."""
+        if not self._active and None not in (self._cur_temp, self._target_temp):
+            self._active = True
+            self._async_save_controller()
+            _LOGGER.info(
+                "Obtained current and target temperature. "
+                "Generic thermostat active. %s, %s",
+                self._cur_temp,
+                self._target_temp,
+            )
+
+        if not self._active or self._hvac_mode == HVAC_MODE_OFF \
+                or None in (self._cur_temp, self._target_temp):
+            # A restored controller waits for its first reading
+            return
+
+        if self._zones is not None and self._zone_target != self._target_temp:
+            # Zones with their own setpoint move against the new target
+            self._async_aggregate_zones(dt_util.utcnow())
+
+        self._evaluated_band = self._decision_band()
+        self._last_evaluation = dt_util.utcnow()
+        self._async_arm_crossing()
 
-            if not self._active or self._hvac_mode == HVAC_MODE_OFF:
+        cur_temp = self._control_temp
+        next_state, too_cold, too_hot = decide(
+            cur_temp, self._target_temp, self._is_device_active,
+            self._cold_tolerance, self._hot_tolerance, self._regulation_delta,
+        )
+        if self._is_window_open:
+            next_state = HVAC_MODE_IDLE
+       
+        # CCL : Replace fallowing by ...
+        #if self._is_device_active:
+        #    if (self.ac_mode and too_cold) or (not self.ac_mode and too_hot):
+        #        _LOGGER.info("Turning off heater %s", self.heater_entity_id)
+        #        await self._async_heater_turn_off()
+        #    elif time is not None:
+        #        # The time argument is passed only in keep-alive case
+        #        await self._async_heater_turn_on()
+        #else:
+        #    if (self.ac_mode and too_hot) or (not self.ac_mode and too_cold):
+        #        _LOGGER.info("Turning on heater %s", self.heater_entity_id)
+        #        await self._async_heater_turn_on()
+        #    elif time is not None:
+        #        # The time argument is passed only in keep-alive case
+        #        await self._async_heater_turn_off()
+
+        if self._first_decision_delay is None:
+            self._first_decision_delay = dt_util.utcnow() - self._added_at
+            _LOGGER.info("First decision of %s %s after startup%s",
+                            self.entity_id, self._first_decision_delay,
+                            " on a seeded temperature"
+                            if self._cur_temp_seeded else "")
+
+        if not force and time is None and self.min_cycle_duration:
+            # If the `force` argument is True, we
+            # ignore `min_cycle_duration`.
+            # If the `time` argument is not none, we were invoked for
+            # keep-alive purposes, and `min_cycle_duration` is irrelevant.
+            # A reconcile pass after a failed delivery still waits for it.
+            if not self._async_min_cycle_elapsed(next_state):
+                self._trace.record(
+                    dt_util.utcnow(), TRACE_MIN_CYCLE, cur_temp,
+                    self._target_temp, too_cold, too_hot, next_state, force,
+                    time is not None, (),
+                )
                 return
 
-            #CCL
-            next_state = self._hvac_mode
-            #End CCL
-            
-            if not force and time is None:
-                # If the `force` argument is True, we
-                # ignore `min_cycle_duration`.
-                # If the `time` argument is not none, we were invoked for
-                # keep-alive purposes, and `min_cycle_duration` is irrelevant.
-                if self.min_cycle_duration:
-                    if self._is_device_active:
-                        current_state = STATE_ON
-                    else:
-                        current_state = HVAC_MODE_OFF
-                    #CCL
-                    if next_state == HVAC_MODE_IDLE:
-                        next_current_state = HVAC_MODE_OFF
-                    else:
-                        next_current_state = STATE_ON
-                    
-                    if current_state != next_current_state:
-                        _LOGGER.debug("State : %s since %s", self.hass.states.get(self._heat_entity_id).state, self.hass.states.get(self._heat_entity_id).last_changed)
-                        #End CCL
-                        long_enough = condition.state(
-                            self.hass,
-                            self.heater_entity_id,
-                            current_state,
-                            self.min_cycle_duration,
-                        )
-                        if not long_enough:
-                            _LOGGER.debug("Min cycle duration not reach for heater %s", self._heat_entity_id)
-                            return
-
-            too_cold = self._target_temp - self._cur_temp >= self._cold_tolerance
-            too_hot = self._cur_temp - self._target_temp >= self._hot_tolerance
-           
-            # CCL : Replace fallowing by ...
-            #if self._is_device_active:
-            #    if (self.ac_mode and too_cold) or (not self.ac_mode and too_hot):
-            #        _LOGGER.info("Turning off heater %s", self.heater_entity_id)
-            #        await self._async_heater_turn_off()
-            #    elif time is not None:
-            #        # The time argument is passed only in keep-alive case
-            #        await self._async_heater_turn_on()
-            #else:
-            #    if (self.ac_mode and too_hot) or (not self.ac_mode and too_cold):
-            #        _LOGGER.info("Turning on heater %s", self.heater_entity_id)
-            #        await self._async_heater_turn_on()
-            #    elif time is not None:
-            #        # The time argument is passed only in keep-alive case
-            #        await self._async_heater_turn_off()
-            if self._is_device_active:
-                if too_hot:
-                    next_state = HVAC_MODE_IDLE
-                else:
-                    _LOGGER.debug("Evaluate regulation mode for heater %s",
-                                    self.heater_entity_id)
-                    regulation_mode = self._cur_temp >= \
-                        self._target_temp - self._regulation_delta
-                    if regulation_mode:
-                        next_state = HVAC_MODE_REGULATION
-                    else:
-                        next_state = HVAC_MODE_COOL
-            else:
-                if too_cold:
-                    next_state = HVAC_MODE_COOL
-                else:
-                    next_state = HVAC_MODE_IDLE
-            _LOGGER.debug("Next state for heater %s : %s (force: %s, time: %s)", self.heater_entity_id, next_state, force, time)
-            await self._async_set_heating_mode(next_state, time)
+        self._stats.record_decision(next_state)
+        await self._async_set_heating_mode(
+            next_state, reconcile or time is not None)
+        self._trace.record(
+            dt_util.utcnow(), TRACE_EVALUATION, cur_temp, self._target_temp,
+            too_cold, too_hot, next_state, force, time is not None,
+            self._last_dispatch.actions if self._last_dispatch else (),
+        )
 
     #Add by CCL
-    async def _async_regulation(self, time=None):
-        """Call at constant intervals for regulation purposes."""
-        _LOGGER.debug("Check if in regulation for heater %s",
-                                    self.heater_entity_id)
-        if self._is_in_regulation:
-            _LOGGER.debug("Check regulation for heater %s",
-                                    self.heater_entity_id)
-            self._nb_tick_regulation = self._nb_tick_regulation + 1
-            if self._nb_tick_regulation == self._regulation_nb_duration:
-                _LOGGER.debug("Regulation tick for heater %s",
-                                    self.heater_entity_id)
-                self._nb_tick_regulation = 0
+    @callback
+    def _async_min_cycle_elapsed(self, next_state):
+        """Return False if next_state would switch the stove too early.
+
+        A blocked transition arms a single re-evaluation at the moment it
+        becomes allowed.
+        """
+        allowed_at = min_cycle_allowed_at(
+            self._is_device_active, next_state, self._last_transition,
+            self.min_cycle_duration,
+        )
+        if allowed_at is None or dt_util.utcnow() >= allowed_at:
+            return True
+
+        self._stats.record_min_cycle_blocked()
+        if self._min_cycle_at != allowed_at:
+            self._async_cancel_min_cycle_check()
+            self._min_cycle_at = allowed_at
+            self._unsub_min_cycle = self._coordinator.async_track_point_in_utc_time(
+                self._async_min_cycle_expired, allowed_at
+            )
+        return False
+
+    @callback
+    def _async_cancel_min_cycle_check(self):
+        """Cancel the pending min cycle re-evaluation."""
+        if self._unsub_min_cycle is not None:
+            self._unsub_min_cycle()
+            self._unsub_min_cycle = None
+        self._min_cycle_at = None
+
+    async def _async_min_cycle_expired(self, now):
+        """Re-evaluate once a blocked transition is allowed."""
+        self._unsub_min_cycle = None
+        self._min_cycle_at = None
+        await self._async_request_control()
+        self._async_publish_state()
+
+    #Add by CCL
+    @property
+    def _regulation_times(self):
+        """Return the (on time, off time) of the regulation duty cycle."""
+        return regulation_times(
+            self._regulation_on_time, self._regulation_off_time,
+            self._regulation_duration, self._regulation_nb_duration,
+        )
+
+    #Add by CCL
+    @callback
+    def _async_seed_temp(self, old_state):
+        """Seed the current temperature with the freshest last known value.
+
+        The sensor may not report for minutes after a restart. Its last
+        state and the restored thermostat state are used until it does, if
+        they are not older than warm_start_max_age.
+        """
+        now = dt_util.utcnow()
+        candidates = []
+        sensor_state = self.hass.states.get(self.sensor_entity_id) \
+            if self.sensor_entity_id else None
+        if sensor_state is not None:
+            candidates.append((sensor_state.last_updated, sensor_state.state))
+        if self._zones is not None:
+            # The zones still fresh, dated by the oldest of them
+            updated = None
+            for entity_id in self._zones.entity_ids:
+                zone_state = self.hass.states.get(entity_id)
+                if zone_state is None \
+                        or now - zone_state.last_updated > self._warm_start_max_age:
+                    continue
+                self._zones.update(entity_id, zone_state.state)
+                updated = min(updated or now, zone_state.last_updated)
+            if updated is not None:
+                candidates.append(
+                    (updated, self._zones.aggregate(self._target_temp)))
+        if old_state is not None:
+            candidates.append((
+                old_state.last_updated,
+                old_state.attributes.get(ATTR_CURRENT_TEMPERATURE),
+            ))
+        for updated, value in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if now - updated > self._warm_start_max_age:
+                break
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            self._async_accept_reading(value, updated, seed=True)
+            _LOGGER.info("Seeded temperature of %s with %s, %s old",
+                            self.entity_id, self._cur_temp, now - updated)
+            return
+
+    #Add by CCL
+    @callback
+    def _async_give_handover(self):
+        """Keep the readings in memory for the thermostat reloaded next."""
+        self.hass.data.setdefault(DATA_HANDOVER, {})[self.entity_id] = {
+            ATTR_CURRENT_TEMPERATURE: self._cur_temp,
+            ATTR_TEMPERATURE_TIME: self._cur_temp_time,
+            ATTR_OUTDOOR_TEMPERATURE: self._outdoor_temp,
+            ATTR_ZONES: self._zones.as_dict()
+                if self._zones is not None else None,
+        }
+
+    @callback
+    def _async_take_handover(self):
+        """Resume the readings of the thermostat before a reload.
+
+        Return False if there is none, or too old to decide on.
+        """
+        handover = self.hass.data.get(DATA_HANDOVER, {}).pop(self.entity_id, None)
+        if handover is None:
+            return False
+        if self._outdoor_temp is None:
+            self._outdoor_temp = handover[ATTR_OUTDOOR_TEMPERATURE]
+        if self._zones is not None and handover[ATTR_ZONES]:
+            for entity_id, reading in handover[ATTR_ZONES].items():
+                self._zones.update(entity_id, reading)
+        updated = handover[ATTR_TEMPERATURE_TIME]
+        if handover[ATTR_CURRENT_TEMPERATURE] is None or updated is None \
+                or dt_util.utcnow() - updated > self._warm_start_max_age:
+            return False
+        self._async_accept_reading(
+            handover[ATTR_CURRENT_TEMPERATURE], updated, seed=True)
+        _LOGGER.info("Resumed temperature of %s with %s after a reload",
+                     self.entity_id, self._cur_temp)
+        return True
+
+    @callback
+    def async_set_reload_time(self, seconds):
+        """Report the time the last reload took."""
+        self._reload_time = seconds
+        self._async_publish_state()
+
+    #Add by CCL
+    @callback
+    def _async_warm_start(self):
+        """Decide as soon as the inputs are known, without waiting a reading."""
+        if self._first_decision_delay is not None \
+                or None in (self._cur_temp, self._target_temp) \
+                or self._hvac_mode == HVAC_MODE_OFF:
+            return
+        # The actuators must be loaded to be commanded
+        if self._mirror.get(self.heater_entity_id) is None:
+            return
+        self.hass.async_create_task(self._async_reconcile())
+
+    #Add by CCL
+    @callback
+    def _async_restore_controller(self, data):
+        """Resume the controller state saved before a restart."""
+        if not data:
+            return
+        self._active = data.get(ATTR_ACTIVE, False)
+        if self._thermal is not None:
+            self._thermal.restore(data.get(ATTR_THERMAL_MODEL))
+        if self._runtime is not None:
+            self._runtime.restore(data.get(ATTR_RUNTIME))
+        if data.get(ATTR_LAST_TRANSITION):
+            self._last_transition = dt_util.parse_datetime(
+                data[ATTR_LAST_TRANSITION])
+
+        cycle = data.get(ATTR_REGULATION_CYCLE)
+        if not cycle or not self._is_in_regulation:
+            return
+        heater_on = cycle[ATTR_HEATER_ON]
+        next_edge = dt_util.parse_datetime(cycle[ATTR_NEXT_EDGE]) \
+            if cycle.get(ATTR_NEXT_EDGE) else None
+        # Play the edges missed while stopped
+        now = dt_util.utcnow()
+        on_time, off_time = self._regulation_times
+        while next_edge is not None and next_edge <= now:
+            heater_on = not heater_on
+            duration = on_time if heater_on else off_time
+            next_edge = next_edge + duration if duration else None
+        _LOGGER.info("Resuming regulation cycle of heater %s, heater %s "
+                        "until %s", self.heater_entity_id,
+                        STATE_ON if heater_on else STATE_OFF, next_edge)
+        self._regulation_cycle.async_start(heater_on, next_edge)
+
+    #Add by CCL
+    @callback
+    def _async_save_controller(self):
+        """Save the controller state, written in a batch later."""
+        cycle = self._regulation_cycle
+        self._store.async_set(self.entity_id, {
+            ATTR_ACTIVE: self._active,
+            ATTR_LAST_TRANSITION: self._last_transition.isoformat()
+                if self._last_transition else None,
+            ATTR_REGULATION_CYCLE: {
+                ATTR_HEATER_ON: cycle.heater_on,
+                ATTR_NEXT_EDGE: cycle.next_edge.isoformat()
+                    if cycle.next_edge else None,
+            } if cycle.active else None,
+            ATTR_THERMAL_MODEL: self._thermal.as_dict()
+                if self._thermal is not None and self._thermal.fitted else None,
+            ATTR_RUNTIME: self._runtime.as_dict()
+                if self._runtime is not None else None,
+        })
+
+    #Add by CCL
+    @callback
+    def _async_update_runtime(self):
+        """Account the runtime up to a transition of the stove."""
+        if self._runtime is None:
+            return
+        self._runtime.async_update(
+            dt_util.utcnow(),
+            self._is_device_active,
+            self._mirror.is_state(self.heater_entity_id, STATE_ON),
+            self._is_in_regulation,
+        )
+        self._async_signal_sensors()
+
+    #Add by CCL
+    @callback
+    def _async_record_sample(self, now=None):
+        """Append the current state to the time series.
+
+        Outside the interval ticks, a sample is appended only when the
+        heater, the regulation or the hvac mode changed.
+        """
+        if self._series is None:
+            return
+        heater = self._mirror.is_state(self.heater_entity_id, STATE_ON)
+        recorded = (heater, self._is_in_regulation, self._hvac_mode)
+        if now is None and recorded == self._series_recorded:
+            return
+        self._series_recorded = recorded
+        waiting = self._series.append(
+            dt_util.as_timestamp(now or dt_util.utcnow()),
+            self._cur_temp,
+            self._target_temp if self._hvac_mode != HVAC_MODE_OFF else None,
+            heater,
+            self._is_in_regulation,
+        )
+        if waiting and self._series_segment is None:
+            self._series_segment = self.hass.async_create_task(
+                self._async_start_segment())
+
+    #Add by CCL
+    async def _async_start_segment(self):
+        """Start a segment of the time series in the executor."""
+        series = self._series
+        try:
+            while series.segment_needed is not None:
+                seconds = series.segment_needed
+                records = await self.hass.async_add_executor_job(
+                    series.create_segment, seconds)
+                expired = series.use_segment(seconds, records)
+                if expired:
+                    await self.hass.async_add_executor_job(
+                        series.remove_segments, expired)
+        finally:
+            self._series_segment = None
+
+    #Add by CCL
+    async def _async_regulation(self, heater_on):
+        """Handle an edge of the regulation duty cycle."""
+        async with self._temp_lock:
+            if not self._regulation_cycle.active:
+                return
+            self._stats.record_regulation_edge()
+            locked = self._stats.clock()
+            if heater_on:
                 await self._async_heater_turn_on()
             else:
-                _LOGGER.debug("Regulation untick for heater %s",
-                                    self.heater_entity_id)
                 await self._async_heater_turn_off()
+            self._stats.record_lock_hold(locked)
+            self._async_update_runtime()
+            self._async_record_sample()
+            self._async_save_controller()
+            self._trace.record(
+                dt_util.utcnow(), TRACE_REGULATION, self._cur_temp,
+                self._target_temp, None, None, HVAC_MODE_REGULATION, False,
+                False,
+                ((self.heater_entity_id, STATE_ON if heater_on else STATE_OFF),),
+            )
 
     #Add by CCL
-    async def _async_set_heating_mode(self, heating_mode, time):
+    async def _async_set_heating_mode(self, heating_mode, reconcile=False):
         """Set heating mode."""
-        _LOGGER.debug("Set heating mode to %s", heating_mode)
-        #if self._is_device_active:
         if heating_mode == HVAC_MODE_COOL:
-            _LOGGER.info("Turning on heater %s", self._heat_entity_id)
-            await self._async_heat_turn_on()
-            await self._async_regulation_turn_off()
-            await self._async_state_select(heating_mode)
-            await self._async_heater_turn_on()
+            heat, regulation, heater = STATE_ON, STATE_OFF, STATE_ON
         elif heating_mode == HVAC_MODE_REGULATION:
-            _LOGGER.info("Turning heater %s on regulation", self._heat_entity_id)
-            await self._async_heat_turn_on()
-            await self._async_regulation_turn_on()
-            await self._async_state_select(heating_mode)
-            await self._async_heater_turn_on()
+            heat, regulation, heater = STATE_ON, STATE_ON, STATE_ON
+            if self._regulation_cycle.active:
+                # Keep the heater in the current phase of the duty cycle
+                heater = STATE_ON if self._regulation_cycle.heater_on \
+                    else STATE_OFF
         elif heating_mode == HVAC_MODE_IDLE:
-            _LOGGER.info("Turning heater %s on standby",
-                                self._heat_entity_id)
-            await self._async_heat_turn_off()
-            await self._async_regulation_turn_off()
-            await self._async_state_select(heating_mode)
-            await self._async_heater_turn_off()
+            heat, regulation, heater = STATE_OFF, STATE_OFF, STATE_OFF
         else:
             _LOGGER.error("Unrecognized heating mode: %s", heating_mode)
             return
 
+        was_active = self._is_device_active
+        # On keep-alive and retry passes the actuators are checked against
+        # the state the devices report
+        error = None
+        try:
+            self._last_dispatch = await self._actuator.async_dispatch(
+                [
+                    (self._heat_entity_id, heat),
+                    (self._regulation_entity_id, regulation),
+                    (self._state_entity_id, heating_mode),
+                ],
+                (self.heater_entity_id, heater),
+                reconcile=reconcile,
+            )
+        except HomeAssistantError as err:
+            self._last_dispatch = None
+            error = err
+        self._async_check_delivery(
+            reconcile, error, error is None
+            and (self.heater_entity_id, heater) in self._last_dispatch.actions)
+        if self._is_device_active != was_active:
+            # The passes are in the trace, only the start and stop are logged
+            _LOGGER.info("Heater %s %s", self._heat_entity_id,
+                         "started" if self._is_device_active else "stopped")
+            self._last_transition = dt_util.utcnow()
+
+        if heating_mode != HVAC_MODE_REGULATION:
+            self._regulation_cycle.async_stop()
+        elif not self._regulation_cycle.active:
+            # Entering regulation, the heater has just been turned on
+            self._regulation_cycle.async_start(heater_on=True)
+        self._async_update_runtime()
+        self._async_record_sample()
+        self._async_save_controller()
+
     @property
     def _is_device_active(self):
         """If the toggleable device is currently active."""
         #CCL return self.hass.states.is_state(self.heater_entity_id, STATE_ON)
-        return self.hass.states.is_state(self._heat_entity_id, STATE_ON)
+        return self._mirror.is_state(self._heat_entity_id, STATE_ON)
     
     #Add by CCL
     @property
     def _is_in_regulation(self):
         """If the toggleable device is currently active."""
-        return self.hass.states.is_state(self._regulation_entity_id, STATE_ON)
+        return self._mirror.is_state(self._regulation_entity_id, STATE_ON)
             
     @property
     def supported_features(self):
@@ -611,40 +2059,71 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
 
     async def _async_heater_turn_on(self):
         """Turn heater toggleable device on."""
-        data = {ATTR_ENTITY_ID: self.heater_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_ON, data)
+        await self._async_heater_send(STATE_ON)
     
     async def _async_heater_turn_off(self):
         """Turn heater toggleable device off."""
-        data = {ATTR_ENTITY_ID: self.heater_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_OFF, data)
+        await self._async_heater_send(STATE_OFF)
 
     #Add by CCL
-    async def _async_heat_turn_on(self):
-        """Turn heat toggleable device off."""
-        data = {ATTR_ENTITY_ID: self._heat_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_ON, data)
-
-    async def _async_heat_turn_off(self):
-        """Turn heat toggleable device off."""
-        data = {ATTR_ENTITY_ID: self._heat_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_OFF, data)
-    
-    async def _async_regulation_turn_on(self):
-        """Turn heat toggleable device on."""
-        data = {ATTR_ENTITY_ID: self._regulation_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_ON, data)
-
-    async def _async_regulation_turn_off(self):
-        """Turn heat toggleable device off."""
-        data = {ATTR_ENTITY_ID: self._regulation_entity_id}
-        await self.hass.services.async_call(HA_DOMAIN, SERVICE_TURN_OFF, data)
-
-    async def _async_state_select(self, state):
-       """Switch state"""
-       data = {ATTR_ENTITY_ID: self._state_entity_id, ATTR_OPTION: state}
-       await self.hass.services.async_call('input_select', SERVICE_SELECT_OPTION, data)
-    #End Add by CCL
+    async def _async_heater_send(self, target):
+        """Command the heater, then check it against the device later."""
+        try:
+            await self._actuator.async_send(
+                self.heater_entity_id, target, blocking=False)
+        except HomeAssistantError as err:
+            self._async_check_delivery(False, err)
+        else:
+            self._async_arm_retry()
+
+    #Add by CCL
+    @callback
+    def _async_check_delivery(self, reconcile, error, commanded=False):
+        """Count drift and failures, retry until the devices agree.
+
+        A retry is armed after a failure, a drift, a command the device has
+        not reported yet, or a heater command, so a command the stove ignores
+        is found without keep_alive. A reconcile pass finding every actuator
+        in its state ends the retries.
+        """
+        dispatch = self._last_dispatch
+        if error is not None:
+            self._actuator_failures += 1
+            _LOGGER.warning("Actuator command of %s failed: %s",
+                            self.entity_id, error)
+        elif dispatch.drift:
+            self._actuator_drift += dispatch.drift
+            _LOGGER.warning("%s actuator(s) of %s drifted from the commanded "
+                            "state, resent", dispatch.drift, self.entity_id)
+        elif not dispatch.pending and not commanded:
+            if reconcile:
+                self._retry_backoff.reset()
+                self._async_cancel_retry()
+            return
+        self._async_arm_retry()
+
+    @callback
+    def _async_arm_retry(self):
+        """Arm the next reconcile pass, unless one is armed."""
+        if self._unsub_retry is not None:
+            return
+        self._unsub_retry = self._coordinator.async_call_later(
+            self._retry_backoff.next_delay(), self._async_retry
+        )
+
+    @callback
+    def _async_cancel_retry(self):
+        """Cancel the pending reconcile pass."""
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+
+    async def _async_retry(self, now):
+        """Check the actuators against the devices and resend on drift."""
+        self._unsub_retry = None
+        await self._async_request_control(reconcile=True)
+        self._async_publish_state()
+
 
     
 
@@ -652,14 +2131,26 @@ class CCLGenericThermostat(ClimateDevice, RestoreEntity):
         """Set new preset mode.
         This method must be run in the event loop and returns a coroutine.
         """
-        if preset_mode == PRESET_AWAY and not self._is_away:
+        if preset_mode == PRESET_WINDOW_OPEN and self._window is not None:
+            if not self._is_window_open:
+                self._window.hold(dt_util.utcnow())
+                self._async_arm_window()
+                await self._async_request_control(force=True)
+        elif preset_mode == PRESET_NONE and self._is_window_open:
+            # Released by hand, away is kept
+            self._async_cancel_window()
+            self._window.reset()
+            await self._async_request_control(force=True)
+        elif preset_mode == PRESET_AWAY and not self._async_check_away():
+            return
+        elif preset_mode == PRESET_AWAY and not self._is_away:
             self._is_away = True
             self._saved_target_temp = self._target_temp
             self._target_temp = self._away_temp
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=True)
         elif preset_mode == PRESET_NONE and self._is_away:
             self._is_away = False
             self._target_temp = self._saved_target_temp
-            await self._async_control_heating(force=True)
+            await self._async_request_control(force=True)
 
-        await self.async_update_ha_state()
\ No newline at end of file
+        self._async_publish_state()
\ No newline at end of file
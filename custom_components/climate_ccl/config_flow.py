@@ -0,0 +1,172 @@
+"""Config and options flow of the CCL thermostat.
+
+The entry data holds the name and the entities, the options the tuning.
+Both are validated by the platform schema, the options win over the data.
+An optional entity left empty in the options is removed. Changing the
+options reloads the thermostat.
+"""
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
+
+from . import entry_config
+from .const import (
+    CONF_AWAY_TEMP,
+    CONF_COLD_TOLERANCE,
+    CONF_DIAGNOSTICS,
+    CONF_HEAT,
+    CONF_HEATER,
+    CONF_HEATER_STATUS,
+    CONF_HOT_TOLERANCE,
+    CONF_MAX_TEMP,
+    CONF_MIN_DUR,
+    CONF_MIN_TEMP,
+    CONF_OUTDOOR_SENSOR,
+    CONF_REGULATION,
+    CONF_REGULATION_DELTA,
+    CONF_REGULATION_DURATION,
+    CONF_REGULATION_NB_DURATION,
+    CONF_RUNTIME_SENSORS,
+    CONF_SCHEDULE_CALENDAR,
+    CONF_SENSOR,
+    CONF_STATE,
+    CONF_TARGET_TEMP,
+    DEFAULT_NAME,
+    DEFAULT_TOLERANCE,
+    DOMAIN,
+)
+
+# Entities of a thermostat, set up first and changeable in the options
+ENTITY_FIELDS = {
+    CONF_HEATER: str,
+    CONF_SENSOR: str,
+    CONF_HEAT: str,
+    CONF_REGULATION: str,
+    CONF_STATE: str,
+}
+# Entities only set in the options
+OPTIONAL_ENTITY_FIELDS = {
+    CONF_OUTDOOR_SENSOR: str,
+    CONF_HEATER_STATUS: str,
+    CONF_SCHEDULE_CALENDAR: str,
+}
+# Tuning, durations are given as HH:MM:SS
+OPTION_FIELDS = {
+    CONF_TARGET_TEMP: vol.Coerce(float),
+    CONF_MIN_TEMP: vol.Coerce(float),
+    CONF_MAX_TEMP: vol.Coerce(float),
+    CONF_AWAY_TEMP: vol.Coerce(float),
+    CONF_COLD_TOLERANCE: vol.Coerce(float),
+    CONF_HOT_TOLERANCE: vol.Coerce(float),
+    CONF_MIN_DUR: str,
+    CONF_REGULATION_DURATION: str,
+    CONF_REGULATION_NB_DURATION: vol.Coerce(int),
+    CONF_REGULATION_DELTA: vol.Coerce(float),
+    CONF_DIAGNOSTICS: bool,
+    CONF_RUNTIME_SENSORS: bool,
+}
+DEFAULT_OPTIONS = {
+    CONF_COLD_TOLERANCE: DEFAULT_TOLERANCE,
+    CONF_HOT_TOLERANCE: DEFAULT_TOLERANCE,
+    CONF_DIAGNOSTICS: False,
+    CONF_RUNTIME_SENSORS: False,
+}
+
+
+def _fields_schema(fields, values, required=()):
+    """Return the form of fields, filled with the current values."""
+    schema = {}
+    for key, validator in fields.items():
+        marker = vol.Required if key in required else vol.Optional
+        if values.get(key) is not None:
+            schema[marker(key, default=values[key])] = validator
+        else:
+            schema[marker(key)] = validator
+    return vol.Schema(schema)
+
+
+def _validate(hass, entry_id, config):
+    """Return the errors of the config of a thermostat, keyed by field."""
+    # Imported here, the platform pulls in NumPy
+    from .climate import PLATFORM_SCHEMA
+
+    try:
+        PLATFORM_SCHEMA(dict(config, platform=DOMAIN))
+    except vol.Invalid:
+        return {"base": "invalid_config"}
+    for key, other in hass.data.get(DOMAIN, {}).items():
+        if key != entry_id and other.heater_entity_id == config[CONF_HEATER]:
+            return {CONF_HEATER: "heater_in_use"}
+    return {}
+
+
+class CCLThermostatConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """Add a CCL thermostat."""
+
+    VERSION = 1
+    CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow of an entry."""
+        return CCLThermostatOptionsFlow(config_entry)
+
+    async def async_step_user(self, user_input=None):
+        """Name the thermostat and pick its entities."""
+        errors = {}
+        if user_input is not None:
+            name = user_input[CONF_NAME]
+            if any(other.name == name
+                   for other in self.hass.data.get(DOMAIN, {}).values()) \
+                    or any(entry.data[CONF_NAME] == name
+                           for entry in self._async_current_entries()):
+                return self.async_abort(reason="already_configured")
+            errors = _validate(self.hass, None, user_input)
+            if not errors:
+                return self.async_create_entry(title=name, data=user_input)
+
+        fields = dict({CONF_NAME: str}, **ENTITY_FIELDS)
+        return self.async_show_form(
+            step_id="user",
+            data_schema=_fields_schema(
+                fields, user_input or {CONF_NAME: DEFAULT_NAME},
+                (CONF_NAME, CONF_HEATER, CONF_SENSOR)),
+            errors=errors,
+        )
+
+
+class CCLThermostatOptionsFlow(config_entries.OptionsFlow):
+    """Change the entities and the tuning of a CCL thermostat."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Edit the options, the thermostat is reloaded with them."""
+        entry = self.config_entry
+        errors = {}
+        if user_input is not None:
+            # Empty entities are kept in the options so they hide the data
+            user_input = {
+                key: None if value == "" else value
+                for key, value in user_input.items()
+            }
+            errors = _validate(
+                self.hass, entry.entry_id,
+                entry_config(entry.data, user_input))
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        values = dict(DEFAULT_OPTIONS, **entry_config(
+            entry.data, entry.options, user_input or {}))
+        fields = dict(ENTITY_FIELDS, **OPTIONAL_ENTITY_FIELDS, **OPTION_FIELDS)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=_fields_schema(
+                fields, values, (CONF_HEATER, CONF_SENSOR)),
+            errors=errors,
+        )
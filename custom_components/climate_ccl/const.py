@@ -0,0 +1,47 @@
+"""Constants of the Climate CCL integration."""
+DOMAIN = "climate_ccl"
+DATA_COORDINATOR = "climate_ccl_coordinator"
+DATA_STORE = "climate_ccl_store"
+DATA_ENTRY_SETUP = "climate_ccl_entry_setup"
+DATA_HANDOVER = "climate_ccl_handover"
+
+# Options of a thermostat, shared by the platform and the config flow
+CONF_AWAY_TEMP = "away_temp"
+CONF_COLD_TOLERANCE = "cold_tolerance"
+CONF_HEAT = "heat"
+CONF_HEATER = "heater"
+CONF_HEATER_STATUS = "heater_status"
+CONF_HOT_TOLERANCE = "hot_tolerance"
+CONF_MAX_TEMP = "max_temp"
+CONF_MIN_DUR = "min_cycle_duration"
+CONF_MIN_TEMP = "min_temp"
+CONF_OUTDOOR_SENSOR = "outdoor_sensor"
+CONF_REGULATION = "regulation"
+CONF_REGULATION_DELTA = "regulation_delta"
+CONF_REGULATION_DURATION = "regulation_duration"
+CONF_REGULATION_NB_DURATION = "regulation_nb_duration"
+CONF_SCHEDULE_CALENDAR = "schedule_calendar"
+CONF_SENSOR = "target_sensor"
+CONF_STATE = "state"
+CONF_TARGET_TEMP = "target_temp"
+
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_FUEL_UNIT = "fuel_unit"
+CONF_RUNTIME_SENSORS = "runtime_sensors"
+CONF_TRACE_SIZE = "trace_size"
+
+DEFAULT_NAME = "CCL Generic Thermostat"
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_FUEL_UNIT = "kg"
+DEFAULT_TRACE_SIZE = 500
+
+# Sent with the name of a thermostat when its sensors may have changed
+SIGNAL_THERMOSTAT_UPDATED = "climate_ccl_updated_{}"
+
+SERVICE_APPLY = "apply"
+SERVICE_DUMP_STATS = "dump_stats"
+SERVICE_DUMP_TRACE = "dump_trace"
+EVENT_STATS = "climate_ccl_stats"
+
+ATTR_COUNT = "count"
+ATTR_FILENAME = "filename"
@@ -0,0 +1,192 @@
+"""Shared state listeners and timers of the CCL thermostats."""
+from datetime import timedelta
+import heapq
+import itertools
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+import homeassistant.util.dt as dt_util
+
+from .const import DATA_COORDINATOR
+
+
+@callback
+def async_get_coordinator(hass):
+    """Return the coordinator of hass, creating it on first use."""
+    coordinator = hass.data.get(DATA_COORDINATOR)
+    if coordinator is None:
+        coordinator = hass.data[DATA_COORDINATOR] = ThermostatCoordinator(hass)
+    return coordinator
+
+
+class ThermostatCoordinator:
+    """Route state changes and timers to the thermostats of a hass instance.
+
+    A single state_changed listener looks the entity up in an index and only
+    runs the listeners of the thermostats using it. Timers are kept in one
+    heap served by a single armed timer. Intervals tick on multiples of their
+    period, so the thermostats sharing a period wake up together.
+    """
+
+    def __init__(self, hass):
+        """Initialize an empty coordinator."""
+        self.hass = hass
+        self._listeners = {}
+        self._unsub_bus = None
+        self._timers = []
+        self._sequence = itertools.count()
+        self._cancelled = 0
+        self._unsub_timer = None
+        self._armed_at = None
+        self.dispatched = 0
+        self.wakeups = 0
+
+    @property
+    def listener_count(self):
+        """Return the number of registered state listeners."""
+        return sum(len(actions) for actions in self._listeners.values())
+
+    @property
+    def timer_count(self):
+        """Return the number of live timers."""
+        return len(self._timers) - self._cancelled
+
+    @callback
+    def async_track_state_change(self, entity_ids, action):
+        """Call action(entity_id, old_state, new_state) on each change.
+
+        Return a callback removing the listener.
+        """
+        if isinstance(entity_ids, str):
+            entity_ids = (entity_ids,)
+        entity_ids = tuple(entity_id.lower() for entity_id in entity_ids)
+        for entity_id in entity_ids:
+            self._listeners.setdefault(entity_id, []).append(action)
+        if self._unsub_bus is None:
+            self._unsub_bus = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_state_changed
+            )
+
+        @callback
+        def remove_listener():
+            """Remove the listener from the index."""
+            for entity_id in entity_ids:
+                actions = self._listeners.get(entity_id)
+                if actions and action in actions:
+                    actions.remove(action)
+                    if not actions:
+                        del self._listeners[entity_id]
+            if not self._listeners and self._unsub_bus is not None:
+                self._unsub_bus()
+                self._unsub_bus = None
+
+        return remove_listener
+
+    @callback
+    def _async_state_changed(self, event):
+        """Run the listeners of the changed entity."""
+        entity_id = event.data.get("entity_id")
+        actions = self._listeners.get(entity_id)
+        if not actions:
+            return
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        for action in list(actions):
+            self.dispatched += 1
+            self.hass.async_run_job(action, entity_id, old_state, new_state)
+
+    @callback
+    def async_track_point_in_utc_time(self, action, point_in_time):
+        """Call action(now) at point_in_time, return a cancel callback."""
+        entry = [dt_util.as_utc(point_in_time), next(self._sequence), action]
+        heapq.heappush(self._timers, entry)
+        self._async_arm()
+
+        @callback
+        def cancel():
+            """Cancel the timer, it is dropped when it reaches the head."""
+            if entry[2] is not None:
+                entry[2] = None
+                self._cancelled += 1
+
+        return cancel
+
+    @callback
+    def async_call_later(self, delay, action):
+        """Call action(now) in delay seconds, return a cancel callback."""
+        return self.async_track_point_in_utc_time(
+            action, dt_util.utcnow() + timedelta(seconds=delay)
+        )
+
+    @callback
+    def async_track_time_interval(self, action, interval):
+        """Call action(now) on every multiple of interval.
+
+        The first call comes at the next multiple, within one interval.
+        Return a callback removing the interval.
+        """
+        cancel = None
+
+        @callback
+        def interval_listener(now):
+            """Arm the next tick and run the action."""
+            nonlocal cancel
+            cancel = self.async_track_point_in_utc_time(
+                interval_listener, _next_tick(now, interval)
+            )
+            self.hass.async_run_job(action, now)
+
+        cancel = self.async_track_point_in_utc_time(
+            interval_listener, _next_tick(dt_util.utcnow(), interval)
+        )
+
+        @callback
+        def remove_listener():
+            """Remove the interval."""
+            cancel()
+
+        return remove_listener
+
+    @callback
+    def _async_arm(self):
+        """Arm the timer for the earliest live entry."""
+        while self._timers and self._timers[0][2] is None:
+            heapq.heappop(self._timers)
+            self._cancelled -= 1
+        if not self._timers:
+            if self._unsub_timer is not None:
+                self._unsub_timer()
+                self._unsub_timer = self._armed_at = None
+            return
+
+        point_in_time = self._timers[0][0]
+        if self._armed_at is not None and self._armed_at <= point_in_time:
+            return
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+        self._armed_at = point_in_time
+        self._unsub_timer = async_track_point_in_utc_time(
+            self.hass, self._async_wakeup, point_in_time
+        )
+
+    @callback
+    def _async_wakeup(self, now):
+        """Run the entries due at now."""
+        self._unsub_timer = self._armed_at = None
+        self.wakeups += 1
+        while self._timers and self._timers[0][0] <= now:
+            entry = heapq.heappop(self._timers)
+            action, entry[2] = entry[2], None
+            if action is None:
+                self._cancelled -= 1
+            else:
+                self.hass.async_run_job(action, now)
+        self._async_arm()
+
+
+def _next_tick(now, interval):
+    """Return the first multiple of interval after now."""
+    period = interval.total_seconds()
+    timestamp = dt_util.as_timestamp(now)
+    return dt_util.utc_from_timestamp((timestamp // period + 1) * period)
@@ -0,0 +1,90 @@
+"""Temperature estimation between sensor readings for the CCL thermostat."""
+
+# Weights of the level and rate corrections of a reading
+ALPHA = 0.5
+BETA = 0.2
+
+
+class TrendEstimator:
+    """Alpha-beta filter with one rate of change per heater state.
+
+    Each reading corrects the level and the rate learned for the heater
+    state of the elapsed interval, in constant time. Between readings the
+    temperature is extrapolated with the rate of the current heater state,
+    for at most `horizon`.
+    """
+
+    def __init__(self, horizon):
+        """Initialize the estimator, horizon is a timedelta."""
+        self._horizon = horizon.total_seconds()
+        self._level = None
+        self._time = None
+        self._heating = None
+        # °C per second, heater off and heater on
+        self._rates = [0.0, 0.0]
+
+    @property
+    def ready(self):
+        """Return True once a reading was received."""
+        return self._level is not None
+
+    def rate(self, heating):
+        """Return the rate learned for a heater state, in °C per hour."""
+        return self._rates[bool(heating)] * 3600
+
+    def update(self, time, value, heating):
+        """Add a reading taken at time, heating is the current heater state."""
+        if self._level is None:
+            self._level, self._time, self._heating = value, time, heating
+            return
+        elapsed = (time - self._time).total_seconds()
+        if elapsed <= 0:
+            self._level = value
+            self._heating = heating
+            return
+        index = bool(self._heating)
+        predicted = self._level + self._rates[index] * elapsed
+        residual = value - predicted
+        self._level = predicted + ALPHA * residual
+        if elapsed <= self._horizon:
+            # A rate is only learned over gaps it can be used for
+            self._rates[index] += BETA * residual / elapsed
+        self._time = time
+        self._heating = heating
+
+    def set_heating(self, time, heating):
+        """Record a heater change between readings."""
+        if self._level is None or heating == self._heating:
+            return
+        self._level = self.predict(time)
+        self._time = time
+        self._heating = heating
+
+    def predict(self, time):
+        """Return the estimated temperature at time."""
+        if self._level is None:
+            return None
+        elapsed = min((time - self._time).total_seconds(), self._horizon)
+        return self._level + self._rates[bool(self._heating)] * max(elapsed, 0)
+
+    def crossing(self, time, thresholds):
+        """Return when the estimate reaches the nearest threshold ahead.
+
+        Only thresholds in the direction of the current rate and within the
+        horizon are considered. Return None if there is none.
+        """
+        if self._level is None:
+            return None
+        rate = self._rates[bool(self._heating)]
+        if not rate:
+            return None
+        current = self.predict(time)
+        remaining = self._horizon - (time - self._time).total_seconds()
+        delay = None
+        for threshold in thresholds:
+            if threshold is None:
+                continue
+            seconds = (threshold - current) / rate
+            if 0 < seconds <= remaining and (delay is None or seconds < delay):
+                delay = seconds
+        return delay
@@ -0,0 +1,99 @@
+"""Single-flight control evaluation for the CCL thermostat."""
+import asyncio
+import logging
+from time import monotonic
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Trigger:
+    """Merged flags of the requests waiting for the same pass."""
+
+    def __init__(self, time, force, reconcile, requested):
+        """Initialize from the first request."""
+        self.time = time
+        self.force = force
+        self.reconcile = reconcile
+        self.requested = requested
+        self.count = 1
+
+    def merge(self, time, force, reconcile):
+        """Merge a request, keeping the strongest flags."""
+        self.force = self.force or force
+        self.reconcile = self.reconcile or reconcile
+        if time is not None:
+            self.time = time
+        self.count += 1
+
+
+class CoalescingEvaluator:
+    """Run one evaluation at a time, latest wins.
+
+    Requests arriving while a pass runs are merged into a single follow-up
+    pass with the strongest flags: force, reconcile and the keep-alive
+    time. Every request returns once a pass started after it has completed.
+    """
+
+    def __init__(self, evaluate):
+        """Initialize with the coroutine function running a pass."""
+        self._evaluate = evaluate
+        self._running = False
+        self._pending = None
+        self._pending_done = None
+        self.merged = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self):
+        """Return the number of requests waiting for the next pass."""
+        return self._pending.count if self._pending is not None else 0
+
+    async def async_request(self, time=None, force=False, reconcile=False):
+        """Request an evaluation and wait for it."""
+        if self._running:
+            if self._pending is None:
+                self._pending = _Trigger(time, force, reconcile, monotonic())
+                self._pending_done = asyncio.get_event_loop().create_future()
+            else:
+                self._pending.merge(time, force, reconcile)
+                self.merged += 1
+            await asyncio.shield(self._pending_done)
+            return
+
+        self._running = True
+        try:
+            await self._async_run(_Trigger(time, force, reconcile, monotonic()))
+        finally:
+            try:
+                await self._async_run_pending()
+            finally:
+                self._running = False
+
+    async def _async_run_pending(self):
+        """Run the follow-up passes requested during the previous one."""
+        while self._pending is not None:
+            trigger, done = self._pending, self._pending_done
+            self._pending = self._pending_done = None
+            try:
+                await self._async_run(trigger)
+            except asyncio.CancelledError:
+                done.cancel()
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                # The requests may all be gone, the error is logged here
+                _LOGGER.exception("Error in a merged control pass")
+                if not done.done():
+                    done.set_exception(err)
+                    # Retrieved, a cancelled waiter leaves no warning
+                    done.exception()
+            else:
+                if not done.done():
+                    done.set_result(None)
+
+    async def _async_run(self, trigger):
+        """Run one pass for a trigger."""
+        self.last_wait = monotonic() - trigger.requested
+        self.max_wait = max(self.max_wait, self.last_wait)
+        await self._evaluate(
+            time=trigger.time, force=trigger.force, reconcile=trigger.reconcile)
@@ -0,0 +1,63 @@
+"""Decision logic of the CCL thermostat, free of Home Assistant state.
+
+CCLGenericThermostat feeds these functions from its entities, the tuner from
+recorded history.
+"""
+from homeassistant.components.climate.const import HVAC_MODE_COOL
+
+# Stove off, waiting for the room to cool down
+HVAC_MODE_IDLE = "standby"
+# Heating with the heater on a duty cycle, near the target
+HVAC_MODE_REGULATION = 'regulation'
+
+
+def decide(cur_temp, target_temp, heating, cold_tolerance, hot_tolerance,
+           regulation_delta):
+    """Return the next heating mode, too cold and too hot.
+
+    The stove is turned on below target - cold_tolerance and off above
+    target + hot_tolerance. While on, it heats at full power up to
+    target - regulation_delta and regulates above.
+    """
+    too_cold = target_temp - cur_temp >= cold_tolerance
+    too_hot = cur_temp - target_temp >= hot_tolerance
+    if heating:
+        if too_hot:
+            next_state = HVAC_MODE_IDLE
+        elif regulation_delta is not None \
+                and cur_temp >= target_temp - regulation_delta:
+            next_state = HVAC_MODE_REGULATION
+        else:
+            next_state = HVAC_MODE_COOL
+    elif too_cold:
+        next_state = HVAC_MODE_COOL
+    else:
+        next_state = HVAC_MODE_IDLE
+    return next_state, too_cold, too_hot
+
+
+def min_cycle_allowed_at(heating, next_state, last_transition, min_cycle_duration):
+    """Return when switching to next_state is allowed, None if not restricted.
+
+    Only turning the stove on or off is restricted, within min_cycle_duration
+    of its last transition.
+    """
+    if heating == (next_state != HVAC_MODE_IDLE):
+        return None
+    if last_transition is None or not min_cycle_duration:
+        return None
+    return last_transition + min_cycle_duration
+
+
+def decide_array(cur_temp, target_temp, heating, cold_tolerance, hot_tolerance,
+                 regulation_delta):
+    """Apply decide to NumPy arrays of candidates at once.
+
+    Return the masks of the stove on, in regulation, too cold and too hot.
+    A NaN regulation_delta never regulates, as None does in decide.
+    """
+    too_cold = target_temp - cur_temp >= cold_tolerance
+    too_hot = cur_temp - target_temp >= hot_tolerance
+    heat = (heating & ~too_hot) | (~heating & too_cold)
+    regulation = heating & heat & (cur_temp >= target_temp - regulation_delta)
+    return heat, regulation, too_cold, too_hot
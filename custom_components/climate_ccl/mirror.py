@@ -0,0 +1,46 @@
+"""In-memory mirror of the entities used by the CCL thermostat."""
+from homeassistant.core import callback
+
+
+class StateMirror:
+    """Snapshot of entity states kept current by state listeners.
+
+    The dispatcher writes the targets it reached into the mirror, so the echo
+    of our own calls can be told apart from changes made outside the
+    thermostat.
+    """
+
+    def __init__(self, hass, entity_ids):
+        """Initialize the mirror from the state machine."""
+        self._states = {}
+        for entity_id in entity_ids:
+            if entity_id is None:
+                continue
+            state = hass.states.get(entity_id)
+            self._states[entity_id] = state.state if state is not None else None
+
+    @property
+    def entity_ids(self):
+        """Return the mirrored entity ids."""
+        return list(self._states)
+
+    def get(self, entity_id):
+        """Return the mirrored state of an entity."""
+        return self._states.get(entity_id)
+
+    def is_state(self, entity_id, state):
+        """Test if the mirrored entity is in the specified state."""
+        return entity_id in self._states and self._states[entity_id] == state
+
+    @callback
+    def async_set(self, entity_id, state):
+        """Record a state reached by one of our calls."""
+        self._states[entity_id] = state
+
+    @callback
+    def async_update(self, entity_id, new_state):
+        """Apply a state change, return True if it was not already mirrored."""
+        value = new_state.state if new_state is not None else None
+        changed = self._states.get(entity_id) != value
+        self._states[entity_id] = value
+        return changed
@@ -0,0 +1,85 @@
+"""Regulation duty cycle for the CCL thermostat."""
+from homeassistant.core import callback
+import homeassistant.util.dt as dt_util
+
+
+def regulation_times(on_time, off_time, duration, nb_duration):
+    """Return the (on time, off time) of the regulation duty cycle.
+
+    Explicit on/off times win over the legacy setting, where the heater is
+    on for one regulation_duration out of regulation_nb_duration. A phase
+    of None never ends.
+    """
+    on_time = on_time or duration
+    if off_time is None and duration and nb_duration:
+        off_time = duration * (nb_duration - 1)
+    if off_time is not None and not off_time:
+        # No off phase, the heater stays on
+        on_time = None
+    return on_time, off_time
+
+
+class DutyCycleScheduler:
+    """Drive the heater through the on/off edges of a regulation cycle.
+
+    Only one timer is armed at a time, for the next edge, and only while the
+    cycle runs. A phase with no duration lasts until the cycle is stopped.
+    """
+
+    def __init__(self, coordinator, on_time, off_time, action):
+        """Initialize the scheduler on the timers of the coordinator.
+
+        `action` is a coroutine function called with the new heater state
+        (True for on) at each edge.
+        """
+        self._coordinator = coordinator
+        self.on_time = on_time
+        self.off_time = off_time
+        self._action = action
+        self._unsub = None
+        self.heater_on = None
+        self.next_edge = None
+
+    @property
+    def active(self):
+        """Return True if the cycle is running."""
+        return self.heater_on is not None
+
+    @callback
+    def async_start(self, heater_on=True, next_edge=None):
+        """Start the cycle in the given phase.
+
+        The heater is expected to be in that phase already. `next_edge` lets a
+        caller resume a phase that started earlier.
+        """
+        self.async_stop()
+        self.heater_on = heater_on
+        self._async_arm(next_edge)
+
+    @callback
+    def async_stop(self):
+        """Stop the cycle and cancel the pending edge."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self.heater_on = None
+        self.next_edge = None
+
+    @callback
+    def _async_arm(self, next_edge=None):
+        """Arm the timer for the end of the current phase."""
+        duration = self.on_time if self.heater_on else self.off_time
+        if next_edge is None and duration:
+            next_edge = dt_util.utcnow() + duration
+        self.next_edge = next_edge
+        if next_edge is not None:
+            self._unsub = self._coordinator.async_track_point_in_utc_time(
+                self._async_edge, next_edge
+            )
+
+    async def _async_edge(self, now):
+        """Switch to the other phase."""
+        self._unsub = None
+        self.heater_on = not self.heater_on
+        self._async_arm()
+        await self._action(self.heater_on)
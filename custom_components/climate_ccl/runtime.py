@@ -0,0 +1,139 @@
+"""Runtime and cycle accounting of the CCL thermostat.
+
+The figures are accumulated at each transition of the stove, nothing is read
+back from the recorder. Days and weeks follow the local time zone, weeks
+start on Monday.
+"""
+from datetime import datetime, time as dt_time, timedelta
+
+from homeassistant.core import callback
+import homeassistant.util.dt as dt_util
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_TOTAL = "total"
+PERIODS = (PERIOD_DAY, PERIOD_WEEK, PERIOD_TOTAL)
+
+# Seconds with the heater on, of which in regulation, stove starts and fuel
+FIGURE_ON_TIME = "on_time"
+FIGURE_REGULATION_TIME = "regulation_time"
+FIGURE_CYCLES = "cycles"
+FIGURE_FUEL = "fuel"
+FIGURES = (FIGURE_ON_TIME, FIGURE_REGULATION_TIME, FIGURE_CYCLES, FIGURE_FUEL)
+
+# Keys of the saved state
+ATTR_FIGURES = "figures"
+ATTR_DAY = "day"
+ATTR_SINCE = "since"
+ATTR_STOVE_ON = "stove_on"
+ATTR_HEATER_ON = "heater_on"
+ATTR_REGULATING = "regulating"
+
+
+class RuntimeMeter:
+    """Daily, weekly and total figures of a stove.
+
+    `async_update` closes the interval since the previous transition, so
+    each update costs the same whatever the history.
+    """
+
+    def __init__(self, burn_rate=None):
+        """Initialize the meter, burn_rate is the fuel used per hour on."""
+        self._burn_rate = burn_rate
+        self._figures = {
+            period: dict.fromkeys(FIGURES, 0) for period in PERIODS
+        }
+        self._day = None
+        self._day_end = None
+        self._since = None
+        self._stove_on = False
+        self._heater_on = False
+        self._regulating = False
+
+    @property
+    def burn_rate(self):
+        """Return the fuel used per hour with the heater on."""
+        return self._burn_rate
+
+    @callback
+    def async_update(self, now, stove_on, heater_on, regulating):
+        """Account the time since the last update and apply a transition."""
+        self._accumulate(now)
+        if stove_on and not self._stove_on:
+            for figures in self._figures.values():
+                figures[FIGURE_CYCLES] += 1
+        self._stove_on = stove_on
+        self._heater_on = heater_on
+        self._regulating = regulating
+
+    def get(self, period, figure, now):
+        """Return a figure of a period, up to now."""
+        self._accumulate(now)
+        return self._figures[period][figure]
+
+    def _accumulate(self, now):
+        """Add the time since the last update, day by day."""
+        if self._since is None:
+            self._since = now
+            self._start_day(now, False)
+            return
+        while self._since < now:
+            end = min(now, self._day_end)
+            self._add((end - self._since).total_seconds())
+            self._since = end
+            if end >= self._day_end:
+                self._start_day(end, True)
+
+    def _add(self, seconds):
+        """Add an interval in the current state."""
+        if not self._heater_on:
+            return
+        fuel = seconds / 3600 * self._burn_rate if self._burn_rate else 0
+        for figures in self._figures.values():
+            figures[FIGURE_ON_TIME] += seconds
+            if self._regulating:
+                figures[FIGURE_REGULATION_TIME] += seconds
+            figures[FIGURE_FUEL] += fuel
+
+    def _start_day(self, time, reset):
+        """Track the local day of time, resetting the figures of a new one."""
+        self._day = dt_util.as_local(time).date()
+        self._day_end = _next_day_start(self._day)
+        if not reset:
+            return
+        self._figures[PERIOD_DAY] = dict.fromkeys(FIGURES, 0)
+        if self._day.weekday() == 0:
+            self._figures[PERIOD_WEEK] = dict.fromkeys(FIGURES, 0)
+
+    def as_dict(self):
+        """Return the state to save."""
+        return {
+            ATTR_FIGURES: {
+                period: dict(figures) for period, figures in self._figures.items()
+            },
+            ATTR_DAY: self._day.isoformat() if self._day else None,
+            ATTR_SINCE: self._since.isoformat() if self._since else None,
+            ATTR_STOVE_ON: self._stove_on,
+            ATTR_HEATER_ON: self._heater_on,
+            ATTR_REGULATING: self._regulating,
+        }
+
+    def restore(self, data):
+        """Resume a saved state, the stove kept its state while stopped."""
+        if not data or not data.get(ATTR_SINCE):
+            return
+        for period, figures in data[ATTR_FIGURES].items():
+            if period in self._figures:
+                self._figures[period].update(figures)
+        self._since = dt_util.parse_datetime(data[ATTR_SINCE])
+        self._day = dt_util.parse_date(data[ATTR_DAY])
+        self._day_end = _next_day_start(self._day)
+        self._stove_on = data[ATTR_STOVE_ON]
+        self._heater_on = data[ATTR_HEATER_ON]
+        self._regulating = data[ATTR_REGULATING]
+
+
+def _next_day_start(day):
+    """Return the start of the local day after a date."""
+    return dt_util.start_of_local_day(
+        datetime.combine(day + timedelta(days=1), dt_time()))
@@ -0,0 +1,389 @@
+"""Heating schedule of the CCL thermostat.
+
+Schedule entries come from the configuration (weekly time ranges) and from a
+calendar entity whose events are named like the automations expected them,
+"19 #heat". They are compiled into a timeline of disjoint segments sorted by
+start, each holding the setpoint in effect. One timer is armed for the next
+transition.
+
+With a lead time function, a heating setpoint is applied early enough for
+the room to reach it at the start of its entry (optimum start).
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import logging
+import re
+
+import voluptuous as vol
+
+from homeassistant.components.calendar import get_date
+from homeassistant.components.climate.const import (
+    ATTR_HVAC_MODE,
+    HVAC_MODE_HEAT,
+    HVAC_MODE_OFF,
+)
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_START = "start"
+CONF_END = "end"
+CONF_DAYS = "days"
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Days of the timeline compiled ahead
+HORIZON = timedelta(days=7)
+# Period of the calendar refresh, the calendar is also read on each change
+CALENDAR_REFRESH = timedelta(minutes=5)
+# Delay before reading the calendar again after a failure
+CALENDAR_RETRY = timedelta(minutes=1)
+# Period of the lead time update before a pre-heat
+PREHEAT_CHECK = timedelta(minutes=15)
+
+RE_TEMPERATURE = re.compile(r"(-?\d+(?:[.,]\d+)?)")
+RE_MODE = re.compile(r"#(\w+)")
+
+
+def parse_time(value):
+    """Parse HH:MM into a time."""
+    return datetime.strptime(value, "%H:%M").time()
+
+
+# Hvac modes a schedule entry or a calendar event may set
+SCHEDULE_HVAC_MODES = [HVAC_MODE_HEAT, HVAC_MODE_OFF]
+
+SCHEDULE_ENTRY_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_START): vol.All(cv.string, parse_time),
+        vol.Required(CONF_END): vol.All(cv.string, parse_time),
+        vol.Optional(CONF_DAYS, default=WEEKDAYS): vol.All(
+            cv.ensure_list, [vol.In(WEEKDAYS)]),
+        vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+        vol.Optional(ATTR_HVAC_MODE, default=HVAC_MODE_HEAT): vol.In(
+            SCHEDULE_HVAC_MODES),
+    }
+)
+
+
+class Setpoint:
+    """Target temperature and hvac mode set by the schedule."""
+
+    __slots__ = ["temperature", "hvac_mode"]
+
+    def __init__(self, temperature, hvac_mode):
+        """Initialize the setpoint."""
+        self.temperature = temperature
+        self.hvac_mode = hvac_mode
+
+    def __eq__(self, other):
+        """Compare two setpoints."""
+        return (
+            isinstance(other, Setpoint)
+            and self.temperature == other.temperature
+            and self.hvac_mode == other.hvac_mode
+        )
+
+    def __repr__(self):
+        """Return the setpoint for logging."""
+        return "<Setpoint {} {}>".format(self.hvac_mode, self.temperature)
+
+
+# Setpoint outside of the schedule entries
+SETPOINT_OFF = Setpoint(None, HVAC_MODE_OFF)
+
+
+class ScheduleEntry:
+    """One time range of the schedule."""
+
+    __slots__ = ["start", "end", "setpoint"]
+
+    def __init__(self, start, end, setpoint):
+        """Initialize the entry, start and end are UTC datetimes."""
+        self.start = start
+        self.end = end
+        self.setpoint = setpoint
+
+
+class Timeline:
+    """Disjoint segments of the schedule, sorted by start.
+
+    Where entries overlap, the one starting last wins. `at` and
+    `next_transition` are binary searches.
+    """
+
+    def __init__(self, entries, start, end):
+        """Compile the entries over [start, end)."""
+        entries = [
+            entry for entry in entries
+            if entry.end > start and entry.start < end and entry.start < entry.end
+        ]
+        bounds = {start, end}
+        for entry in entries:
+            bounds.add(max(entry.start, start))
+            bounds.add(min(entry.end, end))
+        bounds = sorted(bounds)
+        # Latest start first, the first entry covering a segment wins
+        entries.sort(key=lambda entry: entry.start, reverse=True)
+
+        self.start = start
+        self.end = end
+        self._starts = []
+        self._setpoints = []
+        for seg_start, seg_end in zip(bounds, bounds[1:]):
+            setpoint = next(
+                (entry.setpoint for entry in entries
+                 if entry.start <= seg_start and entry.end >= seg_end),
+                SETPOINT_OFF,
+            )
+            if self._setpoints and self._setpoints[-1] == setpoint:
+                continue
+            self._starts.append(seg_start)
+            self._setpoints.append(setpoint)
+
+    def __len__(self):
+        """Return the number of segments."""
+        return len(self._starts)
+
+    def at(self, point_in_time):
+        """Return the setpoint in effect at point_in_time."""
+        index = bisect_right(self._starts, point_in_time) - 1
+        if index < 0 or point_in_time >= self.end:
+            return None
+        return self._setpoints[index]
+
+    def next_transition(self, point_in_time):
+        """Return the first segment start after point_in_time, or None."""
+        index = bisect_right(self._starts, point_in_time)
+        if index < len(self._starts):
+            return self._starts[index]
+        return None
+
+
+def expand_weekly(config_entries, start, end):
+    """Return the ScheduleEntry of configured weekly ranges over [start, end)."""
+    entries = []
+    local_tz = dt_util.DEFAULT_TIME_ZONE
+    day = dt_util.as_local(start).date() - timedelta(days=1)
+    last_day = dt_util.as_local(end).date()
+    while day <= last_day:
+        weekday = WEEKDAYS[day.weekday()]
+        for config in config_entries:
+            if weekday not in config[CONF_DAYS]:
+                continue
+            entry_start = _localize(local_tz, datetime.combine(day, config[CONF_START]))
+            entry_end = _localize(local_tz, datetime.combine(day, config[CONF_END]))
+            if entry_end <= entry_start:
+                # Range over midnight
+                entry_end = _localize(
+                    local_tz,
+                    datetime.combine(day + timedelta(days=1), config[CONF_END]),
+                )
+            entries.append(
+                ScheduleEntry(
+                    dt_util.as_utc(entry_start),
+                    dt_util.as_utc(entry_end),
+                    Setpoint(config.get(ATTR_TEMPERATURE), config[ATTR_HVAC_MODE]),
+                )
+            )
+        day += timedelta(days=1)
+    return entries
+
+
+def _localize(time_zone, naive):
+    """Attach a time zone to a naive datetime."""
+    if hasattr(time_zone, "localize"):
+        return time_zone.localize(naive)
+    return naive.replace(tzinfo=time_zone)
+
+
+def parse_event(event):
+    """Return the ScheduleEntry of a calendar event, None if not a setpoint.
+
+    The temperature is the first number of the summary, the hvac mode a
+    #mode tag, heat by default. An event with another mode is not a setpoint.
+    """
+    text = event.get("summary") or event.get("message") or ""
+    match = RE_TEMPERATURE.search(text)
+    if match is None:
+        return None
+    mode = RE_MODE.search(text)
+    hvac_mode = mode.group(1).lower() if mode else HVAC_MODE_HEAT
+    if hvac_mode not in SCHEDULE_HVAC_MODES:
+        return None
+    start = get_date(event["start"])
+    end = get_date(event["end"])
+    if start is None or end is None:
+        return None
+    return ScheduleEntry(
+        dt_util.as_utc(start),
+        dt_util.as_utc(end),
+        Setpoint(float(match.group(1).replace(",", ".")), hvac_mode),
+    )
+
+
+class ScheduleEngine:
+    """Apply the setpoints of a schedule at its transitions."""
+
+    def __init__(self, hass, coordinator, weekly, calendar_entity_id, apply,
+                 lead_time=None):
+        """Initialize the engine.
+
+        `apply` is a coroutine function called with the temperature and hvac
+        mode of a setpoint, as one change. `lead_time` returns the timedelta
+        needed to reach a setpoint, or None.
+        """
+        self.hass = hass
+        self._coordinator = coordinator
+        self._weekly = weekly or []
+        self._calendar_entity_id = calendar_entity_id
+        self._apply = apply
+        self._calendar_entries = []
+        self._calendar_refresh_at = None
+        self._calendar_loaded = False
+        self._timeline = None
+        self._applied = None
+        self._lead_time = lead_time
+        self._preheat_for = None
+        self._unsub = None
+        self._unsub_calendar = None
+        self.next_transition = None
+        self.preheat_start = None
+
+    @property
+    def timeline(self):
+        """Return the compiled timeline."""
+        return self._timeline
+
+    async def async_start(self):
+        """Compile the schedule and apply the setpoint in effect."""
+        if self._calendar_entity_id is not None and self._unsub_calendar is None:
+            self._unsub_calendar = self._coordinator.async_track_state_change(
+                self._calendar_entity_id, self._async_calendar_changed
+            )
+        await self._async_run(dt_util.utcnow())
+
+    @callback
+    def async_stop(self):
+        """Cancel the next transition and the calendar listener."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        if self._unsub_calendar is not None:
+            self._unsub_calendar()
+            self._unsub_calendar = None
+        self.next_transition = None
+        self.preheat_start = None
+
+    async def _async_calendar_changed(self, entity_id, old_state, new_state):
+        """Read the calendar again when an event starts, ends or changes."""
+        if new_state is None:
+            return
+        self._calendar_refresh_at = None
+        await self._async_run(dt_util.utcnow())
+
+    async def _async_transition(self, now):
+        """Apply the setpoint of a transition."""
+        self._unsub = None
+        await self._async_run(now)
+
+    async def _async_run(self, now):
+        """Apply the setpoint in effect at now and arm the next transition."""
+        refreshed = False
+        if self._calendar_entity_id is not None and (
+            self._calendar_refresh_at is None
+            or now >= self._calendar_refresh_at
+        ):
+            await self._async_refresh_calendar(now)
+            refreshed = True
+        if refreshed or self._timeline is None \
+                or now >= self._timeline.end - HORIZON / 2:
+            self._compile(now)
+
+        setpoint = self._timeline.at(now)
+        next_transition = self._timeline.next_transition(now)
+        if next_transition is None or next_transition != self._preheat_for:
+            self.preheat_start = self._preheat_start(setpoint, next_transition)
+            if self.preheat_start is not None and now >= self.preheat_start:
+                _LOGGER.debug("Pre-heating for the transition at %s",
+                              next_transition)
+                self._preheat_for = next_transition
+        if next_transition is not None and next_transition == self._preheat_for:
+            # Once started, the pre-heat goes on until the transition
+            setpoint = self._timeline.at(next_transition)
+        if setpoint == SETPOINT_OFF and self._calendar_entity_id is not None \
+                and not self._calendar_loaded:
+            # The calendar may hold an event now, keep the current setpoint
+            setpoint = None
+        if setpoint is not None and setpoint != self._applied:
+            self._applied = setpoint
+            _LOGGER.debug("Schedule setpoint %s", setpoint)
+            await self._apply(setpoint.temperature, setpoint.hvac_mode)
+
+        wake_up = next_transition or self._timeline.end
+        if self.preheat_start is not None and now < self.preheat_start:
+            # The lead time follows the room until the pre-heat starts
+            wake_up = min(wake_up, self.preheat_start, now + PREHEAT_CHECK)
+        if self._calendar_entity_id is not None:
+            wake_up = min(wake_up, self._calendar_refresh_at)
+        if self._unsub is not None:
+            self._unsub()
+        self.next_transition = next_transition
+        self._unsub = self._coordinator.async_track_point_in_utc_time(
+            self._async_transition, wake_up
+        )
+
+    def _preheat_start(self, setpoint, next_transition):
+        """Return when to apply the next setpoint ahead of its transition."""
+        if self._lead_time is None or next_transition is None:
+            return None
+        upcoming = self._timeline.at(next_transition)
+        if upcoming is None or upcoming.hvac_mode != HVAC_MODE_HEAT \
+                or upcoming.temperature is None:
+            return None
+        if setpoint is not None and setpoint.hvac_mode == HVAC_MODE_HEAT \
+                and setpoint.temperature is not None \
+                and setpoint.temperature >= upcoming.temperature:
+            return None
+        lead = self._lead_time(upcoming)
+        if not lead:
+            return None
+        return next_transition - lead
+
+    @callback
+    def _compile(self, now):
+        """Compile the timeline from now over the horizon."""
+        end = now + HORIZON
+        entries = expand_weekly(self._weekly, now, end) + self._calendar_entries
+        self._timeline = Timeline(entries, now, end)
+
+    async def _async_refresh_calendar(self, now):
+        """Read the events of the calendar over the horizon.
+
+        A failed read keeps the last events and is retried shortly.
+        """
+        self._calendar_refresh_at = now + CALENDAR_RETRY
+        component = self.hass.data.get("calendar")
+        entity = component.get_entity(self._calendar_entity_id) \
+            if component is not None else None
+        if entity is None:
+            _LOGGER.warning("Schedule calendar %s not found",
+                            self._calendar_entity_id)
+            return
+        try:
+            events = await entity.async_get_events(self.hass, now, now + HORIZON)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Unable to read calendar %s: %s",
+                            self._calendar_entity_id, err)
+            return
+        entries = []
+        for event in events:
+            entry = parse_event(event)
+            if entry is not None:
+                entries.append(entry)
+        self._calendar_entries = entries
+        self._calendar_loaded = True
+        self._calendar_refresh_at = now + CALENDAR_REFRESH
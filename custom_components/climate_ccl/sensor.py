@@ -0,0 +1,272 @@
+"""Diagnostic and runtime sensors of the CCL thermostat."""
+from abc import ABC, abstractmethod
+
+from homeassistant.const import ATTR_ENTITY_ID, CONF_NAME
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+import homeassistant.util.dt as dt_util
+
+from . import entry_config
+from .const import (
+    CONF_DIAGNOSTICS,
+    CONF_FUEL_UNIT,
+    CONF_RUNTIME_SENSORS,
+    DEFAULT_FUEL_UNIT,
+    DOMAIN,
+    SIGNAL_THERMOSTAT_UPDATED,
+)
+from .runtime import (
+    FIGURE_CYCLES,
+    FIGURE_FUEL,
+    FIGURE_ON_TIME,
+    FIGURE_REGULATION_TIME,
+    PERIOD_DAY,
+    PERIOD_TOTAL,
+    PERIOD_WEEK,
+)
+
+UNIT_MILLISECONDS = "ms"
+UNIT_HOURS = "h"
+
+RUNTIME_PERIODS = {
+    PERIOD_DAY: "today",
+    PERIOD_WEEK: "this week",
+    PERIOD_TOTAL: "total",
+}
+# Label, unit, icon, the fuel unit is configured
+RUNTIME_FIGURES = {
+    FIGURE_ON_TIME: ("Runtime", UNIT_HOURS, "mdi:fire"),
+    FIGURE_REGULATION_TIME: ("Regulation runtime", UNIT_HOURS, "mdi:waves"),
+    FIGURE_CYCLES: ("Cycles", None, "mdi:counter"),
+    FIGURE_FUEL: ("Fuel", None, "mdi:gas-station"),
+}
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the sensors of a thermostat."""
+    if discovery_info is None:
+        return
+    _async_setup_sensors(
+        hass, discovery_info[ATTR_ENTITY_ID], discovery_info, async_add_entities)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the sensors of the thermostat of a config entry."""
+    _async_setup_sensors(
+        hass, config_entry.entry_id,
+        entry_config(config_entry.data, config_entry.options),
+        async_add_entities)
+
+
+@callback
+def _async_setup_sensors(hass, key, config, async_add_entities):
+    """Add the sensors enabled in the config of the thermostat at key."""
+    name = config[CONF_NAME]
+    thermostat = hass.data.get(DOMAIN, {}).get(key)
+    if thermostat is None:
+        # The thermostat was not set up
+        return
+
+    entities = []
+    if config.get(CONF_DIAGNOSTICS):
+        entities.extend(_stats_sensors(thermostat, name))
+    if config.get(CONF_RUNTIME_SENSORS):
+        fuel_unit = config.get(CONF_FUEL_UNIT) or DEFAULT_FUEL_UNIT
+        entities.extend(
+            RuntimeSensor(thermostat, name, period, figure, fuel_unit)
+            for period in RUNTIME_PERIODS
+            for figure in RUNTIME_FIGURES
+            if figure != FIGURE_FUEL or thermostat.runtime.burn_rate
+        )
+    async_add_entities(entities)
+
+
+def _stats_sensors(thermostat, name):
+    """Return the diagnostic sensors of a thermostat."""
+    return [
+        StatsTimingSensor(thermostat, name, "evaluations", "Evaluations"),
+        StatsTimingSensor(thermostat, name, "lock_hold", "Lock hold"),
+        StatsServiceLatencySensor(thermostat, name),
+        StatsCounterSensor(thermostat, name, "decisions", "Decisions"),
+        StatsCounterSensor(
+            thermostat, name, "min_cycle_blocked", "Min cycle blocked"
+        ),
+        StatsCounterSensor(
+            thermostat, name, "regulation_edges", "Regulation edges"
+        ),
+    ]
+
+
+class ThermostatSensor(Entity, ABC):
+    """Sensor updated when its thermostat signals a change."""
+
+    def __init__(self, thermostat, name, suffix):
+        """Initialize the sensor, suffix tells it from the other sensors."""
+        self._thermostat = thermostat
+        self._name = name
+        self._suffix = suffix
+        self._value = None
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return the ID of the sensor, derived from the thermostat one."""
+        if self._thermostat.unique_id is None:
+            return None
+        return "{}_{}".format(self._thermostat.unique_id, self._suffix)
+
+    @property
+    def should_poll(self):
+        """No polling, the thermostat signals the changes."""
+        return False
+
+    async def async_added_to_hass(self):
+        """Read the figure and follow the thermostat."""
+        self._async_read()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_THERMOSTAT_UPDATED.format(self._thermostat.name),
+                self._async_updated,
+            )
+        )
+
+    @callback
+    def _async_updated(self):
+        """Read the figure again and write the state."""
+        self._async_read()
+        self.async_write_ha_state()
+
+    @callback
+    @abstractmethod
+    def _async_read(self):
+        """Read the figure from the thermostat."""
+
+
+class StatsSensor(ThermostatSensor):
+    """Sensor showing one of the counters of a thermostat."""
+
+    def __init__(self, thermostat, name, key, label):
+        """Initialize the sensor."""
+        super().__init__(thermostat, "{} {}".format(name, label), key)
+        self._key = key
+        self._value = {}
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return "mdi:chart-bar"
+
+    @callback
+    def _async_read(self):
+        """Read the counter from the thermostat."""
+        self._value = self._thermostat.stats.as_dict().get(self._key)
+
+
+class StatsTimingSensor(StatsSensor):
+    """Sensor showing the 95th percentile of a timing."""
+
+    @property
+    def state(self):
+        """Return the 95th percentile in milliseconds."""
+        if not self._value:
+            return None
+        return self._value.get("p95")
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return UNIT_MILLISECONDS
+
+    @property
+    def device_state_attributes(self):
+        """Return the whole histogram summary."""
+        return self._value
+
+
+class StatsServiceLatencySensor(StatsSensor):
+    """Sensor showing the worst service call latency across targets."""
+
+    def __init__(self, thermostat, name):
+        """Initialize the sensor."""
+        super().__init__(thermostat, name, "service_latency", "Service latency")
+
+    @property
+    def state(self):
+        """Return the worst 95th percentile in milliseconds."""
+        if not self._value:
+            return None
+        return max(latency.get("p95", 0) for latency in self._value.values())
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return UNIT_MILLISECONDS
+
+    @property
+    def device_state_attributes(self):
+        """Return the latency summary per target entity."""
+        return self._value
+
+
+class StatsCounterSensor(StatsSensor):
+    """Sensor showing a counter, or the total of a counter per key."""
+
+    @property
+    def state(self):
+        """Return the counter."""
+        if isinstance(self._value, dict):
+            return sum(self._value.values())
+        return self._value
+
+    @property
+    def device_state_attributes(self):
+        """Return the counter per key."""
+        if isinstance(self._value, dict):
+            return self._value
+        return None
+
+
+class RuntimeSensor(ThermostatSensor):
+    """Sensor showing a runtime figure of a thermostat over a period."""
+
+    def __init__(self, thermostat, name, period, figure, fuel_unit):
+        """Initialize the sensor."""
+        label, unit, self._icon = RUNTIME_FIGURES[figure]
+        super().__init__(
+            thermostat, "{} {} {}".format(name, label, RUNTIME_PERIODS[period]),
+            "{}_{}".format(figure, period))
+        self._period = period
+        self._figure = figure
+        self._unit = fuel_unit if figure == FIGURE_FUEL else unit
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return self._icon
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return self._unit
+
+    @property
+    def state(self):
+        """Return the figure."""
+        return self._value
+
+    @callback
+    def _async_read(self):
+        """Read the figure from the runtime meter."""
+        value = self._thermostat.runtime.get(
+            self._period, self._figure, dt_util.utcnow())
+        if self._unit == UNIT_HOURS:
+            value = round(value / 3600, 2)
+        elif self._figure == FIGURE_FUEL:
+            value = round(value, 2)
+        self._value = value
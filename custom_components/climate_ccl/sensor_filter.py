@@ -0,0 +1,68 @@
+"""Temperature input filters for the CCL thermostat."""
+from collections import deque
+
+FILTER_NONE = "none"
+FILTER_EXPONENTIAL = "exponential"
+FILTER_MEDIAN = "median"
+
+
+class PassThroughFilter:
+    """Filter returning the raw reading."""
+
+    def update(self, value):
+        """Add a reading and return the filtered value."""
+        return value
+
+    def reset(self):
+        """Forget the previous readings."""
+
+
+class ExponentialFilter:
+    """Exponential moving average of the readings."""
+
+    def __init__(self, alpha):
+        """Initialize the filter, alpha is the weight of a new reading."""
+        self._alpha = alpha
+        self._value = None
+
+    def update(self, value):
+        """Add a reading and return the filtered value."""
+        if self._value is None:
+            self._value = value
+        else:
+            self._value += self._alpha * (value - self._value)
+        return self._value
+
+    def reset(self):
+        """Forget the previous readings."""
+        self._value = None
+
+
+class MedianFilter:
+    """Median of the last readings."""
+
+    def __init__(self, window):
+        """Initialize the filter over window readings."""
+        self._values = deque(maxlen=window)
+
+    def update(self, value):
+        """Add a reading and return the filtered value."""
+        self._values.append(value)
+        ordered = sorted(self._values)
+        middle = len(ordered) // 2
+        if len(ordered) % 2:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+
+    def reset(self):
+        """Forget the previous readings."""
+        self._values.clear()
+
+
+def create_filter(kind, alpha, window):
+    """Return the filter for a sensor_filter setting."""
+    if kind == FILTER_EXPONENTIAL:
+        return ExponentialFilter(alpha)
+    if kind == FILTER_MEDIAN:
+        return MedianFilter(window)
+    return PassThroughFilter()
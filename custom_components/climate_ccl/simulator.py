@@ -0,0 +1,815 @@
+"""Offline replay simulator for the CCL thermostat.
+
+Runs CCLGenericThermostat against in-memory stand-ins for the state machine,
+the service registry, the event bus and the timers. Time is virtual: timers
+fire in order between samples, so a recorded temperature trace is replayed as
+fast as the controller can process it.
+
+    python -m custom_components.climate_ccl.simulator trace.csv
+    python -m custom_components.climate_ccl.simulator --synthetic 30
+
+The trace is a CSV file with a time column (time, timestamp, last_changed or
+last_updated, as ISO date or epoch seconds) and a temperature column
+(temperature, state or value). The optional target_temp, hvac_mode and
+preset_mode columns replay the matching service calls. It can also be the
+time series directory of a thermostat, see timeseries.py.
+"""
+import argparse
+import asyncio
+from collections import Counter
+from contextlib import contextmanager
+import csv
+from datetime import timedelta
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+from time import perf_counter
+
+import yaml
+
+from homeassistant.components.input_select import ATTR_OPTION, SERVICE_SELECT_OPTION
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_START,
+    EVENT_STATE_CHANGED,
+    MATCH_ALL,
+    SERVICE_TURN_OFF,
+    SERVICE_TURN_ON,
+    STATE_OFF,
+    STATE_ON,
+    TEMP_CELSIUS,
+)
+from homeassistant.core import (
+    DOMAIN as HA_DOMAIN,
+    Config,
+    CoreState,
+    Event,
+    ServiceCall,
+    State,
+    callback,
+    is_callback,
+)
+from homeassistant.exceptions import ServiceNotFound
+from homeassistant.helpers import event as event_helper
+import homeassistant.util.dt as dt_util
+from homeassistant.util import slugify
+
+from . import climate, coordinator
+from .const import DATA_STORE
+from .timeseries import TimeSeries
+
+_LOGGER = logging.getLogger(__name__)
+
+# Mirrors the thermo_poele entry of configuration.yaml, heating from the start
+DEFAULT_CONFIG = {
+    "platform": "climate_ccl",
+    "name": "thermo_poele",
+    "heater": "switch.poele",
+    "target_sensor": "sensor.int_temperature",
+    "heat": "input_boolean.poele_on",
+    "regulation": "input_boolean.poele_regulation",
+    "state": "input_select.poele_state",
+    "min_temp": 12,
+    "max_temp": 24,
+    "ac_mode": False,
+    "target_temp": 17,
+    "cold_tolerance": 0.5,
+    "hot_tolerance": 0.3,
+    "initial_hvac_mode": "heat",
+    "min_cycle_duration": {"hours": 1},
+    "away_temp": 7,
+    "regulation_duration": {"minutes": 1},
+    "regulation_nb_duration": 12,
+    "regulation_delta": 1,
+    "precision": 0.5,
+}
+
+TIME_COLUMNS = ("time", "timestamp", "last_changed", "last_updated")
+TEMPERATURE_COLUMNS = ("temperature", "state", "value")
+
+# Modules whose helpers are replaced by the stand-ins
+PATCHED_MODULES = (event_helper, climate, coordinator)
+
+
+class SimClock:
+    """Virtual UTC clock with a timer heap."""
+
+    def __init__(self, start):
+        """Initialize the clock."""
+        self.now = start
+        self._timers = []
+        self._seq = itertools.count()
+        self.fired = 0
+
+    def utcnow(self):
+        """Return the virtual time."""
+        return self.now
+
+    def schedule(self, point_in_time, action):
+        """Run action at point_in_time, return a cancel callback."""
+        entry = [dt_util.as_utc(point_in_time), next(self._seq), action]
+        heapq.heappush(self._timers, entry)
+
+        def cancel():
+            """Cancel the timer."""
+            entry[2] = None
+
+        return cancel
+
+    def pop_due(self, until):
+        """Pop the next live timer due at or before until."""
+        while self._timers and self._timers[0][0] <= until:
+            point_in_time, _, action = heapq.heappop(self._timers)
+            if action is not None:
+                self.fired += 1
+                return point_in_time, action
+        return None
+
+    @property
+    def pending(self):
+        """Return the number of live timers."""
+        return sum(1 for entry in self._timers if entry[2] is not None)
+
+
+def _track_point_in_utc_time(hass, action, point_in_time):
+    """Virtual clock version of async_track_point_in_utc_time."""
+    return hass.clock.schedule(point_in_time, action)
+
+
+def _call_later(hass, delay, action):
+    """Virtual clock version of async_call_later."""
+    return hass.clock.schedule(hass.clock.now + timedelta(seconds=delay), action)
+
+
+def _track_time_interval(hass, action, interval):
+    """Virtual clock version of async_track_time_interval."""
+    remove = None
+
+    @callback
+    def interval_listener(now):
+        """Handle elapsed intervals."""
+        nonlocal remove
+        remove = hass.clock.schedule(now + interval, interval_listener)
+        hass.async_run_job(action, now)
+
+    remove = hass.clock.schedule(hass.clock.now + interval, interval_listener)
+
+    def remove_listener():
+        """Remove interval listener."""
+        remove()
+
+    return remove_listener
+
+
+async def _load_platform(hass, component, platform, discovered, hass_config):
+    """Skip the diagnostic sensors, the simulation reports the stats itself."""
+
+
+class SimControllerStore:
+    """In-memory controller store."""
+
+    def __init__(self):
+        """Initialize the store."""
+        self.data = {}
+        self.saves = 0
+
+    async def async_load(self):
+        """Load nothing, the data is in memory."""
+
+    def get(self, key):
+        """Return the state saved for a thermostat."""
+        return self.data.get(key)
+
+    @callback
+    def async_set(self, key, value):
+        """Save the state of a thermostat."""
+        if self.data.get(key) != value:
+            self.data[key] = value
+            self.saves += 1
+
+
+def _get_controller_store(hass):
+    """Return the in-memory controller store of the simulation."""
+    return hass.data.setdefault(DATA_STORE, SimControllerStore())
+
+
+# Helpers replaced by stand-ins: timers on the virtual clock, in-memory store
+STAND_IN_HELPERS = {
+    "async_track_point_in_utc_time": _track_point_in_utc_time,
+    "async_call_later": _call_later,
+    "async_track_time_interval": _track_time_interval,
+    "async_load_platform": _load_platform,
+    "async_get_controller_store": _get_controller_store,
+}
+
+
+@contextmanager
+def virtual_time(clock):
+    """Route utcnow and the helpers to the virtual clock and the stand-ins."""
+    saved = [(dt_util, "utcnow", dt_util.utcnow)]
+    for module in PATCHED_MODULES:
+        for name, helper in STAND_IN_HELPERS.items():
+            if hasattr(module, name):
+                saved.append((module, name, getattr(module, name)))
+                setattr(module, name, helper)
+    dt_util.utcnow = clock.utcnow
+    try:
+        yield clock
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+
+
+class SimBus:
+    """In-memory event bus, listeners run synchronously."""
+
+    def __init__(self, hass):
+        """Initialize the bus."""
+        self._hass = hass
+        self._listeners = {}
+        self.calls = 0
+
+    def listener_count(self, event_type):
+        """Return the number of listeners of an event type."""
+        return len(self._listeners.get(event_type, []))
+
+    @callback
+    def async_listen(self, event_type, listener):
+        """Listen for an event type, return a remove callback."""
+        listeners = self._listeners.setdefault(event_type, [])
+        listeners.append(listener)
+
+        def remove_listener():
+            """Remove the listener."""
+            if listener in listeners:
+                listeners.remove(listener)
+
+        return remove_listener
+
+    @callback
+    def async_listen_once(self, event_type, listener):
+        """Listen once for an event type."""
+        remove = None
+
+        @callback
+        def onetime_listener(event):
+            """Remove the listener and run it."""
+            remove()
+            self._hass.async_run_job(listener, event)
+
+        remove = self.async_listen(event_type, onetime_listener)
+        return remove
+
+    @callback
+    def async_fire(self, event_type, event_data=None, origin=None, context=None):
+        """Fire an event."""
+        listeners = self._listeners.get(event_type, []) + self._listeners.get(
+            MATCH_ALL, []
+        )
+        if not listeners:
+            return
+        event = Event(event_type, event_data, context=context)
+        self.calls += len(listeners)
+        for listener in listeners:
+            self._hass.async_run_job(listener, event)
+
+
+class SimStates:
+    """In-memory state machine."""
+
+    def __init__(self, bus):
+        """Initialize the state machine."""
+        self._bus = bus
+        self._states = {}
+        self.writes = Counter()
+
+    def get(self, entity_id):
+        """Return the state of an entity."""
+        return self._states.get(entity_id)
+
+    def is_state(self, entity_id, state):
+        """Test if entity exists and is in the specified state."""
+        state_obj = self._states.get(entity_id)
+        return state_obj is not None and state_obj.state == state
+
+    def async_all(self):
+        """Return all states."""
+        return list(self._states.values())
+
+    def async_entity_ids(self, domain_filter=None):
+        """Return the entity ids, optionally of one domain."""
+        if domain_filter is None:
+            return list(self._states)
+        prefix = domain_filter + "."
+        return [entity_id for entity_id in self._states if entity_id.startswith(prefix)]
+
+    @callback
+    def async_set(
+        self, entity_id, new_state, attributes=None, force_update=False, context=None
+    ):
+        """Set the state of an entity and fire state_changed if it changed."""
+        new_state = str(new_state)
+        attributes = attributes or {}
+        old_state = self._states.get(entity_id)
+        same_state = (
+            old_state is not None and old_state.state == new_state and not force_update
+        )
+        if same_state and old_state.attributes == attributes:
+            return
+
+        last_changed = old_state.last_changed if same_state else None
+        state = State(entity_id, new_state, attributes, last_changed, None, context)
+        self._states[entity_id] = state
+        self.writes[entity_id] += 1
+        self._bus.async_fire(
+            EVENT_STATE_CHANGED,
+            {"entity_id": entity_id, "old_state": old_state, "new_state": state},
+        )
+
+
+class SimServices:
+    """In-memory service registry recording every call."""
+
+    def __init__(self, hass):
+        """Initialize the registry."""
+        self._hass = hass
+        self._services = {}
+        self.calls = []
+
+    @callback
+    def async_register(self, domain, service, service_func, schema=None):
+        """Register a service."""
+        self._services[(domain.lower(), service.lower())] = service_func
+
+    def has_service(self, domain, service):
+        """Test if the service exists."""
+        return (domain.lower(), service.lower()) in self._services
+
+    async def async_call(
+        self, domain, service, service_data=None, blocking=False, context=None
+    ):
+        """Call a service, waiting for it to finish if blocking."""
+        handler = self._services.get((domain.lower(), service.lower()))
+        if handler is None:
+            raise ServiceNotFound(domain, service)
+        call = ServiceCall(domain, service, dict(service_data or {}), context)
+        self.calls.append((self._hass.clock.now, call))
+        if blocking:
+            await self._async_run(handler, call)
+        else:
+            self._hass.async_create_task(self._async_safe_run(handler, call))
+        return True
+
+    async def _async_safe_run(self, handler, call):
+        """Run a service handler, logging its error as hass does."""
+        try:
+            await self._async_run(handler, call)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error executing service %s", call)
+
+    @staticmethod
+    async def _async_run(handler, call):
+        """Run a service handler."""
+        if asyncio.iscoroutinefunction(handler):
+            await handler(call)
+        else:
+            handler(call)
+
+
+class SimHass:
+    """Stand-in for HomeAssistant driven by a virtual clock."""
+
+    def __init__(self, start):
+        """Initialize the stand-in."""
+        self.loop = asyncio.get_event_loop()
+        self.clock = SimClock(start)
+        self.bus = SimBus(self)
+        self.states = SimStates(self.bus)
+        self.services = SimServices(self)
+        self.data = {}
+        self.config = Config(self)
+        self.config.config_dir = None
+        self.state = CoreState.running
+        self._pending = set()
+        self._errors = []
+
+    @callback
+    def async_create_task(self, target):
+        """Create a tracked task."""
+        task = self.loop.create_task(target)
+        self._pending.add(task)
+        task.add_done_callback(self._async_task_done)
+        return task
+
+    @callback
+    def _async_task_done(self, task):
+        """Forget a finished task, keeping its error."""
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._errors.append(task.exception())
+
+    @callback
+    def async_add_job(self, target, *args):
+        """Run a job, as a task unless it is a plain function."""
+        if asyncio.iscoroutine(target):
+            return self.async_create_task(target)
+        if asyncio.iscoroutinefunction(target):
+            return self.async_create_task(target(*args))
+        target(*args)
+        return None
+
+    add_job = async_add_job
+
+    @callback
+    def async_run_job(self, target, *args):
+        """Run a callback inline, anything else as a job."""
+        if not asyncio.iscoroutine(target) and is_callback(target):
+            target(*args)
+        else:
+            self.async_add_job(target, *args)
+
+    async def async_block_till_done(self):
+        """Wait until no task is pending, raising the first error."""
+        while self._pending:
+            await asyncio.wait(list(self._pending))
+        if self._errors:
+            error, self._errors = self._errors[0], []
+            raise error
+
+
+class Sample:
+    """One row of a replayed trace."""
+
+    __slots__ = ["time", "temperature", "target_temp", "hvac_mode", "preset_mode"]
+
+    def __init__(
+        self, time, temperature=None, target_temp=None, hvac_mode=None, preset_mode=None
+    ):
+        """Initialize the sample."""
+        self.time = time
+        self.temperature = temperature
+        self.target_temp = target_temp
+        self.hvac_mode = hvac_mode
+        self.preset_mode = preset_mode
+
+
+class SimResult:
+    """Outcome of a replay."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.decisions = []
+        self.samples = 0
+        self.evaluations = 0
+        self.service_calls = 0
+        self.state_writes = 0
+        self.thermostat_writes = 0
+        self.cycles = 0
+        self.wall_time = 0.0
+        self.virtual_time = timedelta()
+        self.stats = {}
+
+    @property
+    def evaluations_per_second(self):
+        """Return control evaluations per wall clock second."""
+        if not self.wall_time:
+            return 0.0
+        return self.evaluations / self.wall_time
+
+    def as_dict(self):
+        """Return the summary, without the decision log."""
+        return {
+            "samples": self.samples,
+            "virtual_days": round(self.virtual_time.total_seconds() / 86400, 2),
+            "decisions": len(self.decisions),
+            "evaluations": self.evaluations,
+            "service_calls": self.service_calls,
+            "state_writes": self.state_writes,
+            "thermostat_writes": self.thermostat_writes,
+            "cycles": self.cycles,
+            "wall_time": round(self.wall_time, 3),
+            "evaluations_per_second": round(self.evaluations_per_second, 1),
+            **({"stats": self.stats} if self.stats else {}),
+        }
+
+
+class Simulation:
+    """Replay samples through one thermostat."""
+
+    def __init__(self, config=None, restored_state=None):
+        """Initialize the simulation from a climate platform config."""
+        self.config = climate.PLATFORM_SCHEMA(dict(DEFAULT_CONFIG, **(config or {})))
+        self.restored_state = restored_state
+        self.hass = None
+        self.thermostat = None
+        self.result = None
+
+    async def async_run(self, samples):
+        """Replay the samples and return a SimResult."""
+        samples = sorted(samples, key=lambda sample: sample.time)
+        if not samples:
+            raise ValueError("Nothing to replay")
+
+        self.result = result = SimResult()
+        self.hass = hass = SimHass(samples[0].time)
+        started = perf_counter()
+        with virtual_time(hass.clock):
+            await self._async_setup()
+            for sample in samples:
+                await self._async_advance(sample.time)
+                await self._async_step("sample", self._async_apply(sample))
+                result.samples += 1
+            await self._async_advance(samples[-1].time)
+        result.wall_time = perf_counter() - started
+        result.virtual_time = samples[-1].time - samples[0].time
+        result.service_calls = len(hass.services.calls)
+        result.state_writes = sum(hass.states.writes.values())
+        result.thermostat_writes = hass.states.writes[self.thermostat.entity_id]
+        result.stats = self.thermostat.stats.as_dict()
+        return result
+
+    async def _async_setup(self):
+        """Set up the helpers and add the thermostat."""
+        hass = self.hass
+        config = self.config
+        register_actuators(hass)
+
+        heat_entity_id = config.get(climate.CONF_HEAT)
+
+        @callback
+        def count_cycles(event):
+            """Count the stove starts."""
+            new_state = event.data["new_state"]
+            old_state = event.data["old_state"]
+            if (
+                event.data["entity_id"] == heat_entity_id
+                and new_state.state == STATE_ON
+                and (old_state is None or old_state.state != STATE_ON)
+            ):
+                self.result.cycles += 1
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, count_cycles)
+
+        self.thermostat = thermostat = await async_create_thermostat(
+            hass, config, self.restored_state
+        )
+        control_heating = thermostat._async_control_heating
+
+        async def async_counted_control_heating(*args, **kwargs):
+            """Count the control evaluations."""
+            self.result.evaluations += 1
+            await control_heating(*args, **kwargs)
+
+        thermostat._async_control_heating = async_counted_control_heating
+        await self._async_step("startup", thermostat.async_added_to_hass())
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_START)
+        await hass.async_block_till_done()
+
+    async def _async_advance(self, until):
+        """Fire the timers due up to until, in order."""
+        hass = self.hass
+        while True:
+            due = hass.clock.pop_due(until)
+            if due is None:
+                break
+            hass.clock.now, action = due
+            await self._async_step("timer", self._async_fire_timer(action))
+        hass.clock.now = until
+
+    async def _async_fire_timer(self, action):
+        """Run a timer action."""
+        self.hass.async_run_job(action, self.hass.clock.now)
+
+    async def _async_apply(self, sample):
+        """Apply the commands and the reading of a sample."""
+        thermostat = self.thermostat
+        if sample.hvac_mode:
+            await thermostat.async_set_hvac_mode(sample.hvac_mode)
+        if sample.preset_mode:
+            await thermostat.async_set_preset_mode(sample.preset_mode)
+        if sample.target_temp is not None:
+            await thermostat.async_set_temperature(temperature=sample.target_temp)
+        if sample.temperature is not None:
+            self.hass.states.async_set(
+                self.config[climate.CONF_SENSOR],
+                sample.temperature,
+                {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS},
+            )
+
+    async def _async_step(self, trigger, coro):
+        """Run one step to completion and log the calls it issued."""
+        hass = self.hass
+        first_call = len(hass.services.calls)
+        await coro
+        await hass.async_block_till_done()
+        calls = hass.services.calls[first_call:]
+        if not calls:
+            return
+        thermostat = self.thermostat
+        self.result.decisions.append(
+            {
+                "time": hass.clock.now.isoformat(),
+                "trigger": trigger,
+                "current_temperature": thermostat.current_temperature,
+                "target_temperature": thermostat.target_temperature,
+                "hvac_mode": thermostat.hvac_mode,
+                "hvac_action": thermostat.hvac_action,
+                "calls": [
+                    "{}.{} {}".format(
+                        call.domain,
+                        call.service,
+                        call.data.get(ATTR_OPTION, call.data.get(ATTR_ENTITY_ID)),
+                    )
+                    for _, call in calls
+                ],
+            }
+        )
+
+
+@callback
+def register_actuators(hass):
+    """Register stand-ins for the services switching the actuators."""
+
+    async def async_toggle(call):
+        """Stand-in for homeassistant.turn_on/turn_off."""
+        state = STATE_ON if call.service == SERVICE_TURN_ON else STATE_OFF
+        entity_ids = call.data[ATTR_ENTITY_ID]
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        for entity_id in entity_ids:
+            hass.states.async_set(entity_id, state)
+
+    async def async_select(call):
+        """Stand-in for input_select.select_option."""
+        hass.states.async_set(call.data[ATTR_ENTITY_ID], call.data[ATTR_OPTION])
+
+    hass.services.async_register(HA_DOMAIN, SERVICE_TURN_ON, async_toggle)
+    hass.services.async_register(HA_DOMAIN, SERVICE_TURN_OFF, async_toggle)
+    hass.services.async_register("input_select", SERVICE_SELECT_OPTION, async_select)
+
+
+async def async_create_thermostat(hass, config, restored_state=None):
+    """Create the thermostat of a climate_ccl entry, with its actuators off.
+
+    The thermostat is returned before it is added to hass.
+    """
+    for key in (climate.CONF_HEATER, climate.CONF_HEAT, climate.CONF_REGULATION):
+        if config.get(key):
+            hass.states.async_set(config[key], STATE_OFF)
+    if config.get(climate.CONF_STATE):
+        hass.states.async_set(config[climate.CONF_STATE], climate.HVAC_MODE_IDLE)
+
+    entities = []
+    await climate.async_setup_platform(hass, config, entities.extend)
+    thermostat = entities[0]
+    thermostat.hass = hass
+    thermostat.entity_id = "climate.{}".format(slugify(thermostat.name))
+
+    async def async_get_last_state():
+        """Return the state to restore."""
+        return restored_state
+
+    thermostat.async_get_last_state = async_get_last_state
+    return thermostat
+
+
+def _parse_time(value):
+    """Parse an ISO date or epoch seconds into an aware UTC datetime."""
+    try:
+        return dt_util.utc_from_timestamp(float(value))
+    except ValueError:
+        pass
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        raise ValueError("Invalid time: {}".format(value))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.UTC)
+    return dt_util.as_utc(parsed)
+
+
+def _parse_float(value):
+    """Parse a float, None if the value is empty or not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_trace(path):
+    """Load samples from a CSV trace."""
+    with open(path, newline="") as trace_file:
+        reader = csv.DictReader(trace_file)
+        fields = reader.fieldnames or []
+        time_column = next((col for col in TIME_COLUMNS if col in fields), None)
+        temp_column = next((col for col in TEMPERATURE_COLUMNS if col in fields), None)
+        if time_column is None or temp_column is None:
+            raise ValueError("{}: no time or temperature column".format(path))
+
+        samples = []
+        for row in reader:
+            sample = Sample(
+                _parse_time(row[time_column]),
+                _parse_float(row[temp_column]),
+                _parse_float(row.get("target_temp")),
+                row.get("hvac_mode") or None,
+                row.get("preset_mode") or None,
+            )
+            if sample.temperature is None and not (
+                sample.hvac_mode or sample.preset_mode or sample.target_temp is not None
+            ):
+                # unknown/unavailable readings
+                continue
+            samples.append(sample)
+    return samples
+
+
+def load_series(path):
+    """Load samples from the time series directory of a thermostat.
+
+    The target and the hvac mode are replayed when they change.
+    """
+    series = TimeSeries(path)
+    series.load()
+    recorded = series.read()
+    samples = []
+    target_temp = None
+    for second, temperature, target in zip(
+            recorded.time.astype("int64").tolist(),
+            recorded.temperature.tolist(), recorded.target.tolist()):
+        sample = Sample(dt_util.utc_from_timestamp(second))
+        if not math.isnan(temperature):
+            sample.temperature = temperature
+        if math.isnan(target) != (target_temp is None):
+            sample.hvac_mode = climate.HVAC_MODE_OFF \
+                if math.isnan(target) else climate.HVAC_MODE_HEAT
+        if not math.isnan(target) and target != target_temp:
+            sample.target_temp = target
+        target_temp = None if math.isnan(target) else target
+        samples.append(sample)
+    return samples
+
+
+def synthetic_trace(days, step=timedelta(minutes=1), start=None, seed=0):
+    """Return a daily temperature swing with sensor noise, in 1/16 °C steps."""
+    rand = random.Random(seed)
+    start = start or dt_util.parse_datetime("2019-01-01T00:00:00+00:00")
+    count = int(timedelta(days=days) / step)
+    samples = []
+    for index in range(count):
+        hours = index * step.total_seconds() / 3600
+        temp = 16.5 + 1.5 * math.sin(2 * math.pi * hours / 24) + rand.gauss(0, 0.1)
+        samples.append(Sample(start + index * step, round(temp * 16) / 16))
+    return samples
+
+
+def load_config(path):
+    """Load a climate_ccl entry from a YAML file."""
+    with open(path) as config_file:
+        config = yaml.safe_load(config_file)
+    if isinstance(config, dict) and "climate" in config:
+        config = config["climate"]
+    if isinstance(config, list):
+        config = next(
+            entry for entry in config if entry.get("platform") == "climate_ccl"
+        )
+    return config
+
+
+def main(argv=None):
+    """Replay a trace and print the summary as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", nargs="?", help="CSV temperature trace")
+    parser.add_argument("--synthetic", type=float, help="days of synthetic samples")
+    parser.add_argument("--config", help="YAML file with the climate_ccl entry")
+    parser.add_argument("--log", help="write the decision log as JSON lines")
+    args = parser.parse_args(argv)
+
+    if args.trace and os.path.isdir(args.trace):
+        samples = load_series(args.trace)
+    elif args.trace:
+        samples = load_trace(args.trace)
+    elif args.synthetic:
+        samples = synthetic_trace(args.synthetic)
+    else:
+        parser.error("a trace or --synthetic is required")
+
+    config = load_config(args.config) if args.config else None
+    simulation = Simulation(config)
+    result = asyncio.run(simulation.async_run(samples))
+
+    if args.log:
+        with open(args.log, "w") as log_file:
+            for decision in result.decisions:
+                log_file.write(json.dumps(decision) + "\n")
+    json.dump(result.as_dict(), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
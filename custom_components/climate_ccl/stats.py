@@ -0,0 +1,145 @@
+"""Performance counters for the CCL thermostat."""
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+
+# Upper bounds of the timing histogram buckets, in seconds
+BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)
+
+
+class Histogram:
+    """Timing histogram with fixed buckets."""
+
+    __slots__ = ["counts", "count", "total", "max"]
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """Add a duration in seconds."""
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket holding the percentile."""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if index < len(BUCKETS):
+                    return min(BUCKETS[index], self.max)
+                return self.max
+        return self.max
+
+    def as_dict(self):
+        """Return the summary in milliseconds."""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(1000 * self.total / self.count, 3),
+            "p50": round(1000 * self.percentile(0.5), 3),
+            "p95": round(1000 * self.percentile(0.95), 3),
+            "max": round(1000 * self.max, 3),
+        }
+
+
+class ThermostatStats:
+    """Counters and timings of one thermostat."""
+
+    enabled = True
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.evaluation_time = Histogram()
+        self.lock_hold = Histogram()
+        self.service_latency = defaultdict(Histogram)
+        self.decisions = defaultdict(int)
+        self.min_cycle_blocked = 0
+        self.regulation_edges = 0
+
+    @staticmethod
+    def clock():
+        """Return a start time for the timings."""
+        return perf_counter()
+
+    def record_evaluation(self, started, locked):
+        """Record a control pass requested at started, locked at locked."""
+        now = perf_counter()
+        self.evaluation_time.add(now - started)
+        self.lock_hold.add(now - locked)
+
+    def record_lock_hold(self, locked):
+        """Record the lock held since locked outside of a control pass."""
+        self.lock_hold.add(perf_counter() - locked)
+
+    def record_service_call(self, entity_id, started):
+        """Record a service call to entity_id issued at started."""
+        self.service_latency[entity_id].add(perf_counter() - started)
+
+    def record_decision(self, next_state):
+        """Record a control decision."""
+        self.decisions[next_state] += 1
+
+    def record_min_cycle_blocked(self):
+        """Record a transition blocked by min_cycle_duration."""
+        self.min_cycle_blocked += 1
+
+    def record_regulation_edge(self):
+        """Record an edge of the regulation duty cycle."""
+        self.regulation_edges += 1
+
+    def as_dict(self):
+        """Return all the counters, timings in milliseconds."""
+        return {
+            "evaluations": self.evaluation_time.as_dict(),
+            "lock_hold": self.lock_hold.as_dict(),
+            "service_latency": {
+                entity_id: histogram.as_dict()
+                for entity_id, histogram in self.service_latency.items()
+            },
+            "decisions": dict(self.decisions),
+            "min_cycle_blocked": self.min_cycle_blocked,
+            "regulation_edges": self.regulation_edges,
+        }
+
+
+class NullStats:
+    """Stand-in collecting nothing when diagnostics are disabled."""
+
+    enabled = False
+
+    @staticmethod
+    def clock():
+        """Return a dummy start time."""
+        return 0
+
+    def record_evaluation(self, started, locked):
+        """Do nothing."""
+
+    def record_lock_hold(self, locked):
+        """Do nothing."""
+
+    def record_service_call(self, entity_id, started):
+        """Do nothing."""
+
+    def record_decision(self, next_state):
+        """Do nothing."""
+
+    def record_min_cycle_blocked(self):
+        """Do nothing."""
+
+    def record_regulation_edge(self):
+        """Do nothing."""
+
+    def as_dict(self):
+        """Return no counters."""
+        return {}
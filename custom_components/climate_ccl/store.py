@@ -0,0 +1,88 @@
+"""Runtime state of the CCL thermostats kept across restarts."""
+import asyncio
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_STORE, DOMAIN
+
+STORAGE_KEY = DOMAIN
+STORAGE_VERSION = 1
+# Seconds between two writes, the changes in between are batched
+SAVE_DELAY = 30
+
+# Keys of the state saved for a thermostat
+ATTR_ACTIVE = "active"
+ATTR_LAST_TRANSITION = "last_transition"
+ATTR_REGULATION_CYCLE = "regulation_cycle"
+ATTR_HEATER_ON = "heater_on"
+ATTR_NEXT_EDGE = "next_edge"
+ATTR_THERMAL_MODEL = "thermal_model"
+ATTR_RUNTIME = "runtime"
+
+
+@callback
+def async_get_controller_store(hass):
+    """Return the controller store of hass, creating it on first use."""
+    store = hass.data.get(DATA_STORE)
+    if store is None:
+        store = hass.data[DATA_STORE] = ControllerStore(hass)
+    return store
+
+
+class ControllerStore:
+    """One JSON file holding the controller state of every thermostat.
+
+    A change schedules a write SAVE_DELAY seconds later, the changes made
+    until then go in the same write. Pending changes are written when Home
+    Assistant stops. A change made before the file is loaded is kept over the
+    saved state and written once the file is loaded.
+    """
+
+    def __init__(self, hass):
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._save_pending = False
+
+    async def async_load(self):
+        """Load the file, once."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            data = await self._store.async_load() or {}
+            changed = self._data
+            data.update(changed)
+            self._data = data
+            self._loaded = True
+            if changed:
+                self._async_schedule_save()
+
+    def get(self, key):
+        """Return the state saved for a thermostat."""
+        return self._data.get(key)
+
+    @callback
+    def async_set(self, key, value):
+        """Save the state of a thermostat."""
+        if self._data.get(key) == value:
+            return
+        self._data[key] = value
+        if self._loaded:
+            # Before the load, a write would drop the other thermostats
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self):
+        """Write the data SAVE_DELAY seconds later, once."""
+        if not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        """Return the data to write."""
+        self._save_pending = False
+        return self._data
@@ -0,0 +1,113 @@
+"""HTTP driver of the ESP stove controller."""
+import asyncio
+import logging
+
+import aiohttp
+import async_timeout
+
+from homeassistant.core import SERVICE_CALL_LIMIT
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+# Query parameters of a long-poll status request
+PARAM_STATE = "state"
+PARAM_WAIT = "wait"
+
+# Seconds the device may take over the wait of a long-poll
+LONG_POLL_MARGIN = 10
+# Seconds a command may take with its retries, within the blocking service
+# call of the switch
+SEND_BUDGET = SERVICE_CALL_LIMIT - 1
+
+
+class StoveError(HomeAssistantError):
+    """The stove could not be reached."""
+
+
+def parse_status(data):
+    """Return True/False from a status document, None if unknown.
+
+    The ESP answers {"state": "on"} or {"state": "off"}, booleans and
+    numbers are accepted too.
+    """
+    if not isinstance(data, dict):
+        return None
+    state = data.get("state")
+    if isinstance(state, str):
+        state = state.lower()
+        if state in ("on", "true", "1"):
+            return True
+        if state in ("off", "false", "0"):
+            return False
+        return None
+    if isinstance(state, (bool, int)):
+        return bool(state)
+    return None
+
+
+class StoveDriver:
+    """Send commands to the stove and read its status.
+
+    All requests go through one client session, so the connection to the ESP
+    is kept alive between calls. Commands are retried with a doubling delay
+    as long as they fit in SEND_BUDGET.
+    """
+
+    def __init__(self, session, on_url, off_url, status_url, timeout, retries):
+        """Initialize the driver on an aiohttp session."""
+        self._session = session
+        self._on_url = on_url
+        self._off_url = off_url
+        self._status_url = status_url
+        self._timeout = timeout
+        self._retries = retries
+
+    async def async_send(self, turn_on):
+        """Turn the stove on or off, raise StoveError if it never answered."""
+        url = self._on_url if turn_on else self._off_url
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + SEND_BUDGET
+        delay = 0.5
+        for attempt in range(self._retries + 1):
+            timeout = min(self._timeout, deadline - loop.time())
+            try:
+                async with async_timeout.timeout(timeout):
+                    async with self._session.get(url) as response:
+                        response.raise_for_status()
+                        await response.read()
+                return
+            except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+                if attempt == self._retries \
+                        or loop.time() + delay >= deadline:
+                    raise StoveError(
+                        "Stove command {} failed: {}".format(url, str(err) or "timeout")
+                    )
+                _LOGGER.debug("Stove command %s failed, retrying: %s", url, err)
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def async_fetch_status(self, wait=None, known=None):
+        """Return the stove status, None if the answer is not understood.
+
+        With `wait`, the device may hold the request for up to wait seconds,
+        until its state differs from `known`.
+        """
+        params = None
+        timeout = self._timeout
+        if wait:
+            params = {PARAM_WAIT: str(int(wait))}
+            if known is not None:
+                params[PARAM_STATE] = "on" if known else "off"
+            timeout += wait + LONG_POLL_MARGIN
+        try:
+            async with async_timeout.timeout(timeout):
+                async with self._session.get(
+                        self._status_url, params=params) as response:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError) as err:
+            raise StoveError(
+                "Stove status {} failed: {}".format(self._status_url, str(err) or "timeout")
+            )
+        return parse_status(data)
@@ -0,0 +1,114 @@
+"""Local stand-in for the ESP stove controller.
+
+Serves the URLs used by the climate_ccl switch, for trying the driver
+without the stove:
+
+    python -m custom_components.climate_ccl.stove_standin --port 8099 --lag 5
+
+    on_url: http://localhost:8099/on
+    off_url: http://localhost:8099/off
+    status_url: http://localhost:8099/status
+
+The stove takes `lag` seconds to act on a command. GET /status answers at
+once, or with `wait` holds the request until the state is not `state`. With
+--push, each change is posted to a webhook URL.
+"""
+import argparse
+import asyncio
+import logging
+import random
+
+from aiohttp import ClientSession, web
+
+from .stove import PARAM_STATE, PARAM_WAIT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StandInStove:
+    """State and HTTP handlers of the stand-in."""
+
+    def __init__(self, lag=0.0, failure_rate=0.0, push_url=None):
+        """Initialize the stove, off."""
+        self.state = False
+        self.commands = 0
+        self._lag = lag
+        self._failure_rate = failure_rate
+        self._push_url = push_url
+        self._changed = asyncio.Condition()
+
+    def create_app(self):
+        """Return the aiohttp application."""
+        app = web.Application()
+        app.router.add_get("/on", self.handle_on)
+        app.router.add_get("/off", self.handle_off)
+        app.router.add_get("/status", self.handle_status)
+        return app
+
+    async def handle_on(self, request):
+        """Turn the stove on."""
+        return await self._command(True)
+
+    async def handle_off(self, request):
+        """Turn the stove off."""
+        return await self._command(False)
+
+    async def _command(self, state):
+        """Accept a command, applied after the lag."""
+        if random.random() < self._failure_rate:
+            raise web.HTTPServiceUnavailable()
+        self.commands += 1
+        asyncio.get_event_loop().call_later(
+            self._lag, lambda: asyncio.ensure_future(self._set(state))
+        )
+        return web.json_response({"result": "ok"})
+
+    async def _set(self, state):
+        """Apply a state and report it."""
+        if state == self.state:
+            return
+        self.state = state
+        _LOGGER.info("Stove %s", "on" if state else "off")
+        async with self._changed:
+            self._changed.notify_all()
+        if self._push_url:
+            async with ClientSession() as session:
+                await session.post(self._push_url, json=self._status())
+
+    def _status(self):
+        """Return the status document."""
+        return {"state": "on" if self.state else "off"}
+
+    async def handle_status(self, request):
+        """Return the state, waiting for a change with `wait`."""
+        wait = request.query.get(PARAM_WAIT)
+        known = request.query.get(PARAM_STATE)
+        if wait and known in ("on", "off"):
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(
+                            lambda: self.state != (known == "on")
+                        ),
+                        float(wait),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        return web.json_response(self._status())
+
+
+def main(argv=None):
+    """Run the stand-in."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--lag", type=float, default=0.0, help="seconds to act")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--push", help="webhook URL receiving the changes")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    stove = StandInStove(args.lag, args.failure_rate, args.push)
+    web.run_app(stove.create_app(), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
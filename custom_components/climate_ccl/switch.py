@@ -0,0 +1,289 @@
+"""Direct switch for the ESP stove of the CCL thermostat.
+
+Replaces the template switch, the rest_command calls and the polled REST
+binary_sensor by one entity talking to the ESP:
+
+switch:
+  - platform: climate_ccl
+    name: poele_direct
+    on_url: !secret esp_poele_on
+    off_url: !secret esp_poele_off
+    status_url: !secret esp_poele_status
+    long_poll: true
+
+The switch shows the commanded state at once, flagged as assumed until the
+stove reports it. Status reports come from the ESP through a webhook, from
+long-poll requests (the ESP holds GET status_url?wait=55&state=on until its
+state is not `state` or the wait is over) or else from polling.
+"""
+import asyncio
+from datetime import timedelta
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components.switch import PLATFORM_SCHEMA, SwitchDevice
+from homeassistant.const import (
+    CONF_NAME,
+    CONF_SCAN_INTERVAL,
+    CONF_TIMEOUT,
+    CONF_WEBHOOK_ID,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import async_get_coordinator
+from .stove import StoveDriver, StoveError, parse_status
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_ON_URL = "on_url"
+CONF_OFF_URL = "off_url"
+CONF_STATUS_URL = "status_url"
+CONF_RETRIES = "retries"
+CONF_LONG_POLL = "long_poll"
+CONF_LONG_POLL_WAIT = "long_poll_wait"
+CONF_CONFIRM_TIMEOUT = "confirm_timeout"
+
+DEFAULT_TIMEOUT = 5
+DEFAULT_RETRIES = 2
+DEFAULT_SCAN_INTERVAL = timedelta(seconds=60)
+DEFAULT_LONG_POLL_WAIT = timedelta(seconds=55)
+DEFAULT_CONFIRM_TIMEOUT = timedelta(seconds=30)
+
+PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_ON_URL): cv.url,
+        vol.Required(CONF_OFF_URL): cv.url,
+        vol.Required(CONF_STATUS_URL): cv.url,
+        vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): cv.positive_int,
+        vol.Optional(CONF_RETRIES, default=DEFAULT_RETRIES): cv.positive_int,
+        vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_LONG_POLL, default=False): cv.boolean,
+        vol.Optional(CONF_LONG_POLL_WAIT, default=DEFAULT_LONG_POLL_WAIT): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_CONFIRM_TIMEOUT, default=DEFAULT_CONFIRM_TIMEOUT): vol.All(
+            cv.time_period, cv.positive_timedelta),
+        vol.Optional(CONF_WEBHOOK_ID): cv.string,
+    }
+)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the stove switch."""
+    driver = StoveDriver(
+        async_get_clientsession(hass),
+        config.get(CONF_ON_URL),
+        config.get(CONF_OFF_URL),
+        config.get(CONF_STATUS_URL),
+        config.get(CONF_TIMEOUT),
+        config.get(CONF_RETRIES),
+    )
+    async_add_entities(
+        [
+            StoveSwitch(
+                config.get(CONF_NAME),
+                driver,
+                async_get_coordinator(hass),
+                config.get(CONF_SCAN_INTERVAL),
+                config.get(CONF_LONG_POLL_WAIT) if config.get(CONF_LONG_POLL) else None,
+                config.get(CONF_CONFIRM_TIMEOUT),
+                config.get(CONF_WEBHOOK_ID),
+            )
+        ]
+    )
+
+
+class StoveSwitch(SwitchDevice):
+    """Switch driving the ESP stove over HTTP."""
+
+    def __init__(
+        self,
+        name,
+        driver,
+        coordinator,
+        scan_interval,
+        long_poll_wait,
+        confirm_timeout,
+        webhook_id,
+    ):
+        """Initialize the switch."""
+        self._name = name
+        self._driver = driver
+        self._coordinator = coordinator
+        self._scan_interval = scan_interval
+        self._long_poll_wait = long_poll_wait
+        self._confirm_timeout = confirm_timeout
+        self._webhook_id = webhook_id
+        self._confirmed = None
+        self._optimistic = None
+        self._optimistic_until = None
+        self._available = False
+        self._unsub_confirm = None
+        self._unsub_poll = None
+        self._long_poll_task = None
+
+    async def async_added_to_hass(self):
+        """Start following the status of the stove."""
+        if self._webhook_id is not None:
+            self.hass.components.webhook.async_register(
+                DOMAIN, self._name, self._webhook_id, self._async_handle_webhook
+            )
+        if self._long_poll_wait is not None:
+            self._long_poll_task = self.hass.async_create_task(
+                self._async_long_poll()
+            )
+        else:
+            self._unsub_poll = self._coordinator.async_track_time_interval(
+                self._async_poll, self._scan_interval
+            )
+            self.hass.async_create_task(self._async_poll())
+
+    async def async_will_remove_from_hass(self):
+        """Stop following the status of the stove."""
+        if self._webhook_id is not None:
+            self.hass.components.webhook.async_unregister(self._webhook_id)
+        if self._long_poll_task is not None:
+            self._long_poll_task.cancel()
+            self._long_poll_task = None
+        if self._unsub_poll is not None:
+            self._unsub_poll()
+            self._unsub_poll = None
+        self._async_cancel_confirm()
+
+    @property
+    def name(self):
+        """Return the name of the switch."""
+        return self._name
+
+    @property
+    def should_poll(self):
+        """Return the polling state, status reports are followed instead."""
+        return False
+
+    @property
+    def available(self):
+        """Return True if the stove answered its last request."""
+        return self._available
+
+    @property
+    def is_on(self):
+        """Return the commanded state until the stove reports it."""
+        if self._optimistic is not None:
+            return self._optimistic
+        return self._confirmed
+
+    @property
+    def assumed_state(self):
+        """Return True while a command is not confirmed by the stove."""
+        return self._optimistic is not None
+
+    async def async_turn_on(self, **kwargs):
+        """Turn the stove on."""
+        await self._async_command(True)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn the stove off."""
+        await self._async_command(False)
+
+    async def _async_command(self, turn_on):
+        """Send a command, showing its target until the stove confirms."""
+        self._optimistic = turn_on
+        self._optimistic_until = dt_util.utcnow() + self._confirm_timeout
+        self._async_cancel_confirm()
+        self.async_write_ha_state()
+        try:
+            await self._driver.async_send(turn_on)
+        except StoveError:
+            self._optimistic = None
+            self._available = False
+            self.async_write_ha_state()
+            raise
+        self._available = True
+        if self._optimistic is not None:
+            self._unsub_confirm = self._coordinator.async_call_later(
+                self._confirm_timeout.total_seconds(), self._async_confirm_expired
+            )
+
+    @callback
+    def _async_cancel_confirm(self):
+        """Cancel the wait for a confirmation."""
+        if self._unsub_confirm is not None:
+            self._unsub_confirm()
+            self._unsub_confirm = None
+
+    async def _async_confirm_expired(self, now):
+        """Give up the commanded state and ask the stove for its status."""
+        self._unsub_confirm = None
+        _LOGGER.warning("Stove %s did not confirm the command in %s",
+                        self._name, self._confirm_timeout)
+        self._optimistic = None
+        self.async_write_ha_state()
+        await self._async_poll()
+
+    @callback
+    def _async_status(self, state):
+        """Apply a status report of the stove."""
+        self._available = True
+        if state is None:
+            return
+        if self._optimistic is not None:
+            if state != self._optimistic and dt_util.utcnow() < self._optimistic_until:
+                # Report sent before the stove acted on the command
+                self._confirmed = state
+                return
+            self._optimistic = None
+            self._async_cancel_confirm()
+        self._confirmed = state
+        self.async_write_ha_state()
+
+    async def _async_poll(self, now=None):
+        """Read the status of the stove."""
+        try:
+            state = await self._driver.async_fetch_status()
+        except StoveError as err:
+            if self._available:
+                _LOGGER.warning("%s", err)
+                self._available = False
+                self.async_write_ha_state()
+            return
+        self._async_status(state)
+
+    async def _async_long_poll(self):
+        """Follow the status of the stove with long-poll requests.
+
+        An answer sooner than the wait starts the next request no earlier
+        than the scan interval after this one, so an ESP ignoring the wait
+        is polled rather than hammered.
+        """
+        wait = self._long_poll_wait.total_seconds()
+        interval = self._scan_interval.total_seconds()
+        while True:
+            started = self.hass.loop.time()
+            try:
+                state = await self._driver.async_fetch_status(wait, self._confirmed)
+            except StoveError as err:
+                if self._available:
+                    _LOGGER.warning("%s", err)
+                    self._available = False
+                    self.async_write_ha_state()
+                await asyncio.sleep(interval)
+                continue
+            self._async_status(state)
+            elapsed = self.hass.loop.time() - started
+            if elapsed < wait:
+                await asyncio.sleep(max(interval - elapsed, 0))
+
+    async def _async_handle_webhook(self, hass, webhook_id, request):
+        """Apply a status report pushed by the stove."""
+        try:
+            data = await request.json()
+        except ValueError:
+            _LOGGER.warning("Invalid status pushed to the %s webhook", self._name)
+            return
+        self._async_status(parse_status(data))
@@ -0,0 +1,161 @@
+"""Thermal model of a room heated by the CCL thermostat.
+
+First-order RC model, time in hours:
+
+    dT/dt = loss_rate * (T_out - T) + heating_rate * u
+
+u is the share of time the heater was on. Each pair of readings adds one
+sample to a ring buffer, the parameters are refit over the whole buffer with
+one least-squares solve.
+"""
+import logging
+import math
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+# Samples kept for the fit, about two weeks at one sample per 10 minutes
+MAX_SAMPLES = 2016
+# Samples before a first fit
+MIN_SAMPLES = 24
+# Samples added between two refits
+REFIT_EVERY = 6
+# Hours a sample spans, shorter intervals are merged with the next reading
+MIN_INTERVAL = 10 / 60
+MAX_INTERVAL = 1.0
+
+# Keys of the saved parameters
+ATTR_LOSS_RATE = "loss_rate"
+ATTR_HEATING_RATE = "heating_rate"
+ATTR_SAMPLES = "samples"
+
+
+class ThermalModel:
+    """Learn the loss and heating rates of a room from its readings."""
+
+    def __init__(self, size=MAX_SAMPLES):
+        """Initialize an empty model."""
+        # Rows of loss regressor, heating regressor, observed slope
+        self._samples = np.zeros((size, 3))
+        self._count = 0
+        self._index = 0
+        self._added = 0
+        self._anchor = None
+        self._heating = False
+        self._heating_since = None
+        self._on_hours = 0.0
+        self.loss_rate = None
+        self.heating_rate = None
+
+    @property
+    def fitted(self):
+        """Return True once the model has parameters."""
+        return self.loss_rate is not None
+
+    @property
+    def samples(self):
+        """Return the number of samples in the buffer."""
+        return self._count
+
+    def set_heating(self, time, heating):
+        """Record a heater change."""
+        if heating == self._heating:
+            return
+        if self._heating and self._heating_since is not None:
+            self._on_hours += _hours(time - self._heating_since)
+        self._heating = heating
+        self._heating_since = time
+
+    def add(self, time, temperature, outdoor):
+        """Add a reading, return True if the parameters were refit."""
+        if self._anchor is None or outdoor is None:
+            self._reset(time, temperature)
+            return False
+        start, start_temperature = self._anchor
+        elapsed = _hours(time - start)
+        if elapsed < MIN_INTERVAL:
+            return False
+        if elapsed > MAX_INTERVAL:
+            self._reset(time, temperature)
+            return False
+        on_hours = self._on_hours
+        if self._heating:
+            on_hours += _hours(time - max(self._heating_since, start))
+        middle = (start_temperature + temperature) / 2
+        self._samples[self._index] = (
+            outdoor - middle,
+            min(on_hours / elapsed, 1.0),
+            (temperature - start_temperature) / elapsed,
+        )
+        self._index = (self._index + 1) % len(self._samples)
+        self._count = min(self._count + 1, len(self._samples))
+        self._reset(time, temperature)
+
+        self._added += 1
+        if self._count < MIN_SAMPLES or self._added < REFIT_EVERY:
+            return False
+        self._added = 0
+        return self.refit()
+
+    def _reset(self, time, temperature):
+        """Start the next sample at a reading."""
+        self._anchor = (time, temperature)
+        self._on_hours = 0.0
+        if self._heating:
+            self._heating_since = time
+
+    def refit(self):
+        """Fit the parameters over the buffer, return True if they changed.
+
+        A fit without heat loss or heating gain is not physical and is
+        ignored, the previous parameters are kept.
+        """
+        samples = self._samples[:self._count]
+        (loss_rate, heating_rate), _, rank, _ = np.linalg.lstsq(
+            samples[:, :2], samples[:, 2], rcond=None
+        )
+        if rank < 2 or loss_rate <= 0 or heating_rate <= 0:
+            _LOGGER.debug("Thermal fit rejected: loss %s, heating %s",
+                          loss_rate, heating_rate)
+            return False
+        self.loss_rate = float(loss_rate)
+        self.heating_rate = float(heating_rate)
+        return True
+
+    def lead_time(self, temperature, target, outdoor):
+        """Return the hours of heating from temperature to target.
+
+        None if the model is not fitted, infinity if the target is out of
+        reach at this outdoor temperature.
+        """
+        if not self.fitted or None in (temperature, outdoor):
+            return None
+        if temperature >= target:
+            return 0.0
+        equilibrium = outdoor + self.heating_rate / self.loss_rate
+        if equilibrium <= target:
+            return math.inf
+        return math.log(
+            (equilibrium - temperature) / (equilibrium - target)
+        ) / self.loss_rate
+
+    def as_dict(self):
+        """Return the parameters to save."""
+        return {
+            ATTR_LOSS_RATE: self.loss_rate,
+            ATTR_HEATING_RATE: self.heating_rate,
+            ATTR_SAMPLES: self._count,
+        }
+
+    def restore(self, data):
+        """Resume saved parameters, kept until the next refit."""
+        if not data or data.get(ATTR_LOSS_RATE) is None:
+            return
+        self.loss_rate = data[ATTR_LOSS_RATE]
+        self.heating_rate = data[ATTR_HEATING_RATE]
+
+
+def _hours(delta):
+    """Return a timedelta in hours."""
+    return delta.total_seconds() / 3600
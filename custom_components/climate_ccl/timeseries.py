@@ -0,0 +1,273 @@
+"""Compact local time series of the samples of a CCL thermostat.
+
+    python -m custom_components.climate_ccl.timeseries <directory> \\
+        [--start 2019-01-01] [--end 2019-02-01] > samples.csv
+
+A sample is a 9 byte record: epoch seconds, temperature and target in
+hundredths of a degree, heater and regulation flags. Records are appended
+to memory-mapped segment files of SEGMENT_RECORDS records, named after
+their first second, so a year of one-minute samples takes under 5 MB.
+Segments entirely older than the retention are deleted when a new one is
+started.
+
+Range reads return NumPy arrays, the CSV export has the columns of the
+simulator traces and can be replayed as it is.
+"""
+import argparse
+from collections import namedtuple
+import csv
+import os
+import sys
+
+import numpy as np
+
+import homeassistant.util.dt as dt_util
+
+RECORD = np.dtype([
+    ("time", "<u4"),
+    ("temperature", "<i2"),
+    ("target", "<i2"),
+    ("flags", "u1"),
+])
+# 45 days of one-minute samples, 576 KiB
+SEGMENT_RECORDS = 65536
+SEGMENT_SUFFIX = ".seg"
+SCALE = 100
+# Temperature or target unknown, or the thermostat off
+MISSING = np.iinfo(np.int16).min
+FLAG_HEATER = 1
+FLAG_REGULATION = 2
+
+CSV_COLUMNS = ("time", "temperature", "target_temp", "heater", "regulation")
+
+Samples = namedtuple(
+    "Samples", ["time", "temperature", "target", "heater", "regulation"])
+
+
+class TimeSeries:
+    """Append-only store of the samples of a thermostat in a directory.
+
+    The methods do file I/O, open, close and create_segment run in the
+    executor. Appending writes to the mapped segment without touching the
+    file system. When no segment has room, samples wait in memory for the
+    one started with create_segment and use_segment.
+    """
+
+    def __init__(self, path, retention=None):
+        """Initialize the store, retention is a timedelta."""
+        self._path = path
+        self._retention = retention
+        self._segments = []
+        self._active = None
+        self._count = 0
+        self._last_time = 0
+        self._pending = []
+
+    @property
+    def path(self):
+        """Return the directory of the segments."""
+        return self._path
+
+    @property
+    def segment_needed(self):
+        """Return the first second of the segment to start, None if none."""
+        return int(self._pending[0]["time"]) if self._pending else None
+
+    def load(self):
+        """List the segments on disk, for reading."""
+        if not os.path.isdir(self._path):
+            self._segments = []
+            return
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self._path)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def open(self):
+        """Create the directory and resume the last segment if not full."""
+        os.makedirs(self._path, exist_ok=True)
+        self.load()
+        if not self._segments:
+            return
+        records = np.memmap(self._segment_path(self._segments[-1]), RECORD, "r+")
+        count = _count(records)
+        if count:
+            self._last_time = int(records["time"][count - 1])
+        if count < len(records):
+            self._active = records
+            self._count = count
+
+    def close(self):
+        """Write the waiting samples and the active segment, unmap it."""
+        while self._pending:
+            self.start_segment()
+        if self._active is not None:
+            self._active.flush()
+            self._active = None
+
+    def append(self, time, temperature, target, heater, regulation):
+        """Append a sample, time in epoch seconds.
+
+        Times going backwards are clamped to keep the records sorted. Return
+        True if the sample waits for a segment to be started.
+        """
+        seconds = max(int(time), self._last_time)
+        record = np.array((
+            seconds,
+            _scaled(temperature),
+            _scaled(target),
+            (FLAG_HEATER if heater else 0)
+            | (FLAG_REGULATION if regulation else 0),
+        ), RECORD)
+        self._last_time = seconds
+        if self._pending or self._active is None \
+                or self._count == len(self._active):
+            self._pending.append(record)
+            return True
+        self._active[self._count] = record
+        self._count += 1
+        return False
+
+    def read(self, start=None, end=None):
+        """Return the samples with start <= time < end, epoch seconds."""
+        chunks = []
+        for index, first in enumerate(self._segments):
+            if end is not None and first >= end:
+                break
+            following = self._segments[index + 1] \
+                if index + 1 < len(self._segments) else None
+            if start is not None and following is not None and following <= start:
+                continue
+            records = self._records(first)
+            times = records["time"]
+            low = np.searchsorted(times, start) if start is not None else 0
+            high = np.searchsorted(times, end) if end is not None else len(times)
+            chunks.append(np.array(records[low:high]))
+        records = np.concatenate(chunks) if chunks else np.empty(0, RECORD)
+        return Samples(
+            records["time"].astype("datetime64[s]"),
+            _unscaled(records["temperature"]),
+            _unscaled(records["target"]),
+            records["flags"] & FLAG_HEATER != 0,
+            records["flags"] & FLAG_REGULATION != 0,
+        )
+
+    def _records(self, first):
+        """Return the records of a segment, mapped read-only if not active."""
+        if self._active is not None and first == self._segments[-1]:
+            return self._active[:self._count]
+        records = np.memmap(self._segment_path(first), RECORD, "r")
+        return records[:_count(records)]
+
+    def start_segment(self):
+        """Start the segment the samples wait for, in one call."""
+        seconds = self.segment_needed
+        self.remove_segments(
+            self.use_segment(seconds, self.create_segment(seconds)))
+
+    def create_segment(self, seconds):
+        """Write back the active segment, return a new one starting at seconds.
+
+        The active segment is full, so no sample is written to it meanwhile.
+        """
+        if self._active is not None:
+            self._active.flush()
+        return np.memmap(
+            self._segment_path(seconds), RECORD, "w+", shape=(SEGMENT_RECORDS,))
+
+    def use_segment(self, seconds, records):
+        """Append to a created segment, return the files of expired ones.
+
+        The expired segments are no longer read, remove_segments deletes them.
+        """
+        self._active = records
+        self._count = 0
+        self._segments.append(seconds)
+        pending, self._pending = self._pending, []
+        for record in pending:
+            if self._count == len(self._active):
+                self._pending.append(record)
+            else:
+                self._active[self._count] = record
+                self._count += 1
+        expired = []
+        if self._retention is None:
+            return expired
+        expiry = seconds - self._retention.total_seconds()
+        # A segment ends where the next one starts
+        while len(self._segments) > 1 and self._segments[1] <= expiry:
+            expired.append(self._segment_path(self._segments.pop(0)))
+        return expired
+
+    @staticmethod
+    def remove_segments(paths):
+        """Delete the files of expired segments."""
+        for path in paths:
+            os.remove(path)
+
+    def _segment_path(self, first):
+        """Return the file of the segment starting at first."""
+        return os.path.join(self._path, "{}{}".format(first, SEGMENT_SUFFIX))
+
+
+def _count(records):
+    """Return the number of records written in a segment, zero time after."""
+    return int(np.count_nonzero(records["time"]))
+
+
+def _scaled(value):
+    """Return a temperature in hundredths, MISSING if None."""
+    if value is None:
+        return MISSING
+    return int(np.clip(round(value * SCALE), MISSING + 1, np.iinfo(np.int16).max))
+
+
+def _unscaled(values):
+    """Return temperatures in degrees, NaN where MISSING."""
+    return np.where(values == MISSING, np.nan, values / SCALE)
+
+
+def write_csv(samples, csv_file):
+    """Write samples as CSV rows, times in UTC."""
+    writer = csv.writer(csv_file)
+    writer.writerow(CSV_COLUMNS)
+    times = np.datetime_as_string(samples.time, timezone="UTC")
+    for index, time in enumerate(times):
+        temperature = samples.temperature[index]
+        target = samples.target[index]
+        writer.writerow((
+            time,
+            "" if np.isnan(temperature) else round(float(temperature), 2),
+            "" if np.isnan(target) else round(float(target), 2),
+            int(samples.heater[index]),
+            int(samples.regulation[index]),
+        ))
+
+
+def _parse_epoch(value):
+    """Parse an ISO date, naive in UTC, into epoch seconds."""
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        parsed = dt_util.parse_datetime("{}T00:00:00".format(value))
+    if parsed is None:
+        raise argparse.ArgumentTypeError("Invalid time: {}".format(value))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.UTC)
+    return int(dt_util.as_timestamp(parsed))
+
+
+def main(argv=None):
+    """Export the samples of a thermostat as CSV."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="segments of a thermostat")
+    parser.add_argument("--start", type=_parse_epoch, help="first time, UTC")
+    parser.add_argument("--end", type=_parse_epoch, help="end time, UTC")
+    args = parser.parse_args(argv)
+
+    series = TimeSeries(args.directory)
+    series.load()
+    write_csv(series.read(args.start, args.end), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Decision trace of the CCL thermostat."""
+from collections import deque, namedtuple
+import json
+
+TRACE_EVALUATION = "evaluation"
+TRACE_MIN_CYCLE = "min_cycle"
+TRACE_REGULATION = "regulation"
+
+TraceEvent = namedtuple(
+    "TraceEvent",
+    [
+        "time",
+        "kind",
+        "cur_temp",
+        "target_temp",
+        "too_cold",
+        "too_hot",
+        "next_state",
+        "force",
+        "keep_alive",
+        "actions",
+    ],
+)
+
+
+class DecisionTrace:
+    """Last decisions of a thermostat, in a ring buffer of fixed size."""
+
+    def __init__(self, size):
+        """Initialize an empty trace keeping size events."""
+        self._events = deque(maxlen=size)
+
+    def __len__(self):
+        """Return the number of events kept."""
+        return len(self._events)
+
+    def record(self, *fields):
+        """Add an event, dropping the oldest one when the trace is full."""
+        self._events.append(TraceEvent(*fields))
+
+    def events(self, count=None):
+        """Return the last count events, oldest first."""
+        events = list(self._events)
+        if count is not None:
+            events = events[-count:] if count else []
+        return events
+
+
+def event_as_dict(event):
+    """Return an event as a JSON serializable dict."""
+    data = event._asdict()
+    data["time"] = event.time.isoformat()
+    data["actions"] = [list(action) for action in event.actions]
+    return data
+
+
+def write_trace(path, traces):
+    """Write events as JSON lines, traces maps entity ids to event lists.
+
+    This does blocking I/O and runs in the executor.
+    """
+    with open(path, "w") as trace_file:
+        for entity_id, events in traces.items():
+            for event in events:
+                data = event_as_dict(event)
+                data["entity_id"] = entity_id
+                trace_file.write(json.dumps(data) + "\n")
@@ -0,0 +1,435 @@
+"""Parameter sweep of the CCL thermostat over recorded history.
+
+    python -m custom_components.climate_ccl.tuner history.csv
+    python -m custom_components.climate_ccl.tuner home-assistant_v2.db \\
+        --grid cold_tolerance=0.3,0.5,0.8 --grid min_cycle_duration=30,60
+
+The history is a CSV export (entity_id, state, last_changed and an optional
+attributes column) or a copy of the recorder SQLite database. A thermal model
+of the room (see thermal.py) is fitted to the recorded indoor temperature,
+outdoor temperature and heater state. Every candidate setting then drives the
+model against the recorded outdoor temperature and setpoints, with the
+decisions of logic.py.
+
+The candidates of a worker are simulated together as NumPy arrays, the grid
+is split between worker processes. Settings are ranked by a weighted score
+of the hours outside the comfort band, the stove starts and the stove
+runtime. Results are printed as JSON lines, the current setting first.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import itertools
+import json
+import math
+import os
+import sqlite3
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from homeassistant.components.climate.const import HVAC_MODE_OFF
+from homeassistant.const import ATTR_TEMPERATURE, STATE_ON
+import homeassistant.util.dt as dt_util
+from homeassistant.util import slugify
+
+from . import climate
+from .logic import decide_array
+from .regulation import regulation_times
+from .simulator import DEFAULT_CONFIG, load_config
+from .thermal import ThermalModel
+
+# Tuned settings, durations in minutes
+TUNED = (
+    climate.CONF_COLD_TOLERANCE,
+    climate.CONF_HOT_TOLERANCE,
+    climate.CONF_REGULATION_DELTA,
+    climate.CONF_REGULATION_NB_DURATION,
+    climate.CONF_MIN_DUR,
+)
+DEFAULT_GRID = {
+    climate.CONF_COLD_TOLERANCE: [0.2, 0.3, 0.5, 0.7, 1.0],
+    climate.CONF_HOT_TOLERANCE: [0.1, 0.3, 0.5, 0.8],
+    climate.CONF_REGULATION_DELTA: [0.5, 1.0, 1.5, 2.0],
+    climate.CONF_REGULATION_NB_DURATION: [4, 8, 12, 16],
+    climate.CONF_MIN_DUR: [30, 60, 90, 120],
+}
+
+TIME_COLUMNS = ("last_changed", "last_updated", "time")
+
+
+def load_csv(path, entity_ids):
+    """Return the recorded states of entity_ids in a CSV export.
+
+    The states of an entity are (epoch seconds, state, attributes) tuples
+    sorted by time.
+    """
+    history = {entity_id: [] for entity_id in entity_ids}
+    with open(path, newline="") as history_file:
+        reader = csv.DictReader(history_file)
+        fields = reader.fieldnames or []
+        time_column = next((col for col in TIME_COLUMNS if col in fields), None)
+        if time_column is None or "entity_id" not in fields:
+            raise ValueError("{}: no entity_id or time column".format(path))
+        for row in reader:
+            states = history.get(row["entity_id"])
+            if states is None:
+                continue
+            attributes = row.get("attributes")
+            states.append((
+                _timestamp(row[time_column]),
+                row["state"],
+                json.loads(attributes) if attributes else {},
+            ))
+    for states in history.values():
+        states.sort(key=lambda state: state[0])
+    return history
+
+
+def load_sqlite(path, entity_ids):
+    """Return the recorded states of entity_ids in a recorder database."""
+    history = {entity_id: [] for entity_id in entity_ids}
+    connection = sqlite3.connect("file:{}?mode=ro".format(path), uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT entity_id, state, attributes, last_updated FROM states "
+            "WHERE entity_id IN ({}) ORDER BY last_updated".format(
+                ",".join("?" * len(entity_ids))),
+            list(entity_ids),
+        )
+        for entity_id, state, attributes, last_updated in rows:
+            history[entity_id].append((
+                _timestamp(last_updated),
+                state,
+                json.loads(attributes) if attributes else {},
+            ))
+    finally:
+        connection.close()
+    return history
+
+
+def _timestamp(value):
+    """Return an ISO date, naive in UTC, or epoch seconds as epoch seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        raise ValueError("Invalid time: {}".format(value))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.UTC)
+    return dt_util.as_timestamp(parsed)
+
+
+def _float(state):
+    """Return a state as a float, NaN if it is not a number."""
+    try:
+        return float(state)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def resample(states, times, value):
+    """Return value(state, attributes) of the state in effect at each time.
+
+    NaN before the first state.
+    """
+    if not states:
+        return np.full(len(times), math.nan)
+    changed = np.array([state[0] for state in states])
+    values = np.array([value(state[1], state[2]) for state in states] + [math.nan])
+    # Index -1 picks the trailing NaN
+    return values[np.searchsorted(changed, times, side="right") - 1]
+
+
+class Series:
+    """Recorded inputs of the thermostat on a regular time grid."""
+
+    def __init__(self, times, outdoor, target, indoor):
+        """Initialize from arrays of epoch seconds and °C.
+
+        A NaN target is a period with the thermostat off, indoor is the
+        temperature at the start.
+        """
+        self.times = times
+        self.outdoor = outdoor
+        self.target = target
+        self.indoor = indoor
+
+
+def fit_plant(history, sensor, outdoor, heater):
+    """Fit a ThermalModel on the whole recorded history."""
+    outdoor_states = history[outdoor]
+    outdoor_times = np.array([state[0] for state in outdoor_states])
+    outdoor_values = [_float(state[1]) for state in outdoor_states]
+    events = [(state[0], 0, state[1]) for state in history[heater]] \
+        + [(state[0], 1, state[1]) for state in history[sensor]]
+    events.sort(key=lambda event: event[:2])
+    model = ThermalModel(size=max(len(history[sensor]), 1))
+    for time, kind, state in events:
+        when = dt_util.utc_from_timestamp(time)
+        if kind == 0:
+            model.set_heating(when, state == STATE_ON)
+            continue
+        temperature = _float(state)
+        if math.isnan(temperature):
+            continue
+        index = np.searchsorted(outdoor_times, time, side="right") - 1
+        out = outdoor_values[index] if index >= 0 else math.nan
+        model.add(when, temperature, None if math.isnan(out) else out)
+    if model.samples:
+        model.refit()
+    return model
+
+
+def simulate(series, loss_rate, heating_rate, candidates, regulation_minutes,
+             comfort):
+    """Drive the plant with every candidate at once.
+
+    candidates maps each TUNED setting to an array, one value per
+    candidate. Return the arrays of hours outside target ± comfort, stove
+    starts and stove runtime hours.
+    """
+    count = len(candidates[climate.CONF_COLD_TOLERANCE])
+    cold = candidates[climate.CONF_COLD_TOLERANCE]
+    hot = candidates[climate.CONF_HOT_TOLERANCE]
+    delta = candidates[climate.CONF_REGULATION_DELTA]
+    min_cycle = candidates[climate.CONF_MIN_DUR] * 60
+    on_time = regulation_minutes * 60
+    period = candidates[climate.CONF_REGULATION_NB_DURATION] * on_time
+
+    step = series.times[1] - series.times[0]
+    hours = step / 3600
+    temp = np.full(count, series.indoor)
+    heating = np.zeros(count, dtype=bool)
+    regulating = np.zeros(count, dtype=bool)
+    regulation_start = np.zeros(count)
+    last_transition = np.full(count, -math.inf)
+    outside = np.zeros(count)
+    starts = np.zeros(count, dtype=int)
+    runtime = np.zeros(count)
+
+    for now, target, out in zip(series.times, series.target, series.outdoor):
+        if math.isnan(target):
+            # Thermostat off, the stove stopping counts for the min cycle
+            last_transition = np.where(heating, now, last_transition)
+            heating[:] = False
+            regulating[:] = False
+            power = 0.0
+        else:
+            heat, regulation, _, _ = decide_array(
+                temp, target, heating, cold, hot, delta)
+            switching = heat != heating
+            blocked = switching & (now - last_transition < min_cycle)
+            heat = np.where(blocked, heating, heat)
+            regulation = np.where(blocked, regulating, regulation)
+            starts += heat & ~heating
+            last_transition = np.where(heat != heating, now, last_transition)
+            regulation_start = np.where(
+                regulation & ~regulating, now, regulation_start)
+            heating, regulating = heat, regulation
+            if on_time:
+                power = np.where(
+                    regulating,
+                    (now - regulation_start) % period < on_time,
+                    heating,
+                ).astype(float)
+            else:
+                power = heating.astype(float)
+            outside += (np.abs(temp - target) > comfort) * hours
+        runtime += power * hours
+        if not math.isnan(out):
+            temp = temp + (loss_rate * (out - temp) + heating_rate * power) * hours
+    return outside, starts, runtime
+
+
+def _simulate_chunk(args):
+    """Run simulate in a worker process."""
+    return simulate(*args)
+
+
+def candidate_grid(grid):
+    """Return the TUNED arrays of the cartesian product of grid."""
+    values = list(itertools.product(*(grid[key] for key in TUNED)))
+    return {
+        key: np.array([candidate[index] for candidate in values], dtype=float)
+        for index, key in enumerate(TUNED)
+    }
+
+
+def _regulation_times(config):
+    """Return the regulation (on time, off time) of a validated config."""
+    return regulation_times(
+        config.get(climate.CONF_REGULATION_ON_TIME),
+        config.get(climate.CONF_REGULATION_OFF_TIME),
+        config.get(climate.CONF_REGULATION_DURATION),
+        config.get(climate.CONF_REGULATION_NB_DURATION),
+    )
+
+
+def _config_values(config):
+    """Return the current TUNED values of a validated config.
+
+    Without regulation_delta the stove never regulates, a NaN delta. The
+    cycle count is the period over the on time of the regulation, infinite
+    when the off phase never ends.
+    """
+    min_cycle = config.get(climate.CONF_MIN_DUR)
+    on_time, off_time = _regulation_times(config)
+    if on_time is None:
+        nb_duration = 1
+    elif off_time is None:
+        nb_duration = math.inf
+    else:
+        nb_duration = (on_time + off_time) / on_time
+    return {
+        climate.CONF_COLD_TOLERANCE: config[climate.CONF_COLD_TOLERANCE],
+        climate.CONF_HOT_TOLERANCE: config[climate.CONF_HOT_TOLERANCE],
+        climate.CONF_REGULATION_DELTA:
+            config.get(climate.CONF_REGULATION_DELTA, math.nan),
+        climate.CONF_REGULATION_NB_DURATION: nb_duration,
+        climate.CONF_MIN_DUR:
+            min_cycle.total_seconds() / 60 if min_cycle else 0,
+    }
+
+
+def _setting(value):
+    """Return a candidate value for JSON, None if the setting does not apply."""
+    return float(value) if math.isfinite(value) else None
+
+
+def _parse_grid(values, base):
+    """Return the grid of --grid setting=v1,v2 options over base."""
+    grid = {key: list(value) for key, value in base.items()}
+    for value in values or []:
+        key, _, items = value.partition("=")
+        if key not in TUNED:
+            raise ValueError("{} is not tuned, use one of {}".format(
+                key, ", ".join(TUNED)))
+        grid[key] = [float(item) for item in items.split(",")]
+    return grid
+
+
+def tune(series, plant, grid, current, regulation_minutes, comfort, weights,
+         workers):
+    """Simulate the current setting and the grid, return the ranked rows."""
+    candidates = candidate_grid(grid)
+    for key in TUNED:
+        candidates[key] = np.append(current[key], candidates[key])
+    count = len(candidates[climate.CONF_COLD_TOLERANCE])
+    workers = max(1, min(workers, count))
+    bounds = np.linspace(0, count, workers + 1).astype(int)
+    chunks = [
+        (series, plant.loss_rate, plant.heating_rate,
+         {key: values[low:high] for key, values in candidates.items()},
+         regulation_minutes, comfort)
+        for low, high in zip(bounds, bounds[1:])
+    ]
+    if workers == 1:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_simulate_chunk, chunks))
+    outside, starts, runtime = (
+        np.concatenate([result[index] for result in results])
+        for index in range(3)
+    )
+    score = weights[0] * outside + weights[1] * starts + weights[2] * runtime
+
+    rows = []
+    for index in [0] + list(np.argsort(score[1:], kind="stable") + 1):
+        rows.append({
+            **{key: _setting(candidates[key][index]) for key in TUNED},
+            "hours_outside_comfort": round(float(outside[index]), 2),
+            "starts": int(starts[index]),
+            "runtime_hours": round(float(runtime[index]), 2),
+            "score": round(float(score[index]), 3),
+            **({"current": True} if index == 0 else {}),
+        })
+    return rows
+
+
+def main(argv=None):
+    """Fit the room, sweep the grid and print the best settings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("history", help="CSV export or recorder SQLite copy")
+    parser.add_argument("--config", help="YAML file with the climate_ccl entry")
+    parser.add_argument("--outdoor", help="outdoor sensor, else outdoor_sensor")
+    parser.add_argument("--target", type=float,
+                        help="setpoint, else the recorded thermostat setpoint")
+    parser.add_argument("--grid", action="append",
+                        help="setting=v1,v2,... (durations in minutes)")
+    parser.add_argument("--step", type=float, default=60, help="seconds")
+    parser.add_argument("--comfort", type=float, default=0.5, help="°C")
+    parser.add_argument("--weights", default="1,0.5,0.1",
+                        help="per hour outside comfort, start, runtime hour")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    config = climate.PLATFORM_SCHEMA(dict(
+        DEFAULT_CONFIG, **(load_config(args.config) if args.config else {})))
+    sensor = config.get(climate.CONF_SENSOR)
+    if sensor is None:
+        parser.error("the room is fitted on a single target_sensor, not zones")
+    heater = config[climate.CONF_HEATER]
+    outdoor = args.outdoor or config.get(climate.CONF_OUTDOOR_SENSOR)
+    if outdoor is None:
+        parser.error("an outdoor sensor is required to fit the room")
+    thermostat = "climate.{}".format(slugify(config[climate.CONF_NAME]))
+    regulation = _regulation_times(config)[0]
+    weights = [float(weight) for weight in args.weights.split(",")]
+
+    started = perf_counter()
+    entity_ids = (sensor, heater, outdoor, thermostat)
+    if args.history.endswith(".csv"):
+        history = load_csv(args.history, entity_ids)
+    else:
+        history = load_sqlite(args.history, entity_ids)
+    if not history[sensor] or not history[outdoor]:
+        parser.error("no history of {} or {}".format(sensor, outdoor))
+
+    times = np.arange(history[sensor][0][0], history[sensor][-1][0], args.step)
+    if len(times) < 2:
+        parser.error("the history of {} is shorter than two steps".format(sensor))
+
+    plant = fit_plant(history, sensor, outdoor, heater)
+    if not plant.fitted:
+        parser.error("the history does not fit a thermal model")
+
+    if args.target is not None:
+        target = np.full(len(times), args.target)
+    else:
+        target = resample(
+            history[thermostat], times,
+            lambda state, attributes: math.nan if state == HVAC_MODE_OFF
+            else _float(attributes.get(ATTR_TEMPERATURE)),
+        )
+    series = Series(
+        times, resample(history[outdoor], times, lambda state, _: _float(state)),
+        target,
+        _float(history[sensor][0][1]),
+    )
+
+    rows = tune(
+        series, plant, _parse_grid(args.grid, DEFAULT_GRID),
+        _config_values(config),
+        regulation.total_seconds() / 60 if regulation else 0,
+        args.comfort, weights, args.workers,
+    )
+    json.dump({
+        **plant.as_dict(),
+        "steps": len(times),
+        "candidates": len(rows) - 1,
+        "wall_time": round(perf_counter() - started, 3),
+    }, sys.stdout)
+    sys.stdout.write("\n")
+    for row in rows[:args.top + 1]:
+        json.dump(row, sys.stdout)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Open window detection of the CCL thermostat.
+
+A window is reported open when the temperature falls faster than a drop
+rate, measured by the least squares slope of the last readings. The heater
+is then held in standby until the hold expires.
+"""
+from datetime import timedelta
+
+# Readings kept for the slope
+DEFAULT_SAMPLES = 6
+
+
+class WindowDetector:
+    """Slope of the last readings in a ring buffer.
+
+    The sums of the least squares fit are updated as a reading replaces the
+    oldest one, in constant time. Times are hours from an origin moved to
+    the oldest reading each time the buffer wraps, the sums are then
+    recomputed so they do not drift.
+    """
+
+    def __init__(self, drop_rate, hold, samples=DEFAULT_SAMPLES):
+        """Initialize the detector, drop_rate in °C per hour, hold a timedelta."""
+        self._drop_rate = drop_rate
+        self._hold = hold
+        self._size = samples
+        self._times = [0.0] * samples
+        self._values = [0.0] * samples
+        self._index = 0
+        self._count = 0
+        self._origin = None
+        self._sums = [0.0, 0.0, 0.0, 0.0]
+        self.slope = None
+        self.open_until = None
+
+    def update(self, time, value):
+        """Add a reading, return True if it opens the window."""
+        if self._origin is None:
+            self._origin = time
+        hours = (time - self._origin).total_seconds() / 3600
+        sum_t, sum_v, sum_tt, sum_tv = self._sums
+        if self._count == self._size:
+            old_t = self._times[self._index]
+            old_v = self._values[self._index]
+            sum_t -= old_t
+            sum_v -= old_v
+            sum_tt -= old_t * old_t
+            sum_tv -= old_t * old_v
+        else:
+            self._count += 1
+        self._times[self._index] = hours
+        self._values[self._index] = value
+        self._sums = [
+            sum_t + hours, sum_v + value,
+            sum_tt + hours * hours, sum_tv + hours * value,
+        ]
+        self._index = (self._index + 1) % self._size
+        if self._index == 0:
+            self._rebase()
+        self.slope = self._slope()
+
+        if self.slope is None or self.slope > -self._drop_rate:
+            return False
+        opened = not self.is_open(time)
+        self.open_until = time + self._hold
+        return opened
+
+    def is_open(self, now):
+        """Return True while the heater is held."""
+        return self.open_until is not None and now < self.open_until
+
+    def hold(self, now):
+        """Hold the heater from now, as if a drop was detected."""
+        self.open_until = now + self._hold
+
+    def reset(self):
+        """Forget the readings and release the hold."""
+        self._index = 0
+        self._count = 0
+        self._origin = None
+        self._sums = [0.0, 0.0, 0.0, 0.0]
+        self.slope = None
+        self.open_until = None
+
+    def _slope(self):
+        """Return the slope of the readings in °C per hour, None if unknown."""
+        if self._count < 2:
+            return None
+        sum_t, sum_v, sum_tt, sum_tv = self._sums
+        spread = self._count * sum_tt - sum_t * sum_t
+        if spread <= 1e-9:
+            return None
+        return (self._count * sum_tv - sum_t * sum_v) / spread
+
+    def _rebase(self):
+        """Move the origin to the oldest reading and recompute the sums."""
+        shift = self._times[self._index]
+        self._times = [hours - shift for hours in self._times]
+        self._origin += timedelta(hours=shift)
+        self._sums = [
+            sum(self._times), sum(self._values),
+            sum(t * t for t in self._times),
+            sum(t * v for t, v in zip(self._times, self._values)),
+        ]
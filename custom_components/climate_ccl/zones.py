@@ -0,0 +1,119 @@
+"""Zones of a CCL thermostat sharing one stove.
+
+Each zone has a temperature sensor, a weight and a setpoint, the thermostat
+target shifted by an offset or a fixed temperature. The zones are reduced
+to one temperature measured against the thermostat target, so the shared
+stove gets a single decision:
+
+- mean: weighted mean of the zone deviations from their setpoints
+- min: deviation of the coldest zone relative to its setpoint
+- worst_deficit: deviation of the zone with the largest weighted deficit
+"""
+import voluptuous as vol
+
+from homeassistant.const import ATTR_TEMPERATURE
+import homeassistant.helpers.config_validation as cv
+
+CONF_SENSOR = "sensor"
+CONF_WEIGHT = "weight"
+CONF_OFFSET = "offset"
+
+AGGREGATION_MEAN = "mean"
+AGGREGATION_MIN = "min"
+AGGREGATION_WORST_DEFICIT = "worst_deficit"
+AGGREGATIONS = [AGGREGATION_MEAN, AGGREGATION_MIN, AGGREGATION_WORST_DEFICIT]
+
+ZONE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_SENSOR): cv.entity_id,
+        vol.Optional(CONF_WEIGHT, default=1.0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)),
+        vol.Exclusive(ATTR_TEMPERATURE, "setpoint"): vol.Coerce(float),
+        vol.Exclusive(CONF_OFFSET, "setpoint"): vol.Coerce(float),
+    }
+)
+
+
+class Zone:
+    """One room heated by the shared stove."""
+
+    __slots__ = ["sensor", "weight", "temperature", "offset", "reading"]
+
+    def __init__(self, config):
+        """Initialize the zone from its config."""
+        self.sensor = config[CONF_SENSOR]
+        self.weight = config[CONF_WEIGHT]
+        self.temperature = config.get(ATTR_TEMPERATURE)
+        self.offset = config.get(CONF_OFFSET, 0.0)
+        self.reading = None
+
+    def deviation(self, target):
+        """Return the reading minus the setpoint of the zone."""
+        if self.temperature is not None:
+            return self.reading - self.temperature
+        return self.reading - target - self.offset
+
+
+class ZoneGroup:
+    """Latest readings of the zones and their aggregation."""
+
+    def __init__(self, configs, aggregation=AGGREGATION_MEAN):
+        """Initialize the group from the zone configs."""
+        self._zones = {config[CONF_SENSOR]: Zone(config) for config in configs}
+        self._aggregation = aggregation
+
+    @property
+    def entity_ids(self):
+        """Return the sensors of the zones."""
+        return list(self._zones)
+
+    @property
+    def aggregation(self):
+        """Return the aggregation of the group."""
+        return self._aggregation
+
+    def update(self, entity_id, state):
+        """Record the reading of a zone, return True if it changed.
+
+        A state that is not a number drops the zone until its next reading.
+        """
+        zone = self._zones.get(entity_id)
+        if zone is None:
+            return False
+        try:
+            reading = float(state)
+        except (TypeError, ValueError):
+            reading = None
+        if reading == zone.reading:
+            return False
+        zone.reading = reading
+        return True
+
+    def aggregate(self, target):
+        """Return the group temperature against target, None without readings."""
+        zones = [zone for zone in self._zones.values() if zone.reading is not None]
+        if not zones or target is None:
+            return None
+        if self._aggregation == AGGREGATION_MIN:
+            deviation = min(zone.deviation(target) for zone in zones)
+        elif self._aggregation == AGGREGATION_WORST_DEFICIT:
+            deviation = min(
+                zones, key=lambda zone: zone.weight * zone.deviation(target)
+            ).deviation(target)
+        else:
+            deviation = sum(
+                zone.weight * zone.deviation(target) for zone in zones
+            ) / sum(zone.weight for zone in zones)
+        return target + deviation
+
+    def mean_reading(self):
+        """Return the weighted mean of the readings, None without readings."""
+        zones = [zone for zone in self._zones.values() if zone.reading is not None]
+        if not zones:
+            return None
+        return sum(zone.weight * zone.reading for zone in zones) \
+            / sum(zone.weight for zone in zones)
+
+    def as_dict(self):
+        """Return the reading of each zone."""
+        return {zone.sensor: zone.reading for zone in self._zones.values()}
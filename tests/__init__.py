@@ -0,0 +1 @@
+"""Tests of the Climate CCL integration."""
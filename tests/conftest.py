@@ -0,0 +1,90 @@
+"""Thermostat running on the simulator stand-ins, for the tests."""
+from datetime import timedelta
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_START,
+    TEMP_CELSIUS,
+)
+import homeassistant.util.dt as dt_util
+import pytest_asyncio
+
+from custom_components.climate_ccl import climate
+from custom_components.climate_ccl.simulator import (
+    DEFAULT_CONFIG,
+    SimHass,
+    async_create_thermostat,
+    register_actuators,
+    virtual_time,
+)
+
+# A Monday
+START = dt_util.parse_datetime("2019-01-07T06:00:00+00:00")
+
+
+class ThermostatHarness:
+    """One thermostat and its helpers, on a virtual clock."""
+
+    def __init__(self, start=START):
+        """Initialize the stand-in hass."""
+        self.hass = SimHass(start)
+        self.config = None
+        self.thermostat = None
+        register_actuators(self.hass)
+
+    @property
+    def now(self):
+        """Return the virtual time."""
+        return self.hass.clock.now
+
+    async def async_setup(self, restored_state=None, **overrides):
+        """Add the thermostat, overrides of the default config set to None dropped."""
+        config = dict(DEFAULT_CONFIG, **overrides)
+        self.config = climate.PLATFORM_SCHEMA({
+            key: value for key, value in config.items() if value is not None})
+        self.thermostat = await async_create_thermostat(
+            self.hass, self.config, restored_state)
+        await self.thermostat.async_added_to_hass()
+        self.hass.bus.async_fire(EVENT_HOMEASSISTANT_START)
+        await self.hass.async_block_till_done()
+        return self.thermostat
+
+    async def async_temperature(self, value, entity_id=None):
+        """Report a reading of the target sensor."""
+        self.hass.states.async_set(
+            entity_id or self.config[climate.CONF_SENSOR], value,
+            {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS})
+        await self.hass.async_block_till_done()
+
+    async def async_advance(self, delta):
+        """Move the clock forward, firing the timers due in order."""
+        until = self.now + (delta if isinstance(delta, timedelta)
+                            else timedelta(seconds=delta))
+        while True:
+            due = self.hass.clock.pop_due(until)
+            if due is None:
+                break
+            self.hass.clock.now, action = due
+            self.hass.async_run_job(action, self.now)
+            await self.hass.async_block_till_done()
+        self.hass.clock.now = until
+
+    def state(self, entity_id):
+        """Return the state of an entity, None if unknown."""
+        state = self.hass.states.get(entity_id)
+        return state.state if state is not None else None
+
+    def calls(self, since=0):
+        """Return the (service, entity_id or option) of the service calls."""
+        return [
+            (call.service, call.data.get("option", call.data.get("entity_id")))
+            for _, call in self.hass.services.calls[since:]
+        ]
+
+
+@pytest_asyncio.fixture
+async def harness():
+    """Return a harness whose clock drives utcnow and the timers."""
+    harness = ThermostatHarness()
+    with virtual_time(harness.hass.clock):
+        yield harness
@@ -0,0 +1,130 @@
+"""Tests of the actuator dispatch and the retry backoff."""
+import asyncio
+from datetime import timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+import homeassistant.util.dt as dt_util
+import pytest
+import pytest_asyncio
+
+from custom_components.climate_ccl.actuator import (
+    ActuatorDispatcher,
+    Backoff,
+    DispatchResult,
+)
+from custom_components.climate_ccl.mirror import StateMirror
+from custom_components.climate_ccl.simulator import SimHass
+from custom_components.climate_ccl.stats import NullStats
+
+HEATER = "switch.stove"
+HEATER_STATUS = "binary_sensor.stove"
+HELPER = "input_boolean.stove_on"
+
+
+def test_backoff_doubles_up_to_max():
+    """Delays double from the first one, capped, with jitter around them."""
+    backoff = Backoff(timedelta(seconds=10), timedelta(seconds=60), jitter=0)
+    assert [backoff.next_delay() for _ in range(5)] == [10, 20, 40, 60, 60]
+    backoff.reset()
+    assert backoff.next_delay() == 10
+
+
+def test_backoff_jitter():
+    """The jitter stays within its share of the delay."""
+    backoff = Backoff(timedelta(seconds=100), timedelta(seconds=100), jitter=0.2)
+    for _ in range(50):
+        assert 80 <= backoff.next_delay() <= 120
+
+
+@pytest_asyncio.fixture
+async def hass():
+    """Return a stand-in hass with the heater off."""
+    hass = SimHass(dt_util.utcnow())
+    hass.states.async_set(HEATER, STATE_OFF)
+    hass.states.async_set(HEATER_STATUS, STATE_OFF)
+    return hass
+
+
+def _dispatcher(hass):
+    """Return a dispatcher of the heater reported by its status sensor."""
+    mirror = StateMirror(hass, [HEATER])
+    return ActuatorDispatcher(
+        hass, mirror, NullStats(), {HEATER: HEATER_STATUS},
+        timedelta(seconds=90)), mirror
+
+
+@pytest.mark.asyncio
+async def test_is_reached_against_mirror(hass):
+    """Outside reconcile passes the mirror of our own calls decides."""
+    dispatcher, mirror = _dispatcher(hass)
+    result = DispatchResult()
+    assert dispatcher._is_reached(HEATER, STATE_OFF, False, result)
+    assert not dispatcher._is_reached(HEATER, STATE_ON, False, result)
+    mirror.async_set(HEATER, STATE_ON)
+    assert dispatcher._is_reached(HEATER, STATE_ON, False, result)
+    assert result.drift == result.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_is_reached_reconcile(hass):
+    """Reconcile passes trust the device, within the settle delay."""
+    dispatcher, mirror = _dispatcher(hass)
+    mirror.async_set(HEATER, STATE_ON)
+    dispatcher._sent_at[HEATER] = dt_util.utcnow()
+
+    result = DispatchResult()
+    assert dispatcher._is_reached(HEATER, STATE_ON, True, result)
+    assert (result.pending, result.drift) == (1, 0)
+
+    dispatcher._sent_at[HEATER] = dt_util.utcnow() - timedelta(minutes=5)
+    result = DispatchResult()
+    assert not dispatcher._is_reached(HEATER, STATE_ON, True, result)
+    assert (result.pending, result.drift) == (0, 1)
+
+    hass.states.async_set(HEATER_STATUS, STATE_ON)
+    result = DispatchResult()
+    assert dispatcher._is_reached(HEATER, STATE_ON, True, result)
+    assert (result.pending, result.drift) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_is_reached_reconcile_never_sent(hass):
+    """A target the mirror does not hold is sent without counting drift."""
+    dispatcher, _ = _dispatcher(hass)
+    result = DispatchResult()
+    assert not dispatcher._is_reached(HEATER, STATE_ON, True, result)
+    assert result.drift == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatch_does_not_wait_for_heater(hass):
+    """Helpers are set before the dispatch returns, the slow heater is not."""
+    released = asyncio.Event()
+    calls = []
+
+    async def async_toggle(call):
+        if call.data["entity_id"] == HEATER:
+            await released.wait()
+        calls.append(call.data["entity_id"])
+
+    hass.services.async_register("homeassistant", "turn_on", async_toggle)
+    dispatcher = ActuatorDispatcher(
+        hass, StateMirror(hass, [HEATER, HELPER]), NullStats())
+    result = await dispatcher.async_dispatch(
+        [(HELPER, STATE_ON)], (HEATER, STATE_ON))
+    assert result.actions == [(HELPER, STATE_ON), (HEATER, STATE_ON)]
+    assert calls == [HELPER]
+
+    released.set()
+    await hass.async_block_till_done()
+    assert calls == [HELPER, HEATER]
+
+
+@pytest.mark.asyncio
+async def test_state_select_shows_heating_mode(harness):
+    """The state input_select receives the heating mode as decided."""
+    await harness.async_setup(min_cycle_duration=None)
+    await harness.async_temperature(15)
+    assert harness.state("input_select.poele_state") == "cool"
+    await harness.async_temperature(18)
+    assert harness.state("input_select.poele_state") == "standby"
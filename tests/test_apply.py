@@ -0,0 +1,83 @@
+"""Tests of the climate_ccl.apply service."""
+from homeassistant.components.climate.const import (
+    HVAC_MODE_HEAT,
+    HVAC_MODE_OFF,
+    PRESET_AWAY,
+    PRESET_NONE,
+)
+from homeassistant.const import STATE_OFF, STATE_ON
+import pytest
+import voluptuous as vol
+
+from custom_components.climate_ccl.climate import APPLY_SCHEMA
+from custom_components.climate_ccl.const import DOMAIN, SERVICE_APPLY
+
+THERMOSTAT = "climate.thermo_poele"
+
+
+def test_schema():
+    """A setting is required, unknown modes are refused."""
+    assert APPLY_SCHEMA({"entity_id": THERMOSTAT, "temperature": "19"}) == {
+        "entity_id": [THERMOSTAT], "temperature": 19.0}
+    with pytest.raises(vol.Invalid):
+        APPLY_SCHEMA({"entity_id": THERMOSTAT})
+    with pytest.raises(vol.Invalid):
+        APPLY_SCHEMA({"entity_id": THERMOSTAT, "hvac_mode": "dry"})
+    with pytest.raises(vol.Invalid):
+        APPLY_SCHEMA({"entity_id": THERMOSTAT, "preset_mode": "eco"})
+
+
+async def _apply(harness, **data):
+    """Call the service on the thermostat."""
+    await harness.hass.services.async_call(
+        DOMAIN, SERVICE_APPLY, dict(data, entity_id=[THERMOSTAT]), blocking=True)
+    await harness.hass.async_block_till_done()
+
+
+@pytest.mark.asyncio
+async def test_apply_in_one_pass(harness):
+    """Target and mode change together, with one pass and one publish."""
+    thermostat = await harness.async_setup(
+        initial_hvac_mode=HVAC_MODE_OFF, min_cycle_duration=None)
+    await harness.async_temperature(18)
+    writes = harness.hass.states.writes[THERMOSTAT]
+
+    await _apply(harness, temperature=20, hvac_mode=HVAC_MODE_HEAT)
+    assert thermostat.target_temperature == 20
+    assert thermostat.hvac_mode == HVAC_MODE_HEAT
+    assert harness.state("input_boolean.poele_on") == STATE_ON
+    assert harness.state("switch.poele") == STATE_ON
+    assert harness.hass.states.writes[THERMOSTAT] == writes + 1
+
+    await _apply(harness, temperature=20)
+    assert harness.hass.states.writes[THERMOSTAT] == writes + 1
+
+
+@pytest.mark.asyncio
+async def test_apply_away_and_back(harness):
+    """Away saves the target and none brings it back."""
+    thermostat = await harness.async_setup()
+    await harness.async_temperature(18)
+    await _apply(harness, preset_mode=PRESET_AWAY)
+    assert thermostat.preset_mode == PRESET_AWAY
+    assert thermostat.target_temperature == 7
+    await _apply(harness, preset_mode=PRESET_NONE, temperature=19)
+    assert thermostat.preset_mode is None
+    assert thermostat.target_temperature == 19
+
+
+@pytest.mark.asyncio
+async def test_away_refused_without_away_temp(harness):
+    """Without away_temp the change is refused and nothing is commanded."""
+    thermostat = await harness.async_setup(
+        away_temp=None, initial_hvac_mode=HVAC_MODE_OFF)
+    await harness.async_temperature(18)
+    calls = len(harness.hass.services.calls)
+
+    await _apply(harness, preset_mode=PRESET_AWAY, hvac_mode=HVAC_MODE_HEAT)
+    await thermostat.async_set_preset_mode(PRESET_AWAY)
+    assert thermostat.preset_mode is None
+    assert thermostat.target_temperature == 17
+    assert thermostat.hvac_mode == HVAC_MODE_OFF
+    assert harness.state("switch.poele") == STATE_OFF
+    assert len(harness.hass.services.calls) == calls + 1
@@ -0,0 +1,169 @@
+"""Tests of the config entries, their options and reload."""
+import asyncio
+
+from homeassistant import config_entries
+import pytest
+import voluptuous as vol
+
+import custom_components.climate_ccl as integration
+from custom_components.climate_ccl import entry_config
+from custom_components.climate_ccl.config_flow import (
+    CCLThermostatConfigFlow,
+    CCLThermostatOptionsFlow,
+)
+from custom_components.climate_ccl.const import (
+    DATA_ENTRY_SETUP,
+    DATA_HANDOVER,
+    DOMAIN,
+)
+from custom_components.climate_ccl.simulator import SimHass
+
+from .conftest import START
+
+DATA = {
+    "name": "Salon",
+    "heater": "switch.salon",
+    "target_sensor": "sensor.salon",
+    "heat": "input_boolean.salon_on",
+}
+
+
+class ConfigEntries:
+    """Stand-in for the config entry manager, loading platforms slowly."""
+
+    def __init__(self, entries=()):
+        """Initialize with the entries of the integration."""
+        self.entries = list(entries)
+        self.loaded = []
+        self.setup_done = asyncio.Event()
+
+    def async_entries(self, domain=None):
+        """Return the entries."""
+        return self.entries
+
+    async def async_forward_entry_setup(self, entry, platform):
+        """Load a platform once the setup may finish."""
+        await self.setup_done.wait()
+        self.loaded.append(platform)
+
+    async def async_forward_entry_unload(self, entry, platform):
+        """Unload a platform, which must be loaded."""
+        if platform not in self.loaded:
+            raise ValueError("Config entry was never loaded!")
+        self.loaded.remove(platform)
+        return True
+
+
+def _entry(options=None):
+    """Return an entry of the thermostat."""
+    return config_entries.ConfigEntry(
+        1, DOMAIN, DATA["name"], dict(DATA), config_entries.SOURCE_USER,
+        config_entries.CONN_CLASS_LOCAL_PUSH, {}, options or {},
+        entry_id="entry")
+
+
+def _options_flow(hass, entry):
+    """Return the options flow of an entry."""
+    flow = CCLThermostatOptionsFlow(entry)
+    flow.hass = hass
+    return flow
+
+
+@pytest.mark.asyncio
+async def test_options_form_shows_entry():
+    """The form is filled with the data and the options of the entry."""
+    hass = SimHass(START)
+    entry = _entry({"cold_tolerance": 0.5, "outdoor_sensor": "sensor.out"})
+    result = await _options_flow(hass, entry).async_step_init()
+    assert result["type"] == "form"
+    defaults = {
+        str(key): key.default() for key in result["data_schema"].schema
+        if key.default is not vol.UNDEFINED
+    }
+    assert defaults["heater"] == "switch.salon"
+    assert defaults["cold_tolerance"] == 0.5
+    assert defaults["hot_tolerance"] == 0.3
+    assert defaults["outdoor_sensor"] == "sensor.out"
+
+
+@pytest.mark.asyncio
+async def test_options_clear_entity():
+    """An optional entity left empty is removed from the config."""
+    hass = SimHass(START)
+    entry = _entry({"outdoor_sensor": "sensor.out"})
+    result = await _options_flow(hass, entry).async_step_init(dict(
+        DATA, outdoor_sensor="", heater_status="", cold_tolerance=0.4))
+    assert result["type"] == "create_entry"
+    assert result["data"]["outdoor_sensor"] is None
+    config = entry_config(entry.data, result["data"])
+    assert "outdoor_sensor" not in config
+    assert "heater_status" not in config
+    assert config["cold_tolerance"] == 0.4
+
+
+@pytest.mark.asyncio
+async def test_options_heater_in_use():
+    """A heater controlled by another thermostat is refused."""
+    hass = SimHass(START)
+
+    class Other:
+        name = "Cuisine"
+        heater_entity_id = "switch.cuisine"
+
+    hass.data[DOMAIN] = {"other": Other()}
+    result = await _options_flow(hass, _entry()).async_step_init(
+        dict(DATA, heater="switch.cuisine"))
+    assert result["type"] == "form"
+    assert result["errors"] == {"heater": "heater_in_use"}
+
+
+@pytest.mark.asyncio
+async def test_user_step():
+    """A thermostat is created once per name."""
+    hass = SimHass(START)
+    hass.config_entries = ConfigEntries()
+    flow = CCLThermostatConfigFlow()
+    flow.hass = hass
+    result = await flow.async_step_user(dict(DATA))
+    assert result["type"] == "create_entry"
+    assert result["data"] == DATA
+
+    hass.config_entries.entries.append(_entry())
+    result = await flow.async_step_user(dict(DATA, heater="switch.other"))
+    assert result["type"] == "abort"
+    assert result["reason"] == "already_configured"
+
+
+@pytest.mark.asyncio
+async def test_unload_during_startup():
+    """An entry unloaded before its platforms are loaded waits for them."""
+    hass = SimHass(START)
+    hass.config_entries = ConfigEntries()
+    entry = _entry()
+    assert await integration.async_setup_entry(hass, entry)
+
+    unload = hass.async_create_task(integration.async_unload_entry(hass, entry))
+    await asyncio.sleep(0)
+    assert not unload.done()
+    hass.config_entries.setup_done.set()
+    assert await unload
+    assert hass.config_entries.loaded == []
+    assert entry.entry_id not in hass.data[DATA_ENTRY_SETUP]
+    assert entry.update_listeners == []
+
+
+@pytest.mark.asyncio
+async def test_reload_hands_over_readings(harness):
+    """The thermostat set up again decides on the readings of the old one."""
+    thermostat = await harness.async_setup(min_cycle_duration=None)
+    await harness.async_temperature(15)
+    assert harness.state("switch.poele") == "on"
+    await thermostat.async_will_remove_from_hass()
+    assert not harness.hass.data[DOMAIN]
+    assert thermostat.entity_id in harness.hass.data[DATA_HANDOVER]
+
+    reloaded = await harness.async_setup(min_cycle_duration=None)
+    assert reloaded is not thermostat
+    assert not harness.hass.data[DATA_HANDOVER]
+    assert reloaded.current_temperature == 15
+    assert reloaded.hvac_action == "heating"
@@ -0,0 +1,82 @@
+"""Tests of the shared listeners and timers."""
+from datetime import timedelta
+
+from homeassistant.core import callback
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.climate_ccl.coordinator import ThermostatCoordinator
+from custom_components.climate_ccl.simulator import SimHass, virtual_time
+
+START = dt_util.parse_datetime("2019-01-01T00:00:10+00:00")
+
+
+def _run_until(hass, until):
+    """Fire the virtual timers due up to until."""
+    while True:
+        due = hass.clock.pop_due(until)
+        if due is None:
+            break
+        hass.clock.now, action = due
+        hass.async_run_job(action, hass.clock.now)
+    hass.clock.now = until
+
+
+@pytest.mark.asyncio
+async def test_state_change_routed_to_listeners():
+    """Only the listeners of the changed entity run, removal stops them."""
+    hass = SimHass(START)
+    coordinator = ThermostatCoordinator(hass)
+    calls = []
+
+    @callback
+    def listener(entity_id, old_state, new_state):
+        calls.append((entity_id, new_state.state))
+
+    remove = coordinator.async_track_state_change(
+        ["sensor.Room", "sensor.other"], listener)
+    assert coordinator.listener_count == 2
+    hass.states.async_set("sensor.room", "19")
+    hass.states.async_set("sensor.unrelated", "1")
+    assert calls == [("sensor.room", "19")]
+    assert coordinator.dispatched == 1
+
+    remove()
+    assert coordinator.listener_count == 0
+    hass.states.async_set("sensor.room", "20")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_timers_fire_in_order_and_cancel():
+    """Timers share one armed timer, a cancelled one never fires."""
+    hass = SimHass(START)
+    fired = []
+    with virtual_time(hass.clock):
+        coordinator = ThermostatCoordinator(hass)
+        coordinator.async_call_later(30, callback(lambda now: fired.append(30)))
+        cancel = coordinator.async_call_later(
+            10, callback(lambda now: fired.append(10)))
+        coordinator.async_call_later(20, callback(lambda now: fired.append(20)))
+        cancel()
+        assert coordinator.timer_count == 2
+        _run_until(hass, START + timedelta(minutes=1))
+    assert fired == [20, 30]
+    assert coordinator.timer_count == 0
+
+
+@pytest.mark.asyncio
+async def test_interval_ticks_on_multiples():
+    """An interval ticks on multiples of its period until removed."""
+    hass = SimHass(START)
+    ticks = []
+    with virtual_time(hass.clock):
+        coordinator = ThermostatCoordinator(hass)
+        remove = coordinator.async_track_time_interval(
+            callback(lambda now: ticks.append(now)), timedelta(minutes=1))
+        _run_until(hass, START + timedelta(minutes=3))
+        remove()
+        _run_until(hass, START + timedelta(minutes=10))
+    assert [tick.second for tick in ticks] == [0, 0, 0]
+    assert ticks[0] == START.replace(second=0) + timedelta(minutes=1)
+    assert len(ticks) == 3
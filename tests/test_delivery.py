@@ -0,0 +1,85 @@
+"""Tests of the heater delivery checks and their retries."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.exceptions import HomeAssistantError
+import pytest
+
+HEATER = "switch.poele"
+HEATER_STATUS = "binary_sensor.poele"
+
+
+async def _heating(harness):
+    """Start a thermostat heating, its stove reported off."""
+    harness.hass.states.async_set(HEATER_STATUS, STATE_OFF)
+    thermostat = await harness.async_setup(
+        heater_status=HEATER_STATUS, min_cycle_duration=None,
+        retry_delay={"seconds": 90}, retry_max_delay={"minutes": 10})
+    await harness.async_temperature(15)
+    assert harness.state(HEATER) == STATE_ON
+    return thermostat
+
+
+def _turn_ons(harness):
+    """Return the number of turn_on calls of the heater."""
+    return harness.calls().count(("turn_on", HEATER))
+
+
+@pytest.mark.asyncio
+async def test_ignored_command_resent(harness):
+    """A command the stove does not report is resent without keep_alive."""
+    thermostat = await _heating(harness)
+    assert _turn_ons(harness) == 1
+
+    await harness.async_advance(timedelta(minutes=6))
+    assert _turn_ons(harness) >= 2
+    assert thermostat.device_state_attributes["actuator_drift"] >= 1
+    assert thermostat._unsub_retry is not None
+
+
+@pytest.mark.asyncio
+async def test_confirmed_command_ends_retries(harness):
+    """Once the stove reports the command the retries stop."""
+    thermostat = await _heating(harness)
+    harness.hass.states.async_set(HEATER_STATUS, STATE_ON)
+    await harness.async_advance(timedelta(minutes=6))
+    assert _turn_ons(harness) == 1
+    assert thermostat.device_state_attributes["actuator_drift"] == 0
+    assert thermostat._unsub_retry is None
+    assert thermostat._retry_backoff.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_command_retried_with_backoff(harness):
+    """A failing call is found by the checks and resent at growing delays."""
+    failing = True
+    toggle = harness.hass.services._services[("homeassistant", "turn_on")]
+
+    async def async_turn_on(call):
+        if failing and call.data["entity_id"] == HEATER:
+            raise HomeAssistantError("stove unreachable")
+        await toggle(call)
+
+    harness.hass.services.async_register(
+        "homeassistant", "turn_on", async_turn_on)
+    harness.hass.states.async_set(HEATER_STATUS, STATE_OFF)
+    thermostat = await harness.async_setup(
+        heater_status=HEATER_STATUS, min_cycle_duration=None,
+        retry_delay={"seconds": 60}, retry_max_delay={"minutes": 10})
+    await harness.async_temperature(15)
+    assert harness.state(HEATER) == STATE_OFF
+    # The pass does not wait for the stove, the failure shows as drift
+    assert thermostat.device_state_attributes["actuator_failures"] == 0
+    assert thermostat._retry_backoff.attempts == 1
+
+    # Checked after about 1, 2 and 4 minutes, resent once drifted
+    await harness.async_advance(timedelta(minutes=9))
+    drift = thermostat.device_state_attributes["actuator_drift"]
+    assert 2 <= drift <= 3
+    assert _turn_ons(harness) == 1 + drift
+    assert thermostat._retry_backoff.attempts >= 1 + drift
+
+    failing = False
+    await harness.async_advance(timedelta(minutes=20))
+    assert harness.state(HEATER) == STATE_ON
+    assert thermostat.device_state_attributes["actuator_failures"] == 0
@@ -0,0 +1,62 @@
+"""Tests of the temperature estimator between readings."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+import pytest
+
+from custom_components.climate_ccl.estimator import TrendEstimator
+
+from .conftest import START
+
+HEATER = "switch.poele"
+MINUTE = timedelta(minutes=1)
+
+
+def _learned(rate, heating=True, readings=30):
+    """Return an estimator fed with readings at rate °C per minute."""
+    estimator = TrendEstimator(timedelta(minutes=15))
+    for index in range(readings):
+        estimator.update(START + index * 5 * MINUTE, 15 + 5 * index * rate,
+                         heating)
+    return estimator
+
+
+def test_rate_learned_per_heater_state():
+    """The rate converges to the one of the readings, per heater state."""
+    estimator = _learned(0.02)
+    assert estimator.rate(True) == pytest.approx(1.2, abs=0.01)
+    assert estimator.rate(False) == 0
+    last = START + 29 * 5 * MINUTE
+    assert estimator.predict(last + 5 * MINUTE) \
+        == pytest.approx(15 + 30 * 5 * 0.02, abs=0.01)
+    # Extrapolated over the horizon at most
+    assert estimator.predict(last + 60 * MINUTE) \
+        == estimator.predict(last + 15 * MINUTE)
+
+
+def test_crossing():
+    """Only thresholds ahead of the trend and within the horizon count."""
+    estimator = _learned(0.02)
+    last = START + 29 * 5 * MINUTE
+    level = estimator.predict(last)
+    assert estimator.crossing(last, (level + 0.1, level - 0.1)) \
+        == pytest.approx(300, rel=0.01)
+    assert estimator.crossing(last, (level + 1,)) is None
+    assert estimator.crossing(last, (level - 0.1, None)) is None
+    assert TrendEstimator(MINUTE).crossing(last, (20,)) is None
+
+
+@pytest.mark.asyncio
+async def test_stops_between_readings(harness):
+    """The stove stops when the estimate crosses hot_tolerance."""
+    await harness.async_setup(
+        min_cycle_duration=None, estimator=True, regulation_delta=None)
+    # Rising 0.25 °C every 5 minutes, 17.25 at 06:35 and 17.5 at 06:40
+    for step in range(8):
+        await harness.async_temperature(15.5 + 0.25 * step)
+        await harness.async_advance(5 * MINUTE)
+    stopped = [time for time, call in harness.hass.services.calls
+               if call.service == "turn_off"
+               and call.data["entity_id"] == HEATER]
+    assert harness.state(HEATER) == STATE_OFF
+    assert START + 35 * MINUTE < stopped[0] < START + 40 * MINUTE
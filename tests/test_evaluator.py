@@ -0,0 +1,88 @@
+"""Tests of the coalescing evaluator."""
+import asyncio
+import gc
+import logging
+
+import pytest
+
+from custom_components.climate_ccl.evaluator import CoalescingEvaluator
+
+
+class Passes:
+    """Passes released one at a time, failing on demand."""
+
+    def __init__(self):
+        """Initialize without passes."""
+        self.calls = []
+        self.release = asyncio.Event()
+        self.fail = ()
+
+    async def evaluate(self, time, force, reconcile):
+        """Run a pass once released."""
+        self.calls.append((time, force, reconcile))
+        await self.release.wait()
+        if len(self.calls) in self.fail:
+            raise ValueError("pass failed")
+
+
+@pytest.mark.asyncio
+async def test_requests_merged():
+    """Requests during a pass share one follow-up with the strongest flags."""
+    passes = Passes()
+    evaluator = CoalescingEvaluator(passes.evaluate)
+    first = asyncio.ensure_future(evaluator.async_request())
+    await asyncio.sleep(0)
+    others = [
+        asyncio.ensure_future(evaluator.async_request(force=True)),
+        asyncio.ensure_future(evaluator.async_request(time=1)),
+    ]
+    await asyncio.sleep(0)
+    assert evaluator.queue_depth == 2
+    passes.release.set()
+    await asyncio.gather(first, *others)
+    assert passes.calls == [(None, False, False), (1, True, False)]
+    assert evaluator.merged == 1
+
+
+@pytest.mark.asyncio
+async def test_merged_pass_error(caplog):
+    """A failed follow-up is logged and raised to the requests still waiting."""
+    loop = asyncio.get_event_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    passes = Passes()
+    evaluator = CoalescingEvaluator(passes.evaluate)
+    first = asyncio.ensure_future(evaluator.async_request())
+    await asyncio.sleep(0)
+    gone = asyncio.ensure_future(evaluator.async_request())
+    waiting = asyncio.ensure_future(evaluator.async_request())
+    await asyncio.sleep(0)
+    gone.cancel()
+    passes.fail = (2, 4)
+    passes.release.set()
+
+    await first
+    with pytest.raises(ValueError):
+        await waiting
+    assert "Error in a merged control pass" in caplog.text
+
+    # Once every request is gone, nothing is left unretrieved. The log
+    # record would keep the error alive, it is not logged this time.
+    logger = logging.getLogger("custom_components.climate_ccl.evaluator")
+    logger.disabled = True
+    try:
+        passes.release.clear()
+        first = asyncio.ensure_future(evaluator.async_request())
+        await asyncio.sleep(0)
+        gone = asyncio.ensure_future(evaluator.async_request())
+        await asyncio.sleep(0)
+        gone.cancel()
+        passes.release.set()
+        await first
+        assert len(passes.calls) == 4
+        del gone
+        gc.collect()
+    finally:
+        logger.disabled = False
+        loop.set_exception_handler(None)
+    assert unhandled == []
@@ -0,0 +1,77 @@
+"""Tests of the decision logic."""
+from datetime import timedelta
+
+from homeassistant.components.climate.const import HVAC_MODE_COOL
+import homeassistant.util.dt as dt_util
+import numpy as np
+import pytest
+
+from custom_components.climate_ccl.logic import (
+    HVAC_MODE_IDLE,
+    HVAC_MODE_REGULATION,
+    decide,
+    decide_array,
+    min_cycle_allowed_at,
+)
+
+COLD_TOLERANCE = 0.3
+HOT_TOLERANCE = 0.3
+REGULATION_DELTA = 0.5
+
+
+@pytest.mark.parametrize(
+    "cur_temp, heating, expected",
+    [
+        (18.0, False, (HVAC_MODE_COOL, True, False)),
+        (19.8, False, (HVAC_MODE_IDLE, False, False)),
+        (18.0, True, (HVAC_MODE_COOL, True, False)),
+        (19.6, True, (HVAC_MODE_REGULATION, True, False)),
+        (19.75, True, (HVAC_MODE_REGULATION, False, False)),
+        (20.2, True, (HVAC_MODE_REGULATION, False, False)),
+        (20.3, True, (HVAC_MODE_IDLE, False, True)),
+        (21.0, False, (HVAC_MODE_IDLE, False, True)),
+    ],
+)
+def test_decide(cur_temp, heating, expected):
+    """The stove turns on below the cold band, regulates near the target."""
+    assert decide(cur_temp, 20.0, heating, COLD_TOLERANCE, HOT_TOLERANCE,
+                  REGULATION_DELTA) == expected
+
+
+def test_decide_without_regulation():
+    """Without a regulation delta the stove heats at full power up to the band."""
+    assert decide(19.9, 20.0, True, COLD_TOLERANCE, HOT_TOLERANCE, None)[0] \
+        == HVAC_MODE_COOL
+
+
+def test_decide_array_matches_decide():
+    """The vectorized decision agrees with decide for every candidate."""
+    cur_temp = np.arange(18.0, 22.0, 0.05)
+    for heating in (False, True):
+        heat, regulation, too_cold, too_hot = decide_array(
+            cur_temp, 20.0, np.full(len(cur_temp), heating),
+            COLD_TOLERANCE, HOT_TOLERANCE, REGULATION_DELTA,
+        )
+        for index, value in enumerate(cur_temp):
+            next_state, cold, hot = decide(
+                value, 20.0, heating, COLD_TOLERANCE, HOT_TOLERANCE,
+                REGULATION_DELTA,
+            )
+            assert heat[index] == (next_state != HVAC_MODE_IDLE)
+            assert regulation[index] == (next_state == HVAC_MODE_REGULATION)
+            assert too_cold[index] == cold
+            assert too_hot[index] == hot
+
+
+def test_min_cycle_allowed_at():
+    """Only turning the stove on or off waits for the min cycle."""
+    last = dt_util.utcnow()
+    duration = timedelta(minutes=10)
+    assert min_cycle_allowed_at(True, HVAC_MODE_IDLE, last, duration) \
+        == last + duration
+    assert min_cycle_allowed_at(False, HVAC_MODE_COOL, last, duration) \
+        == last + duration
+    assert min_cycle_allowed_at(True, HVAC_MODE_REGULATION, last, duration) is None
+    assert min_cycle_allowed_at(False, HVAC_MODE_IDLE, last, duration) is None
+    assert min_cycle_allowed_at(True, HVAC_MODE_IDLE, None, duration) is None
+    assert min_cycle_allowed_at(True, HVAC_MODE_IDLE, last, None) is None
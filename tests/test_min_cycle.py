@@ -0,0 +1,48 @@
+"""Tests of the re-evaluation when min_cycle_duration expires."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+import pytest
+
+from .conftest import START
+
+HEATER = "switch.poele"
+
+
+@pytest.mark.asyncio
+async def test_blocked_start_at_expiry(harness):
+    """A start held back by the min cycle happens when it expires."""
+    thermostat = await harness.async_setup()
+    await harness.async_temperature(15)
+    assert harness.state(HEATER) == STATE_OFF
+    assert thermostat._min_cycle_at == START + timedelta(hours=1)
+
+    # The same pass held back again arms no other timer
+    timers = thermostat._coordinator.timer_count
+    await harness.async_temperature(14.9)
+    assert thermostat._coordinator.timer_count == timers
+
+    # No reading comes, the timer alone starts the stove
+    await harness.async_advance(timedelta(minutes=59))
+    assert harness.state(HEATER) == STATE_OFF
+    await harness.async_advance(timedelta(minutes=1))
+    assert harness.state(HEATER) == STATE_ON
+    assert [time for time, call in harness.hass.services.calls
+            if call.data.get("entity_id") == HEATER] \
+        == [START + timedelta(hours=1)]
+    assert thermostat._min_cycle_at is None
+
+
+@pytest.mark.asyncio
+async def test_blocked_start_no_longer_needed(harness):
+    """A start no longer needed at expiry leaves the stove off."""
+    thermostat = await harness.async_setup()
+    await harness.async_temperature(15)
+    assert thermostat._min_cycle_at is not None
+    await harness.async_temperature(17)
+
+    calls = len(harness.hass.services.calls)
+    await harness.async_advance(timedelta(hours=1))
+    assert harness.state(HEATER) == STATE_OFF
+    assert len(harness.hass.services.calls) == calls
+    assert thermostat._min_cycle_at is None
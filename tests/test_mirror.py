@@ -0,0 +1,48 @@
+"""Tests of the mirror of the helper states."""
+from homeassistant.const import STATE_OFF, STATE_ON
+import pytest
+
+from custom_components.climate_ccl.mirror import StateMirror
+from custom_components.climate_ccl.simulator import SimHass
+
+from .conftest import START
+
+HEAT = "input_boolean.poele_on"
+
+
+@pytest.mark.asyncio
+async def test_mirror_tells_echo_from_change():
+    """An update already mirrored by our own call is not a change."""
+    hass = SimHass(START)
+    hass.states.async_set(HEAT, STATE_OFF)
+    mirror = StateMirror(hass, [HEAT, None])
+    assert mirror.entity_ids == [HEAT]
+    assert mirror.is_state(HEAT, STATE_OFF)
+
+    mirror.async_set(HEAT, STATE_ON)
+    hass.states.async_set(HEAT, STATE_ON)
+    assert not mirror.async_update(HEAT, hass.states.get(HEAT))
+    hass.states.async_set(HEAT, STATE_OFF)
+    assert mirror.async_update(HEAT, hass.states.get(HEAT))
+    assert mirror.is_state(HEAT, STATE_OFF)
+    assert mirror.async_update(HEAT, None)
+    assert mirror.get(HEAT) is None
+
+
+@pytest.mark.asyncio
+async def test_helper_changed_outside(harness):
+    """The echo of our calls is ignored, other changes are reconciled."""
+    thermostat = await harness.async_setup(min_cycle_duration=None)
+    decisions = len(thermostat.trace)
+    await harness.async_temperature(15)
+    assert harness.state(HEAT) == STATE_ON
+    # The echo of the calls brought no other pass
+    assert len(thermostat.trace) == decisions + 1
+    decisions += 1
+    calls = len(harness.hass.services.calls)
+
+    harness.hass.states.async_set(HEAT, STATE_OFF)
+    await harness.hass.async_block_till_done()
+    assert len(thermostat.trace) == decisions + 1
+    assert harness.calls(calls) == [("turn_on", HEAT)]
+    assert harness.state(HEAT) == STATE_ON
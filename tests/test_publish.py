@@ -0,0 +1,43 @@
+"""Tests of the change-aware state publishing."""
+from datetime import timedelta
+
+from homeassistant.const import ATTR_TEMPERATURE
+import pytest
+
+THERMOSTAT = "climate.thermo_poele"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_state_not_written(harness):
+    """A publish of the state written last is counted, not written."""
+    thermostat = await harness.async_setup()
+    await harness.async_temperature(18)
+    writes = harness.hass.states.writes[THERMOSTAT]
+    suppressed = thermostat.device_state_attributes["suppressed_writes"]
+
+    await thermostat.async_set_temperature(**{ATTR_TEMPERATURE: 17})
+    assert harness.hass.states.writes[THERMOSTAT] == writes
+    assert thermostat.device_state_attributes["suppressed_writes"] \
+        == suppressed + 1
+
+    await thermostat.async_set_temperature(**{ATTR_TEMPERATURE: 17.5})
+    assert harness.hass.states.writes[THERMOSTAT] == writes + 1
+    assert harness.hass.states.get(THERMOSTAT).attributes[ATTR_TEMPERATURE] \
+        == 17.5
+
+
+@pytest.mark.asyncio
+async def test_burst_written_once(harness):
+    """Changes within publish_delay are combined into one write."""
+    thermostat = await harness.async_setup(publish_delay={"seconds": 10})
+    await harness.async_temperature(18)
+    await harness.async_advance(timedelta(seconds=10))
+    writes = harness.hass.states.writes[THERMOSTAT]
+
+    for target in (17.5, 18, 18.5):
+        await thermostat.async_set_temperature(**{ATTR_TEMPERATURE: target})
+    assert harness.hass.states.writes[THERMOSTAT] == writes
+    await harness.async_advance(timedelta(seconds=10))
+    assert harness.hass.states.writes[THERMOSTAT] == writes + 1
+    assert harness.hass.states.get(THERMOSTAT).attributes[ATTR_TEMPERATURE] \
+        == 18.5
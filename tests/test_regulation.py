@@ -0,0 +1,52 @@
+"""Tests of the regulation duty cycle."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_OFF, STATE_ON
+import pytest
+import voluptuous as vol
+
+from custom_components.climate_ccl import climate
+from custom_components.climate_ccl.logic import HVAC_MODE_REGULATION
+from custom_components.climate_ccl.regulation import regulation_times
+
+MINUTE = timedelta(minutes=1)
+HEATER = "switch.poele"
+
+
+def test_regulation_times():
+    """Explicit times win, the legacy ones count durations."""
+    assert regulation_times(2 * MINUTE, 5 * MINUTE, MINUTE, 12) == (
+        2 * MINUTE, 5 * MINUTE)
+    assert regulation_times(None, None, MINUTE, 12) == (MINUTE, 11 * MINUTE)
+    assert regulation_times(None, None, MINUTE, 1) == (None, timedelta())
+    assert regulation_times(None, None, None, None) == (None, None)
+
+
+def test_times_set_together():
+    """An on time without an off time, or the reverse, is refused."""
+    config = {"platform": "climate_ccl", "heater": HEATER,
+              "target_sensor": "sensor.int_temperature"}
+    climate.PLATFORM_SCHEMA(dict(
+        config, regulation_on_time="00:02:00", regulation_off_time="00:10:00"))
+    for key in ("regulation_on_time", "regulation_off_time"):
+        with pytest.raises(vol.Invalid):
+            climate.PLATFORM_SCHEMA(dict(config, **{key: "00:02:00"}))
+
+
+@pytest.mark.asyncio
+async def test_duty_cycle_edges(harness):
+    """In regulation the heater is on one minute out of twelve, on timers."""
+    thermostat = await harness.async_setup(min_cycle_duration=None)
+    await harness.async_temperature(15)
+    await harness.async_temperature(16.5)
+    assert thermostat.hvac_action == climate.CURRENT_HVAC_REGULATION
+    assert harness.hass.states.get("input_select.poele_state").state \
+        == HVAC_MODE_REGULATION
+
+    heater = []
+    for _ in range(36):
+        heater.append(harness.state(HEATER))
+        await harness.async_advance(MINUTE)
+    assert heater.count(STATE_ON) == 3
+    assert heater[:2] == [STATE_ON, STATE_OFF]
+    assert heater[12] == heater[24] == STATE_ON
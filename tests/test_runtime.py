@@ -0,0 +1,66 @@
+"""Tests of the runtime and cycle accounting."""
+from datetime import timedelta
+
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.climate_ccl.runtime import (
+    FIGURE_CYCLES,
+    FIGURE_FUEL,
+    FIGURE_ON_TIME,
+    FIGURE_REGULATION_TIME,
+    PERIOD_DAY,
+    PERIOD_TOTAL,
+    PERIOD_WEEK,
+    RuntimeMeter,
+)
+
+# A Sunday, 23:00
+SUNDAY = dt_util.parse_datetime("2019-01-06T23:00:00+00:00")
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture(autouse=True)
+def utc_time_zone():
+    """Count the days in UTC."""
+    saved = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.UTC)
+    yield
+    dt_util.set_default_time_zone(saved)
+
+
+def _figures(meter, period, now):
+    """Return the figures of a period at now."""
+    return tuple(meter.get(period, figure, now) for figure in (
+        FIGURE_ON_TIME, FIGURE_REGULATION_TIME, FIGURE_CYCLES, FIGURE_FUEL))
+
+
+def test_figures_over_midnight():
+    """The day and the week start over at midnight, the total goes on."""
+    meter = RuntimeMeter(burn_rate=1.2)
+    meter.async_update(SUNDAY - HOUR, False, False, False)
+    meter.async_update(SUNDAY, True, True, False)
+    # Regulating from 00:30, the heater off for the last 30 minutes
+    meter.async_update(SUNDAY + 1.5 * HOUR, True, True, True)
+    meter.async_update(SUNDAY + 2 * HOUR, True, False, True)
+    now = SUNDAY + 2.5 * HOUR
+
+    assert _figures(meter, PERIOD_DAY, now) == (3600, 1800, 0, 1.2)
+    assert _figures(meter, PERIOD_WEEK, now) == (3600, 1800, 0, 1.2)
+    assert _figures(meter, PERIOD_TOTAL, now) \
+        == (7200, 1800, 1, pytest.approx(2.4))
+
+
+def test_restore():
+    """A saved meter resumes in the state of the stove."""
+    meter = RuntimeMeter()
+    meter.async_update(SUNDAY - HOUR, True, True, False)
+    data = meter.as_dict()
+
+    resumed = RuntimeMeter()
+    resumed.restore(data)
+    assert resumed.get(PERIOD_TOTAL, FIGURE_ON_TIME, SUNDAY) == 3600
+    assert resumed.get(PERIOD_TOTAL, FIGURE_CYCLES, SUNDAY) == 1
+    now = SUNDAY + 1.5 * HOUR
+    assert resumed.get(PERIOD_DAY, FIGURE_ON_TIME, now) == 1800
+    assert resumed.get(PERIOD_TOTAL, FIGURE_ON_TIME, now) == 9000
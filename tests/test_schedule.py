@@ -0,0 +1,140 @@
+"""Tests of the schedule parsing and timeline."""
+from datetime import timedelta
+
+from homeassistant.components.climate.const import HVAC_MODE_HEAT, HVAC_MODE_OFF
+import homeassistant.util.dt as dt_util
+import pytest
+import voluptuous as vol
+
+from custom_components.climate_ccl.schedule import (
+    SCHEDULE_ENTRY_SCHEMA,
+    SETPOINT_OFF,
+    ScheduleEntry,
+    Setpoint,
+    Timeline,
+    expand_weekly,
+    parse_event,
+)
+
+# A Tuesday
+START = dt_util.parse_datetime("2019-01-01T00:00:00+00:00")
+
+
+@pytest.fixture(autouse=True)
+def utc_time_zone():
+    """Expand the weekly entries in UTC."""
+    saved = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.UTC)
+    yield
+    dt_util.set_default_time_zone(saved)
+
+
+def test_entry_schema():
+    """Entries default to every day in heat, other modes are refused."""
+    entry = SCHEDULE_ENTRY_SCHEMA(
+        {"start": "06:30", "end": "08:00", "temperature": "19.5"})
+    assert entry["start"].hour == 6 and entry["start"].minute == 30
+    assert entry["days"] == ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    assert entry["hvac_mode"] == HVAC_MODE_HEAT
+    assert entry["temperature"] == 19.5
+    with pytest.raises(vol.Invalid):
+        SCHEDULE_ENTRY_SCHEMA({"start": "06:30", "end": "08:00", "hvac_mode": "cool"})
+    with pytest.raises(vol.Invalid):
+        SCHEDULE_ENTRY_SCHEMA({"start": "25:00", "end": "08:00"})
+
+
+def test_expand_weekly_over_midnight():
+    """Ranges over midnight end the next day, only on their days."""
+    config = SCHEDULE_ENTRY_SCHEMA(
+        {"start": "22:00", "end": "06:00", "days": ["tue"], "temperature": 17})
+    entries = expand_weekly([config], START, START + timedelta(days=6))
+    assert [(entry.start, entry.end) for entry in entries] == [
+        (START + timedelta(hours=22), START + timedelta(days=1, hours=6))]
+    assert entries[0].setpoint == Setpoint(17, HVAC_MODE_HEAT)
+
+
+def _event(summary, start, end):
+    """Return a calendar event."""
+    return {
+        "summary": summary,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": end.isoformat()},
+    }
+
+
+def test_parse_event():
+    """Events carry a temperature and an optional mode tag."""
+    end = START + timedelta(hours=1)
+    entry = parse_event(_event("Salon 19,5", START, end))
+    assert (entry.start, entry.end) == (START, end)
+    assert entry.setpoint == Setpoint(19.5, HVAC_MODE_HEAT)
+    assert parse_event(_event("5 #OFF", START, end)).setpoint \
+        == Setpoint(5, HVAC_MODE_OFF)
+    assert parse_event(_event("Holidays", START, end)) is None
+    assert parse_event(_event("19 #cool", START, end)) is None
+
+
+def test_timeline_latest_start_wins():
+    """Overlaps go to the entry starting last, gaps are off."""
+    hour = timedelta(hours=1)
+    timeline = Timeline(
+        [
+            ScheduleEntry(START + hour, START + 4 * hour, Setpoint(19, HVAC_MODE_HEAT)),
+            ScheduleEntry(START + 2 * hour, START + 3 * hour, Setpoint(21, HVAC_MODE_HEAT)),
+        ],
+        START, START + 6 * hour,
+    )
+    assert timeline.at(START) == SETPOINT_OFF
+    assert timeline.at(START + 1.5 * hour).temperature == 19
+    assert timeline.at(START + 2.5 * hour).temperature == 21
+    assert timeline.at(START + 3.5 * hour).temperature == 19
+    assert timeline.at(START + 6 * hour) is None
+    assert timeline.next_transition(START + 2.5 * hour) == START + 3 * hour
+    assert timeline.next_transition(START + 5 * hour) is None
+    assert len(timeline) == 5
+
+
+class Calendar:
+    """Stand-in for a calendar entity and its component."""
+
+    def __init__(self):
+        """Initialize without events."""
+        self.events = []
+        self.reads = 0
+
+    def get_entity(self, entity_id):
+        """Return the calendar entity."""
+        return self if entity_id == "calendar.poele" else None
+
+    async def async_get_events(self, hass, start_date, end_date):
+        """Return the events."""
+        self.reads += 1
+        return list(self.events)
+
+
+@pytest.mark.asyncio
+async def test_calendar_read_on_change(harness):
+    """An event added to the calendar is applied when the calendar changes."""
+    calendar = Calendar()
+    harness.hass.data["calendar"] = calendar
+    thermostat = await harness.async_setup(
+        initial_hvac_mode=HVAC_MODE_OFF, schedule_calendar="calendar.poele")
+    assert calendar.reads == 1
+    assert thermostat.hvac_mode == HVAC_MODE_OFF
+
+    calendar.events.append(
+        _event("19 #heat", harness.now, harness.now + timedelta(hours=2)))
+    harness.hass.states.async_set("calendar.poele", "on", {"message": "19 #heat"})
+    await harness.hass.async_block_till_done()
+    assert calendar.reads == 2
+    assert thermostat.hvac_mode == HVAC_MODE_HEAT
+    assert thermostat.target_temperature == 19
+
+    # Without a change, the calendar is read again within 5 minutes
+    await harness.async_advance(timedelta(minutes=5))
+    assert calendar.reads == 3
+
+    await thermostat.async_will_remove_from_hass()
+    harness.hass.states.async_set("calendar.poele", "off")
+    await harness.hass.async_block_till_done()
+    assert calendar.reads == 3
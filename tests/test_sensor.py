@@ -0,0 +1,45 @@
+"""Tests of the diagnostic and runtime sensors."""
+from datetime import timedelta
+
+import pytest
+
+from custom_components.climate_ccl.runtime import (
+    FIGURE_CYCLES,
+    FIGURE_FUEL,
+    FIGURE_ON_TIME,
+    PERIOD_DAY,
+)
+from custom_components.climate_ccl.sensor import (
+    RuntimeSensor,
+    StatsCounterSensor,
+    ThermostatSensor,
+)
+
+
+def test_base_sensor_is_abstract():
+    """A sensor must say how it reads its figure."""
+    with pytest.raises(TypeError):
+        ThermostatSensor(None, "Poele", "figure")
+
+
+@pytest.mark.asyncio
+async def test_sensors_read_thermostat(harness):
+    """The sensors read the runtime and the counters of their thermostat."""
+    thermostat = await harness.async_setup(
+        min_cycle_duration=None, diagnostics=True, runtime_sensors=True,
+        burn_rate=1.5)
+    on_time = RuntimeSensor(thermostat, "Poele", PERIOD_DAY, FIGURE_ON_TIME, "kg")
+    cycles = RuntimeSensor(thermostat, "Poele", PERIOD_DAY, FIGURE_CYCLES, "kg")
+    fuel = RuntimeSensor(thermostat, "Poele", PERIOD_DAY, FIGURE_FUEL, "kg")
+    decisions = StatsCounterSensor(thermostat, "Poele", "decisions", "Decisions")
+
+    await harness.async_temperature(15)
+    await harness.async_advance(timedelta(minutes=30))
+    for sensor in (on_time, cycles, fuel, decisions):
+        sensor._async_read()
+    assert on_time.state == 0.5
+    assert on_time.unit_of_measurement == "h"
+    assert cycles.state == 1
+    assert fuel.state == 0.75
+    assert fuel.unit_of_measurement == "kg"
+    assert decisions.state >= 1
@@ -0,0 +1,44 @@
+"""Replay of the synthetic trace through the thermostat."""
+from homeassistant.components.climate.const import CURRENT_HVAC_HEAT
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.climate_ccl import climate
+from custom_components.climate_ccl.simulator import Simulation, synthetic_trace
+
+
+@pytest.mark.asyncio
+async def test_synthetic_days():
+    """Three days of the daily swing keep the stove cycling as configured."""
+    samples = synthetic_trace(3)
+    simulation = Simulation()
+    result = await simulation.async_run(samples)
+    config = simulation.config
+    writes = simulation.hass.states.writes
+
+    assert result.samples == len(samples)
+    # One start on each daily low, helpers switched once per start and stop
+    assert result.cycles == 3
+    assert writes[config[climate.CONF_HEAT]] <= 2 * result.cycles
+    # A decision switches the heater once at most
+    assert writes[config[climate.CONF_HEATER]] <= len(result.decisions)
+    assert all(len(decision["calls"]) <= 4 for decision in result.decisions)
+
+    # Below target - cold_tolerance the stove is only off for a min cycle
+    threshold = config[climate.CONF_TARGET_TEMP] \
+        - config[climate.CONF_COLD_TOLERANCE]
+    actions = [
+        (dt_util.parse_datetime(decision["time"]), decision["hvac_action"])
+        for decision in result.decisions
+    ]
+    index = 0
+    heating = False
+    cold_off = 0
+    for sample in samples:
+        while index < len(actions) and actions[index][0] <= sample.time:
+            heating = actions[index][1] in (
+                CURRENT_HVAC_HEAT, climate.CURRENT_HVAC_REGULATION)
+            index += 1
+        cold_off += sample.temperature < threshold and not heating
+    min_cycle = config[climate.CONF_MIN_DUR]
+    assert cold_off * 60 <= min_cycle.total_seconds()
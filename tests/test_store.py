@@ -0,0 +1,54 @@
+"""Tests of the controller store."""
+import asyncio
+
+import pytest
+
+from custom_components.climate_ccl.simulator import SimHass
+from custom_components.climate_ccl.store import ControllerStore
+
+from .conftest import START
+
+
+class Store:
+    """Stand-in for the storage helper, loading once released."""
+
+    def __init__(self, data):
+        """Initialize with the saved data."""
+        self.data = data
+        self.release = asyncio.Event()
+        self.saves = []
+
+    async def async_load(self):
+        """Return the saved data."""
+        await self.release.wait()
+        return self.data
+
+    def async_delay_save(self, data_func, delay):
+        """Record a delayed write."""
+        self.saves.append(data_func)
+
+
+@pytest.mark.asyncio
+async def test_set_before_load():
+    """A state set before the load is kept and written with the file."""
+    store = ControllerStore(SimHass(START))
+    store._store = Store({"climate.a": {"active": False},
+                          "climate.b": {"active": True}})
+    load = asyncio.ensure_future(store.async_load())
+    await asyncio.sleep(0)
+    store.async_set("climate.a", {"active": True})
+    assert store.get("climate.a") == {"active": True}
+    assert store._store.saves == []
+
+    store._store.release.set()
+    await load
+    assert store.get("climate.a") == {"active": True}
+    assert store.get("climate.b") == {"active": True}
+    assert len(store._store.saves) == 1
+    assert store._store.saves[0]() == {
+        "climate.a": {"active": True}, "climate.b": {"active": True}}
+
+    await store.async_load()
+    store.async_set("climate.b", {"active": False})
+    store.async_set("climate.b", {"active": True})
+    assert len(store._store.saves) == 2
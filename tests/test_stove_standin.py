@@ -0,0 +1,95 @@
+"""Tests of the stove driver against the stand-in ESP."""
+import asyncio
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+import pytest
+
+from custom_components.climate_ccl.stove import StoveDriver
+from custom_components.climate_ccl.stove_standin import StandInStove
+
+
+async def _start(stove):
+    """Serve the stand-in, return the server and a driver on it."""
+    server = TestServer(stove.create_app())
+    await server.start_server()
+    session = ClientSession()
+    driver = StoveDriver(
+        session,
+        str(server.make_url("/on")),
+        str(server.make_url("/off")),
+        str(server.make_url("/status")),
+        5,
+        2,
+    )
+    return server, session, driver
+
+
+async def _stop(server, session):
+    """Close the driver session and the server."""
+    await session.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_send_and_confirm():
+    """A command is accepted at once and reported after the lag."""
+    stove = StandInStove(lag=0.05)
+    server, session, driver = await _start(stove)
+    try:
+        await driver.async_send(True)
+        assert stove.commands == 1
+        assert await driver.async_fetch_status() is False
+        await asyncio.sleep(0.1)
+        assert await driver.async_fetch_status() is True
+
+        await driver.async_send(False)
+        await asyncio.sleep(0.1)
+        assert stove.commands == 2
+        assert await driver.async_fetch_status() is False
+    finally:
+        await _stop(server, session)
+
+
+@pytest.mark.asyncio
+async def test_long_poll():
+    """A long-poll returns on the change, or with the state after the wait."""
+    stove = StandInStove()
+    server, session, driver = await _start(stove)
+    try:
+        assert await driver.async_fetch_status(0.2, False) is False
+
+        poll = asyncio.ensure_future(driver.async_fetch_status(5, False))
+        await asyncio.sleep(0.05)
+        assert not poll.done()
+        await driver.async_send(True)
+        assert await asyncio.wait_for(poll, 1) is True
+    finally:
+        await _stop(server, session)
+
+
+@pytest.mark.asyncio
+async def test_webhook_push():
+    """Each change is posted to the webhook."""
+    pushed = asyncio.Queue()
+
+    async def handle_webhook(request):
+        await pushed.put(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post("/webhook", handle_webhook)
+    webhook = TestServer(app)
+    await webhook.start_server()
+    stove = StandInStove(push_url=str(webhook.make_url("/webhook")))
+    server, session, driver = await _start(stove)
+    try:
+        await driver.async_send(True)
+        assert await asyncio.wait_for(pushed.get(), 1) == {"state": "on"}
+        await driver.async_send(True)
+        await driver.async_send(False)
+        assert await asyncio.wait_for(pushed.get(), 1) == {"state": "off"}
+        assert pushed.empty()
+    finally:
+        await _stop(server, session)
+        await webhook.close()
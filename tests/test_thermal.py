@@ -0,0 +1,107 @@
+"""Tests of the thermal model and the optimum start."""
+from datetime import timedelta
+import math
+
+from homeassistant.components.climate.const import HVAC_MODE_HEAT
+import homeassistant.util.dt as dt_util
+import pytest
+
+from custom_components.climate_ccl.schedule import (
+    SCHEDULE_ENTRY_SCHEMA,
+    ScheduleEngine,
+)
+from custom_components.climate_ccl.simulator import SimHass
+from custom_components.climate_ccl.thermal import ThermalModel
+
+from .conftest import START
+
+LOSS_RATE = 0.2
+HEATING_RATE = 3.0
+OUTDOOR = 5.0
+
+
+def _fitted_model(hours=48):
+    """Return a model fed with readings of a simulated room every 10 minutes."""
+    model = ThermalModel()
+    temperature = 15.0
+    step = 10 / 60
+    heating = False
+    for index in range(int(hours / step)):
+        time = START + timedelta(hours=index * step)
+        # The heater cycles around 18 °C
+        if temperature < 17 and not heating or temperature > 19 and heating:
+            heating = not heating
+            model.set_heating(time, heating)
+        model.add(time, temperature, OUTDOOR)
+        # Exact solution of the model over the step
+        equilibrium = OUTDOOR + heating * HEATING_RATE / LOSS_RATE
+        temperature = equilibrium + (temperature - equilibrium) \
+            * math.exp(-LOSS_RATE * step)
+    return model
+
+
+def test_fit_recovers_parameters():
+    """The fit finds the rates of the room the readings come from."""
+    model = _fitted_model()
+    assert model.fitted
+    assert model.loss_rate == pytest.approx(LOSS_RATE, rel=0.05)
+    assert model.heating_rate == pytest.approx(HEATING_RATE, rel=0.05)
+
+
+def test_lead_time():
+    """The lead time is the heating time of the model to the target."""
+    model = ThermalModel()
+    assert model.lead_time(15, 19, OUTDOOR) is None
+    model.loss_rate, model.heating_rate = LOSS_RATE, HEATING_RATE
+    # Equilibrium at 20 °C
+    assert model.lead_time(15, 19, OUTDOOR) \
+        == pytest.approx(math.log(5) / LOSS_RATE)
+    assert model.lead_time(19.5, 19, OUTDOOR) == 0
+    assert model.lead_time(15, 21, OUTDOOR) == math.inf
+
+
+class Coordinator:
+    """Stand-in for the coordinator, keeping the timer armed last."""
+
+    def __init__(self):
+        """Initialize without timer."""
+        self.wake_up = None
+
+    def async_track_point_in_utc_time(self, action, point_in_time):
+        """Record the timer."""
+        self.wake_up = point_in_time
+        return lambda: None
+
+
+@pytest.mark.asyncio
+async def test_preheat_ahead_of_transition(monkeypatch):
+    """A heating setpoint is applied its lead time ahead of its entry."""
+    saved = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.UTC)
+    applied = []
+
+    async def async_apply(temperature, hvac_mode):
+        applied.append((temperature, hvac_mode))
+
+    coordinator = Coordinator()
+    entry = SCHEDULE_ENTRY_SCHEMA(
+        {"start": "08:00", "end": "10:00", "temperature": 19})
+    engine = ScheduleEngine(
+        SimHass(START), coordinator, [entry], None, async_apply,
+        lambda setpoint: timedelta(hours=1, minutes=30))
+    try:
+        now = START
+        monkeypatch.setattr(dt_util, "utcnow", lambda: now)
+        await engine.async_start()
+        transition = START.replace(hour=8)
+        assert engine.next_transition == transition
+        assert engine.preheat_start == transition - timedelta(hours=1.5)
+        assert coordinator.wake_up == START + timedelta(minutes=15)
+        assert applied[-1][1] != HVAC_MODE_HEAT
+
+        now = engine.preheat_start
+        await engine._async_transition(now)
+        assert applied[-1] == (19, HVAC_MODE_HEAT)
+        assert coordinator.wake_up == transition
+    finally:
+        dt_util.set_default_time_zone(saved)
@@ -0,0 +1,105 @@
+"""Tests of the local time series."""
+from datetime import timedelta
+import io
+
+import numpy as np
+import pytest
+
+from custom_components.climate_ccl import timeseries
+from custom_components.climate_ccl.timeseries import TimeSeries
+
+START = 1546300800
+
+
+def _append(series, *sample):
+    """Append a sample, starting a segment at once when it waits for one."""
+    if series.append(*sample):
+        series.start_segment()
+
+
+def test_append_read_and_resume(tmp_path):
+    """Samples round trip in hundredths, and the last segment is resumed."""
+    series = TimeSeries(str(tmp_path))
+    series.open()
+    _append(series, START, 19.504, 20, True, False)
+    _append(series, START + 60, None, 20, False, True)
+    _append(series, START + 30, 19.0, None, False, False)
+    series.close()
+
+    series = TimeSeries(str(tmp_path))
+    series.open()
+    assert not series.append(START + 120, 18.5, 20, True, True)
+    samples = series.read()
+    assert samples.time.astype(int).tolist() == [
+        START, START + 60, START + 60, START + 120]
+    assert samples.temperature[0] == pytest.approx(19.5)
+    assert np.isnan(samples.temperature[1])
+    assert np.isnan(samples.target[2])
+    assert samples.heater.tolist() == [True, False, False, True]
+    assert samples.regulation.tolist() == [False, True, False, True]
+    assert len(series.read(START + 60, START + 120).time) == 2
+    series.close()
+
+
+def test_segments_and_retention(tmp_path, monkeypatch):
+    """Full segments start new files, the expired ones are deleted."""
+    monkeypatch.setattr(timeseries, "SEGMENT_RECORDS", 10)
+    series = TimeSeries(str(tmp_path), timedelta(minutes=25))
+    series.open()
+    for minute in range(60):
+        _append(series, START + minute * 60, 20, 20, False, False)
+    series.close()
+    # Segments of 10 minutes, the last one started at 50, so the ones ending
+    # by minute 25 are gone
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "{}.seg".format(START + minute * 60) for minute in (20, 30, 40, 50)]
+
+    reader = TimeSeries(str(tmp_path))
+    reader.load()
+    samples = reader.read(START + 35 * 60)
+    assert samples.time.astype(int)[0] == START + 35 * 60
+    assert len(samples.time) == 25
+
+
+def test_samples_wait_for_segment(tmp_path, monkeypatch):
+    """Samples wait in memory while the segment is created, none is lost."""
+    monkeypatch.setattr(timeseries, "SEGMENT_RECORDS", 2)
+    series = TimeSeries(str(tmp_path), timedelta(minutes=2))
+    series.open()
+    assert series.append(START, 20, 20, False, False)
+    assert series.segment_needed == START
+    records = series.create_segment(START)
+    assert series.append(START + 60, 20, 20, False, False)
+    assert series.use_segment(START, records) == []
+    assert series.segment_needed is None
+    assert len(series.read().time) == 2
+
+    for minute in (2, 4):
+        assert series.append(START + minute * 60, 21, 20, False, False)
+        assert series.append(START + minute * 60 + 60, 21, 20, False, False)
+        records = series.create_segment(series.segment_needed)
+        expired = series.use_segment(START + minute * 60, records)
+    # The first segment ended at minute 2, before the retention
+    assert expired == [str(tmp_path / "{}.seg".format(START))]
+    series.remove_segments(expired)
+    assert len(series.read().time) == 4
+    assert series.segment_needed is None
+
+    assert series.append(START + 360, 21, 20, False, False)
+    series.close()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "{}.seg".format(START + minute * 60) for minute in (4, 6)]
+
+
+def test_write_csv(tmp_path):
+    """The export has the columns of the simulator traces."""
+    series = TimeSeries(str(tmp_path))
+    series.open()
+    _append(series, START, 19.25, None, True, False)
+    output = io.StringIO()
+    timeseries.write_csv(series.read(), output)
+    assert output.getvalue().splitlines() == [
+        "time,temperature,target_temp,heater,regulation",
+        "2019-01-01T00:00:00Z,19.25,,1,0",
+    ]
+    series.close()
@@ -0,0 +1,44 @@
+"""Tests of the decision trace and the control path logging."""
+from datetime import timedelta
+import logging
+
+from homeassistant.const import STATE_ON
+import pytest
+
+from custom_components.climate_ccl.trace import (
+    TRACE_EVALUATION,
+    TRACE_MIN_CYCLE,
+    DecisionTrace,
+)
+
+
+def test_ring_buffer():
+    """The oldest events are dropped once the trace is full."""
+    trace = DecisionTrace(2)
+    for index in range(3):
+        trace.record(index, TRACE_EVALUATION, 18, 17, False, True, "idle",
+                     False, False, ())
+    assert len(trace) == 2
+    assert [event.time for event in trace.events()] == [1, 2]
+    assert [event.time for event in trace.events(1)] == [2]
+    assert trace.events(0) == []
+
+
+@pytest.mark.asyncio
+async def test_passes_traced_not_logged(harness, caplog):
+    """Passes go to the trace, only the start of the stove is logged."""
+    thermostat = await harness.async_setup()
+    await harness.async_temperature(15)
+    assert thermostat.trace.events()[-1].kind == TRACE_MIN_CYCLE
+    caplog.clear()
+    caplog.set_level(logging.DEBUG, logger="custom_components.climate_ccl")
+    await harness.async_temperature(14.9)
+    await harness.async_advance(timedelta(hours=1))
+    assert harness.state("switch.poele") == STATE_ON
+    await harness.async_temperature(15)
+    await harness.async_temperature(15.1)
+
+    assert thermostat.trace.events()[-1].kind == TRACE_EVALUATION
+    assert [record.getMessage() for record in caplog.records
+            if record.name.endswith(".climate")] == [
+                "Heater input_boolean.poele_on started"]
@@ -0,0 +1,125 @@
+"""Tests of the setting sweep of the tuner."""
+from homeassistant.components.climate.const import HVAC_MODE_HEAT, HVAC_MODE_OFF
+from homeassistant.const import STATE_ON
+import numpy as np
+import pytest
+
+from custom_components.climate_ccl import climate, tuner
+from custom_components.climate_ccl.tuner import Series, simulate
+
+MINUTE = 60.0
+
+
+def _candidates(min_cycles):
+    """Return candidates differing only by their min cycle in minutes."""
+    count = len(min_cycles)
+    return {
+        climate.CONF_COLD_TOLERANCE: np.full(count, 0.3),
+        climate.CONF_HOT_TOLERANCE: np.full(count, 0.3),
+        climate.CONF_REGULATION_DELTA: np.full(count, 0.5),
+        climate.CONF_MIN_DUR: np.array(min_cycles, dtype=float),
+        climate.CONF_REGULATION_NB_DURATION: np.full(count, 3.0),
+    }
+
+
+def test_off_counts_as_transition():
+    """A stove stopped by the thermostat turning off waits for its min cycle."""
+    times = np.arange(0, 3 * 60) * MINUTE
+    target = np.full(len(times), 20.0)
+    target[60:70] = np.nan
+    # Too cold to ever reach the target, the stove only stops while off
+    series = Series(times, np.full(len(times), -20.0), target, 15.0)
+    _, starts, runtime = simulate(
+        series, 0.1, 1.0, _candidates([0, 30]), 0, 0.5)
+    assert starts.tolist() == [2, 2]
+    # Back on at minute 70 without a min cycle, at 60 + 30 with one
+    assert (runtime[0] - runtime[1]) * 60 == pytest.approx(20)
+
+
+def test_short_history_rejected(tmp_path, capsys):
+    """A history shorter than two steps is refused by the command line."""
+    history = tmp_path / "history.csv"
+    history.write_text(
+        "entity_id,state,last_changed\n"
+        "sensor.int_temperature,19,2019-01-01T00:00:00+00:00\n"
+        "sensor.int_temperature,19.2,2019-01-01T00:10:00+00:00\n"
+        "sensor.outdoor,5,2019-01-01T00:00:00+00:00\n"
+    )
+    with pytest.raises(SystemExit):
+        tuner.main([str(history), "--outdoor", "sensor.outdoor", "--step", "3600"])
+    assert "shorter than two steps" in capsys.readouterr().err
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("min_cycle", [0, 30])
+async def test_controller_agrees(harness, min_cycle):
+    """The thermostat and the tuner start and stop the stove alike.
+
+    Heating at 15 °C for 20 °C, off from minute 60 to 70, then heat again.
+    """
+    await harness.async_setup(
+        min_cycle_duration={"minutes": min_cycle} if min_cycle else None,
+        cold_tolerance=0.3, hot_tolerance=0.3, regulation_delta=0.5,
+        initial_hvac_mode=HVAC_MODE_HEAT, target_temp=20)
+    # The helpers were set up at the start, a transition for the min cycle
+    await harness.async_advance(min_cycle * MINUTE)
+    thermostat = harness.thermostat
+    heat = harness.config[climate.CONF_HEAT]
+
+    target = np.full(180, 20.0)
+    target[60:70] = np.nan
+    on_minutes = starts = 0
+    heating = False
+    for minute, value in enumerate(target):
+        if minute == 0:
+            await harness.async_temperature(15)
+        elif minute == 60:
+            await thermostat.async_set_hvac_mode(HVAC_MODE_OFF)
+        elif minute == 70:
+            await thermostat.async_set_hvac_mode(HVAC_MODE_HEAT)
+        on = harness.state(heat) == STATE_ON
+        starts += on and not heating
+        on_minutes += on
+        heating = on
+        await harness.async_advance(MINUTE)
+
+    series = Series(np.arange(180) * MINUTE, np.full(180, 15.0), target, 15.0)
+    _, tuned_starts, runtime = simulate(
+        series, 0.0, 0.0, _candidates([min_cycle]), 0, 0.5)
+    assert tuned_starts.tolist() == [starts] == [2]
+    assert runtime[0] * 60 == pytest.approx(on_minutes)
+    assert on_minutes == (150 if min_cycle else 170)
+
+
+def test_config_values():
+    """The current row regulates like the thermostat of the config."""
+    config = climate.PLATFORM_SCHEMA({
+        "platform": "climate_ccl", "heater": "switch.poele",
+        "target_sensor": "sensor.int_temperature",
+        "regulation_on_time": {"minutes": 2},
+        "regulation_off_time": {"minutes": 10},
+    })
+    values = tuner._config_values(config)
+    assert np.isnan(values[climate.CONF_REGULATION_DELTA])
+    assert values[climate.CONF_REGULATION_NB_DURATION] == 6
+    assert tuner._regulation_times(config)[0].total_seconds() == 120
+
+    legacy = dict(config, regulation_duration=config["regulation_on_time"],
+                  regulation_nb_duration=12, regulation_delta=1.0)
+    del legacy["regulation_on_time"], legacy["regulation_off_time"]
+    values = tuner._config_values(legacy)
+    assert values[climate.CONF_REGULATION_DELTA] == 1.0
+    assert values[climate.CONF_REGULATION_NB_DURATION] == 12
+
+
+def test_no_regulation_delta_heats_at_full_power():
+    """A NaN delta keeps the stove at full power up to the target."""
+    times = np.arange(0, 2 * 60) * MINUTE
+    series = Series(times, np.full(len(times), 0.0), np.full(len(times), 20.0),
+                    15.0)
+    candidates = _candidates([0, 0])
+    candidates[climate.CONF_REGULATION_DELTA] = np.array([np.nan, 10.0])
+    _, _, runtime = simulate(series, 0.0, 0.0, candidates, 1, 0.5)
+    # Started at full power, then regulating one minute out of three
+    assert runtime[0] * 60 == pytest.approx(120)
+    assert runtime[1] * 60 == pytest.approx(1 + 40)
@@ -0,0 +1,73 @@
+"""Tests of the start of a thermostat on last known readings."""
+from datetime import timedelta
+
+from homeassistant.components.climate.const import ATTR_CURRENT_TEMPERATURE
+from homeassistant.const import (
+    ATTR_TEMPERATURE,
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_OFF,
+    STATE_ON,
+    TEMP_CELSIUS,
+)
+from homeassistant.core import State
+import pytest
+
+from .conftest import START
+
+SENSOR = "sensor.temperature_salon"
+HEATER = "switch.poele"
+
+
+def _restored(age):
+    """Return the thermostat state saved age before the start."""
+    saved = START - age
+    return State("climate.thermo_poele", "heat", {
+        ATTR_CURRENT_TEMPERATURE: 15, ATTR_TEMPERATURE: 17},
+                 last_changed=saved, last_updated=saved)
+
+
+@pytest.mark.asyncio
+async def test_decides_on_restored_reading(harness):
+    """A fresh restored reading starts the stove before the sensor reports."""
+    thermostat = await harness.async_setup(
+        _restored(timedelta(minutes=5)), min_cycle_duration=None)
+    assert thermostat.current_temperature == 15
+    assert harness.state(HEATER) == STATE_ON
+    assert thermostat.device_state_attributes["first_decision_delay"] == 0
+
+
+@pytest.mark.asyncio
+async def test_old_reading_not_used(harness):
+    """A reading older than warm_start_max_age waits for the sensor."""
+    thermostat = await harness.async_setup(
+        _restored(timedelta(minutes=11)), min_cycle_duration=None)
+    assert thermostat.current_temperature is None
+    assert harness.state(HEATER) == STATE_OFF
+    assert thermostat.device_state_attributes["first_decision_delay"] is None
+
+    await harness.async_advance(timedelta(minutes=5))
+    await harness.async_temperature(15)
+    assert harness.state(HEATER) == STATE_ON
+    assert thermostat.device_state_attributes["first_decision_delay"] == 300
+
+
+@pytest.mark.asyncio
+async def test_seed_goes_through_filter(harness):
+    """The last sensor state primes the filter and the estimator."""
+    harness.hass.states.async_set(
+        SENSOR, 16, {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS})
+    # Reported before the restart
+    await harness.async_advance(timedelta(minutes=2))
+    thermostat = await harness.async_setup(
+        target_sensor=SENSOR, sensor_filter="exponential",
+        sensor_filter_alpha=0.5, estimator=True)
+    assert thermostat.current_temperature == 16
+    assert thermostat._cur_temp_seeded
+    # Not extrapolated while seeded
+    assert thermostat._control_temp == 16
+
+    await harness.async_advance(timedelta(minutes=10))
+    await harness.async_temperature(18)
+    assert thermostat.current_temperature == 17
+    assert not thermostat._cur_temp_seeded
+    assert thermostat._estimator.rate(False) > 0
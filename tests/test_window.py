@@ -0,0 +1,55 @@
+"""Tests of the open window detection."""
+from datetime import timedelta
+
+import homeassistant.util.dt as dt_util
+import numpy as np
+import pytest
+
+from custom_components.climate_ccl.window import WindowDetector
+
+START = dt_util.parse_datetime("2019-01-01T00:00:00+00:00")
+STEP = timedelta(minutes=2)
+
+
+def test_slope_matches_least_squares():
+    """The running slope equals a least squares fit across wraps."""
+    detector = WindowDetector(10, timedelta(minutes=30), samples=4)
+    values = [20.0, 20.1, 19.9, 20.3, 20.2, 19.8, 20.0, 20.4, 20.1, 19.7]
+    for index, value in enumerate(values):
+        detector.update(START + index * STEP, value)
+        if index == 0:
+            assert detector.slope is None
+            continue
+        first = max(0, index - 3)
+        hours = [i * STEP.total_seconds() / 3600 for i in range(first, index + 1)]
+        expected = np.polyfit(hours, values[first:index + 1], 1)[0]
+        assert detector.slope == pytest.approx(expected)
+
+
+def test_drop_opens_and_holds():
+    """A fast drop opens the window once, for the hold."""
+    hold = timedelta(minutes=30)
+    detector = WindowDetector(2, hold)
+    opened = [
+        detector.update(START + index * STEP, 20 - 0.2 * index)
+        for index in range(4)
+    ]
+    assert opened == [False, True, False, False]
+    last = START + 3 * STEP
+    assert detector.is_open(last)
+    assert detector.open_until == last + hold
+    assert not detector.is_open(last + hold)
+
+    detector.reset()
+    assert detector.slope is None
+    assert not detector.is_open(last)
+
+
+def test_slow_drop_and_manual_hold():
+    """A slow drop is not a window, a manual hold is."""
+    detector = WindowDetector(2, timedelta(minutes=30))
+    for index in range(6):
+        assert not detector.update(START + index * STEP, 20 - 0.01 * index)
+    assert not detector.is_open(START)
+    detector.hold(START)
+    assert detector.is_open(START + timedelta(minutes=29))
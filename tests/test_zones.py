@@ -0,0 +1,61 @@
+"""Tests of the zones sharing one stove."""
+import pytest
+
+from custom_components.climate_ccl.zones import (
+    AGGREGATION_MEAN,
+    AGGREGATION_MIN,
+    AGGREGATION_WORST_DEFICIT,
+    ZONE_SCHEMA,
+    ZoneGroup,
+)
+import voluptuous as vol
+
+ZONES = [
+    {"sensor": "sensor.living", "weight": 2},
+    {"sensor": "sensor.bedroom", "offset": -2},
+    {"sensor": "sensor.office", "temperature": 19},
+]
+
+
+def _group(aggregation):
+    """Return a group with a reading in every zone."""
+    group = ZoneGroup([ZONE_SCHEMA(zone) for zone in ZONES], aggregation)
+    group.update("sensor.living", "19.5")
+    group.update("sensor.bedroom", "18.5")
+    group.update("sensor.office", "18")
+    return group
+
+
+@pytest.mark.parametrize(
+    "aggregation, expected",
+    [
+        # Deviations -0.5, +0.5 and -1, weights 2, 1, 1
+        (AGGREGATION_MEAN, 20 - 0.375),
+        (AGGREGATION_MIN, 19),
+        # Weighted deficits -1, +0.5 and -1, the first zone wins
+        (AGGREGATION_WORST_DEFICIT, 19.5),
+    ],
+)
+def test_aggregate(aggregation, expected):
+    """The zones reduce to one temperature against the target."""
+    assert _group(aggregation).aggregate(20) == pytest.approx(expected)
+
+
+def test_update_and_missing_readings():
+    """Unknown states drop a zone, unchanged readings report no change."""
+    group = _group(AGGREGATION_MIN)
+    assert not group.update("sensor.office", "18")
+    assert not group.update("sensor.unknown", "10")
+    assert group.update("sensor.office", "unavailable")
+    assert group.aggregate(20) == pytest.approx(19.5)
+    assert group.mean_reading() == pytest.approx((2 * 19.5 + 18.5) / 3)
+    assert group.as_dict()["sensor.office"] is None
+    assert group.aggregate(None) is None
+
+
+def test_schema_setpoint_exclusive():
+    """A zone has either an offset or a fixed temperature."""
+    with pytest.raises(vol.Invalid):
+        ZONE_SCHEMA({"sensor": "sensor.a", "offset": 1, "temperature": 19})
+    with pytest.raises(vol.Invalid):
+        ZONE_SCHEMA({"sensor": "sensor.a", "weight": 0})